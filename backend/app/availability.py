@@ -0,0 +1,116 @@
+"""
+Index de disponibilité des salles pour la recherche de salle libre.
+
+Pour chaque (salle, jour), les intervalles occupés (séances + réservations
+approuvées) sont gardés triés par début, avec le maximum cumulé des fins :
+savoir si une salle est prise sur [début, fin[ coûte une recherche
+dichotomique. L'index est reconstruit (une requête par table) dès que
+`rooms`, `time_slots` ou `approved_reservations` ont changé de version.
+
+`approved_reservations` n'est incrémentée que lorsqu'une réservation
+approuvée apparaît ou disparaît : créer ou refuser une demande en attente
+(`reservations`) ne touche pas l'index. Une validation passe par `occupy`,
+qui ajoute l'intervalle à l'index en place au lieu de le reconstruire.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+
+from sqlalchemy.orm import Session
+
+from .cache import bump_if, get_version
+from .models.models import Reservation, Room, TimeSlot
+from .timeutils import day_index, to_minutes
+
+INDEX_TABLES = ("rooms", "time_slots", "approved_reservations")
+
+
+class _DayIntervals:
+    __slots__ = ("intervals", "starts", "max_ends")
+
+    def __init__(self, intervals):
+        intervals.sort()
+        self.intervals = intervals
+        self.starts = [s for s, _ in intervals]
+        self.max_ends = []
+        current = -1
+        for _, e in intervals:
+            current = max(current, e)
+            self.max_ends.append(current)
+
+    def overlaps(self, start, end):
+        # Intervalles qui commencent avant `end` : préfixe [0, k[
+        k = bisect_left(self.starts, end)
+        return k > 0 and self.max_ends[k - 1] > start
+
+
+class RoomAvailabilityIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        # (salles triées par capacité croissante, capacités, {(room_id, n° du jour): _DayIntervals})
+        self._state = ([], [], {})
+
+    def _rebuild(self, db: Session, version):
+        rooms = sorted(
+            ({"id": r.id, "name": r.name, "capacity": r.capacity or 0, "type": r.type, "equipment": r.equipment}
+             for r in db.query(Room).all()),
+            key=lambda r: (r["capacity"], r["id"])
+        )
+
+        raw = {}
+        slot_rows = db.query(TimeSlot.room_id, TimeSlot.day_of_week, TimeSlot.start_min, TimeSlot.end_min).filter(
+            TimeSlot.room_id.isnot(None), TimeSlot.day_of_week.isnot(None),
+            TimeSlot.start_min.isnot(None), TimeSlot.end_min.isnot(None)).all()
+        res_rows = db.query(Reservation.room_id, Reservation.day_of_week, Reservation.start_min, Reservation.end_min).filter(
+            Reservation.status == "approved", Reservation.room_id.isnot(None), Reservation.day_of_week.isnot(None),
+            Reservation.start_min.isnot(None), Reservation.end_min.isnot(None)).all()
+
+        for room_id, d, s, e in slot_rows + res_rows:
+            raw.setdefault((room_id, d), []).append((s, e))
+
+        busy = {key: _DayIntervals(intervals) for key, intervals in raw.items()}
+        self._state = (rooms, [r["capacity"] for r in rooms], busy)
+        self._version = version
+
+    def ensure_fresh(self, db: Session):
+        version = get_version(*INDEX_TABLES)
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._rebuild(db, version)
+
+    def occupy(self, room_id, day_of_week, start_min, end_min, *tables):
+        """
+        Signale l'écriture (bump de `tables`) qui occupe la salle sur ce créneau.
+        Si l'index était à jour, l'intervalle y est ajouté sans reconstruction ;
+        sinon il sera reconstruit à la prochaine recherche. Un ajout en double
+        (reconstruction concurrente) ne change pas le résultat des recherches.
+        """
+        with self._lock:
+            version = bump_if(self._version, INDEX_TABLES, *tables)
+            if version is None:
+                return
+            if None not in (room_id, day_of_week, start_min, end_min):
+                busy = self._state[2]
+                current = busy.get((room_id, day_of_week))
+                # Nouvel objet : une recherche en cours garde une vue cohérente
+                busy[(room_id, day_of_week)] = _DayIntervals((current.intervals if current else []) + [(start_min, end_min)])
+            self._version = version
+
+    def free_rooms(self, db: Session, day, start_time, end_time, capacity=0, room_type=None):
+        self.ensure_fresh(db)
+        s, e = to_minutes(start_time), to_minutes(end_time)
+        if s is None or e is None or e <= s:
+            return []
+
+        d = day_index(day)
+        rooms, capacities, busy = self._state
+        first = bisect_right(capacities, capacity - 1) if capacity > 0 else 0
+        return [
+            room for room in rooms[first:]
+            if (room_type is None or room["type"] == room_type)
+            and ((room["id"], d) not in busy or not busy[(room["id"], d)].overlaps(s, e))
+        ]
+
+
+room_index = RoomAvailabilityIndex()
@@ -0,0 +1,91 @@
+"""
+Chargement initial des tableaux de bord en une seule requête HTTP.
+
+Une réponse « bootstrap » regroupe plusieurs sections (salles, séances,
+utilisateurs...). Chaque section dépend de quelques tables et est mise en
+cache séparément : après une écriture, seules les sections touchées sont
+recalculées. Les sections manquantes sont calculées l'une après l'autre sur
+la session de la requête : une seule connexion, comptée par get_db.
+
+Paramètres communs :
+- `include=rooms,teachers` : sous-ensemble des sections ;
+- `fields.<section>=id,name` : projection des champs d'une section, comme
+  `fields=` sur les endpoints de liste.
+"""
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from .cache import VersionedCache, etag_matches, get_version, make_etag
+from .pagination import projected_columns
+
+section_cache = VersionedCache(max_entries=512)
+
+
+@dataclass
+class Section:
+    name: str
+    tables: tuple
+    build: Callable[[Any], Any]      # build(db) -> contenu de la section
+    model: Optional[type] = None     # modèle des lignes, pour la projection `fields.<section>`
+    vary: Optional[Callable[[], Any]] = None  # partie de la clé hors tables (ex. date du jour)
+
+
+def _parse_fields(request: Request, sections):
+    fields = {}
+    for section in sections:
+        raw = request.query_params.get(f"fields.{section.name}")
+        if raw:
+            if section.model is None:
+                raise HTTPException(status_code=400, detail=f"La section {section.name} ne supporte pas fields")
+            names, _ = projected_columns(section.model, [f.strip() for f in raw.split(",") if f.strip()])
+            fields[section.name] = tuple(names)
+    return fields
+
+
+def _project(rows, names):
+    return [{name: getattr(row, name) for name in names} for row in rows]
+
+
+def _compute(db, section, names):
+    value = section.build(db)
+    if names:
+        value = _project(value, names)
+    return jsonable_encoder(value)
+
+
+def bootstrap_response(request: Request, db, key, sections):
+    """Réponse JSON {section: contenu} avec ETag global et cache par section."""
+    include = request.query_params.get("include")
+    if include:
+        wanted = {s.strip() for s in include.split(",") if s.strip()}
+        unknown = wanted - {s.name for s in sections}
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Sections inconnues : {', '.join(sorted(unknown))}")
+        sections = [s for s in sections if s.name in wanted]
+    fields = _parse_fields(request, sections)
+
+    tables = tuple(sorted({t for s in sections for t in s.tables}))
+    varies = {s.name: s.vary() for s in sections if s.vary is not None}
+    etag = make_etag(("bootstrap", key, tuple(s.name for s in sections), tuple(sorted(fields.items())),
+                      tuple(sorted(varies.items()))), get_version(*tables))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    payload = {}
+    for section in sections:
+        cache_key = (key, section.name, fields.get(section.name), varies.get(section.name))
+        found, value = section_cache.peek(cache_key, section.tables)
+        if not found:
+            # Version relevée avant le calcul : une écriture concurrente invalide l'entrée
+            version = get_version(*section.tables)
+            value = _compute(db, section, fields.get(section.name))
+            section_cache.put(cache_key, version, value)
+        payload[section.name] = value
+
+    body = json.dumps({s.name: payload[s.name] for s in sections}).encode()
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,296 @@
+"""
+Outils des imports en masse : lecture en flux, validation, upsert par lots.
+
+Le corps de la requête est lu au fil de l'eau (jamais chargé en entier) :
+- `text/csv` : une ligne d'en-tête puis une ligne par enregistrement ;
+- `application/x-ndjson` : un objet JSON par ligne ;
+- `application/json` : un tableau d'objets, décodé élément par élément.
+
+Les lignes sont validées par un schéma pydantic puis regroupées par lots de
+UNITIME_BULK_CHUNK. Chaque lot coûte une lecture des clés existantes et une
+seule instruction INSERT ... ON CONFLICT DO UPDATE. Le résultat est détaillé
+ligne par ligne (`row` = numéro de l'enregistrement dans le fichier, à partir de 1).
+"""
+import codecs
+import csv
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from .cache import bump
+
+CHUNK_SIZE = int(os.getenv("UNITIME_BULK_CHUNK", "500"))
+MAX_ROWS = int(os.getenv("UNITIME_BULK_MAX_ROWS", "50000"))
+
+
+# --- Lecture en flux ---------------------------------------------------
+async def _lines(request: Request):
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line + "\n"
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+async def _csv_records(request):
+    pending, header = [], None
+    async for line in _lines(request):
+        pending.append(line)
+        # Champ entre guillemets sur plusieurs lignes : on attend la fin de l'enregistrement
+        if sum(l.count('"') for l in pending) % 2:
+            continue
+        row = next(csv.reader(pending), [])
+        pending = []
+        if not any(cell.strip() for cell in row):
+            continue
+        if header is None:
+            header = [h.strip() for h in row]
+            continue
+        yield {k: (v.strip() or None) for k, v in zip(header, row)}
+    if pending:
+        raise HTTPException(status_code=400, detail="CSV invalide : guillemet non fermé")
+
+
+async def _ndjson_records(request):
+    async for line in _lines(request):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"JSON invalide : {e}")
+
+
+async def _json_array_records(request):
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer, pos, started, done = "", 0, False, False
+    stream = request.stream()
+
+    async def fill():
+        nonlocal buffer, pos
+        try:
+            chunk = await stream.__anext__()
+        except StopAsyncIteration:
+            return False
+        buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+        return True
+
+    more = await fill()
+    while not done:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(buffer):
+            if not more:
+                break
+            more = await fill()
+            continue
+        if not started:
+            if buffer[pos] != "[":
+                raise HTTPException(status_code=400, detail="JSON attendu : un tableau d'objets")
+            started, pos = True, pos + 1
+            continue
+        if buffer[pos] == "]":
+            done = True
+            break
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except ValueError as e:
+            if more:
+                # Élément coupé entre deux morceaux du flux : on lit la suite
+                more = await fill()
+                continue
+            raise HTTPException(status_code=400, detail=f"JSON invalide : {e}")
+        pos = end
+        yield value
+    if not done:
+        raise HTTPException(status_code=400, detail="JSON invalide : tableau non fermé")
+
+
+def iter_records(request: Request):
+    """Enregistrements (dict) du corps de la requête, selon son Content-Type."""
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return _csv_records(request)
+    if content_type in ("application/x-ndjson", "application/jsonl"):
+        return _ndjson_records(request)
+    if content_type == "application/json":
+        return _json_array_records(request)
+    raise HTTPException(status_code=415, detail="Formats acceptés : text/csv, application/json, application/x-ndjson")
+
+
+async def chunks(records, size=CHUNK_SIZE, max_rows=MAX_ROWS):
+    """Regroupe les enregistrements en lots de (numéro de ligne, enregistrement)."""
+    batch, n = [], 0
+    async for record in records:
+        n += 1
+        if n > max_rows:
+            raise HTTPException(status_code=413, detail=f"Import limité à {max_rows} lignes")
+        batch.append((n, record))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- Validation et résultats -------------------------------------------
+def validate_rows(schema, batch, results):
+    """Valide un lot ; les lignes invalides sont ajoutées à `results` en erreur."""
+    valid = []
+    for n, record in batch:
+        if not isinstance(record, dict):
+            results.error(n, "Objet attendu")
+            continue
+        try:
+            valid.append((n, schema.model_validate(record)))
+        except ValidationError as e:
+            results.error(n, "; ".join(f"{'.'.join(map(str, err['loc'])) or 'ligne'} : {err['msg']}" for err in e.errors()))
+    return valid
+
+
+class BulkResults:
+    def __init__(self, statuses=("created", "updated")):
+        self.rows = []
+        self.counts = {status: 0 for status in (*statuses, "error")}
+
+    def add(self, n, status, **extra):
+        self.rows.append({"row": n, "status": status, **extra})
+        self.counts[status] = self.counts.get(status, 0) + 1
+
+    def error(self, n, message, **extra):
+        self.add(n, "error", error=message, **extra)
+
+    def to_dict(self):
+        return {**self.counts, "total": len(self.rows), "results": sorted(self.rows, key=lambda r: r["row"])}
+
+
+def dedupe(valid, key, results, seen):
+    """Garde la première occurrence de chaque clé de l'import (`seen` est partagé entre les lots)."""
+    kept = []
+    for n, item in valid:
+        k = getattr(item, key)
+        if k in seen:
+            results.error(n, f"{key} en double dans l'import : {k}", key=k)
+            continue
+        seen.add(k)
+        kept.append((n, item))
+    return kept
+
+
+# --- Upsert ------------------------------------------------------------
+def existing_keys(model, key, values):
+    """Une seule requête (via l'index de `key`) : lignes (clé, id) déjà présentes."""
+    column = getattr(model, key)
+    return select(column, model.id).where(column.in_(values))
+
+
+def upsert_statement(dialect, model, rows, key, update_columns):
+    """
+    INSERT ... ON CONFLICT (key) DO UPDATE pour PostgreSQL et SQLite. Une
+    valeur vide (None) dans l'import conserve la valeur existante. Sans
+    colonnes à mettre à jour : DO NOTHING (seules les lignes créées reviennent).
+    """
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise HTTPException(status_code=501, detail=f"Upsert non supporté pour {dialect}")
+    table = model.__table__
+    stmt = insert(model).values(rows)
+    if update_columns:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[key],
+            set_={c: func.coalesce(stmt.excluded[c], table.c[c]) for c in update_columns},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[key])
+    return stmt.returning(table.c[key], table.c.id)
+
+
+# --- Upsert générique par ressource --------------------------------------
+@dataclass
+class BulkResource:
+    model: type
+    schema: type
+    key: str                                       # colonne unique servant de cible ON CONFLICT
+    table: str                                     # table à signaler (bump) après l'import
+    defaults: dict = field(default_factory=dict)   # valeurs des cellules vides à la création
+    prepare: Optional[Callable] = None             # prepare(ligne) -> ligne complétée
+    check: Optional[Callable] = None               # async check(db, lignes, results) -> lignes gardées
+
+
+def _record(results, n, key_value, existing, ids):
+    if key_value not in ids:
+        results.error(n, "Existe déjà", key=key_value, id=existing.get(key_value))
+    else:
+        results.add(n, "updated" if key_value in existing else "created", key=key_value, id=ids[key_value])
+
+
+async def bulk_upsert(db, records, resource: BulkResource, mode="upsert", chunk_size=CHUNK_SIZE):
+    """
+    Importe `records` par lots : validation, clés existantes en une requête,
+    un INSERT ... ON CONFLICT par lot et un commit par lot. Si le lot échoue
+    (contrainte violée), il est rejoué ligne par ligne pour isoler les fautives.
+    La version de la table n'est incrémentée qu'une fois, à la fin.
+    """
+    model, key = resource.model, resource.key
+    results, seen, changed = BulkResults(), set(), False
+    dialect = db.bind.dialect.name
+    update_columns = [] if mode == "create" else [c for c in resource.schema.model_fields if c not in (key, "id")]
+
+    async for batch in chunks(records, chunk_size):
+        valid = validate_rows(resource.schema, batch, results)
+        if resource.prepare:
+            valid = [(n, resource.prepare(item)) for n, item in valid]
+        valid = dedupe(valid, key, results, seen)
+        if valid and resource.check:
+            valid = await resource.check(db, valid, results)
+        if not valid:
+            continue
+
+        existing = dict((await db.execute(existing_keys(model, key, [getattr(item, key) for _, item in valid]))).all())
+        rows = []
+        for _, item in valid:
+            data = item.model_dump()
+            if data[key] not in existing:
+                for column, default in resource.defaults.items():
+                    if data.get(column) is None:
+                        data[column] = default
+            rows.append(data)
+
+        failed = set()
+        try:
+            ids = dict((await db.execute(upsert_statement(dialect, model, rows, key, update_columns))).all())
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            ids = {}
+            for (n, _), data in zip(valid, rows):
+                try:
+                    ids.update((await db.execute(upsert_statement(dialect, model, [data], key, update_columns))).all())
+                    await db.commit()
+                except IntegrityError as e:
+                    await db.rollback()
+                    failed.add(n)
+                    results.error(n, f"Contrainte violée : {e.orig}", key=data[key])
+        for (n, _), data in zip(valid, rows):
+            if n not in failed:
+                _record(results, n, data[key], existing, ids)
+        changed = changed or bool(ids)
+
+    if changed:
+        bump(resource.table)
+    return results.to_dict()
@@ -0,0 +1,141 @@
+"""
+Compteurs de version par table et cache de réponses précalculées.
+
+Chaque écriture sur une table incrémente son compteur (`bump`). Une entrée de
+cache est associée aux versions des tables dont elle dépend : tant qu'aucune
+de ces tables n'a changé, la projection est resservie telle quelle.
+
+Les compteurs vivent dans le processus (un seul worker uvicorn en production) ;
+un identifiant de démarrage est mêlé aux ETag pour qu'un redémarrage ne
+puisse jamais valider une ancienne copie côté client.
+"""
+import hashlib
+import json
+import threading
+import uuid
+from collections import OrderedDict
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+_BOOT_ID = uuid.uuid4().hex
+
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def bump(*tables):
+    """Signale qu'une ou plusieurs tables ont été modifiées."""
+    with _versions_lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+
+
+def bump_if(expected, watched, *tables):
+    """
+    `bump(*tables)` ; renvoie les nouvelles versions de `watched` si elles
+    valaient `expected` juste avant (relevé atomique), sinon None.
+    """
+    with _versions_lock:
+        fresh = tuple(_versions.get(table, 0) for table in watched) == expected
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+        return tuple(_versions.get(table, 0) for table in watched) if fresh else None
+
+
+def get_version(*tables):
+    """Tuple des versions courantes des tables demandées."""
+    return tuple(_versions.get(table, 0) for table in tables)
+
+
+class VersionedCache:
+    """
+    Cache LRU dont les entrées expirent dès qu'une table dépendante change.
+    Avec `max_bytes`, les valeurs (bytes) sont aussi bornées en taille totale.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, tables, builder):
+        version = get_version(*tables)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] == version:
+                self._data.move_to_end(key)
+                return entry[1]
+
+        value = builder()
+        self.put(key, version, value)
+        return value
+
+    def peek(self, key, tables):
+        """(trouvé, valeur) sans calcul ; `trouvé` est faux si absente ou périmée."""
+        version = get_version(*tables)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] == version:
+                self._data.move_to_end(key)
+                return True, entry[1]
+        return False, None
+
+    def put(self, key, version, value):
+        """Enregistre une valeur calculée pour `version` (relevée AVANT le calcul)."""
+        size = len(value) if self.max_bytes is not None else 0
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._data[key] = (version, value, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._bytes -= self._data.popitem(last=False)[1][2]
+
+
+# =====================================================================
+# CACHE DE RÉPONSES + GET CONDITIONNEL (ETag / If-None-Match)
+# =====================================================================
+response_cache = VersionedCache(max_entries=1024)
+
+
+def make_etag(key, version):
+    digest = hashlib.sha1(repr((_BOOT_ID, key, version)).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [t.strip() for t in header.split(",")]
+
+
+def cached_response(request: Request, tables, builder, key=None):
+    """
+    Réponse JSON mise en cache par (endpoint, paramètres, versions des tables).
+
+    `builder(headers)` calcule le contenu et peut ajouter des en-têtes (ex.
+    curseur de pagination) dans le dict reçu. Si le client renvoie l'ETag
+    courant, on répond 304 sans rien recalculer ni interroger la base.
+    """
+    if key is None:
+        key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    etag = make_etag(key, get_version(*tables))
+    base_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=base_headers)
+
+    def build():
+        headers = {}
+        body = json.dumps(jsonable_encoder(builder(headers))).encode()
+        return body, headers
+
+    body, extra_headers = response_cache.get_or_build(key, tables, build)
+    return Response(content=body, media_type="application/json", headers={**extra_headers, **base_headers})
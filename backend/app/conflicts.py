@@ -0,0 +1,231 @@
+"""
+Détection des conflits de l'emploi du temps.
+
+- chevauchements enseignant / salle / groupe : balayage (sweep-line) des
+  intervalles triés par début pour chaque (ressource, jour), en O(n log n) ;
+- salle trop petite pour l'effectif du groupe ;
+- séance pendant une indisponibilité déclarée par l'enseignant.
+
+Les résultats sont mémorisés par jour : quand l'emploi du temps change, seuls
+les jours signalés par l'écriture (`conflict_engine.touch`) sont relus et
+recalculés.
+"""
+import heapq
+import threading
+from datetime import date, datetime
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from .cache import get_version
+from .models.models import Group, Room, TimeSlot, Unavailability
+from .timeutils import DAY_NAMES, from_minutes, overlaps
+
+CONFLICT_TABLES = ("time_slots", "rooms", "groups", "unavailabilities")
+# Tables dont les écritures signalent leurs jours via ConflictEngine.touch
+DAY_TABLES = ("time_slots", "unavailabilities")
+
+RESOURCE_LABELS = {"teacher": "Enseignant", "room": "Salle", "group": "Groupe"}
+
+
+def sweep_overlaps(intervals):
+    """
+    Paires qui se chevauchent parmi des intervalles (start, end, payload).
+
+    Les intervalles sont parcourus par début croissant ; un tas garde ceux
+    encore « ouverts ». Tout intervalle ouvert au début du suivant le chevauche.
+    """
+    pairs = []
+    active = []  # tas de (end, start, payload)
+    for start, end, payload in sorted(intervals, key=lambda x: (x[0], x[1])):
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        for _, _, other in active:
+            pairs.append((other, payload))
+        heapq.heappush(active, (end, start, payload))
+    return pairs
+
+
+def _slot_label(row):
+    return f"{DAY_NAMES[row.day_of_week]} {from_minutes(row.start_min)}-{from_minutes(row.end_min)}"
+
+
+def _day_conflicts(rows, room_capacity, group_size, unavailable):
+    """Conflits d'un jour donné (rows : séances de ce jour)."""
+    conflicts = []
+
+    by_resource = {}
+    for row in rows:
+        for kind, key in (("teacher", row.teacher_id), ("room", row.room_id), ("group", row.group_id)):
+            if key is not None:
+                by_resource.setdefault((kind, key), []).append((row.start_min, row.end_min, row))
+
+    for (kind, key), intervals in by_resource.items():
+        if len(intervals) < 2:
+            continue
+        for a, b in sweep_overlaps(intervals):
+            conflicts.append({
+                "type": kind,
+                "resource_id": key,
+                "day": DAY_NAMES[a.day_of_week],
+                "message": f"{RESOURCE_LABELS[kind]} {key} réservé deux fois le {_slot_label(a)} / {_slot_label(b)}",
+                "slots": [str(a.id), str(b.id)],
+            })
+
+    for row in rows:
+        capacity = room_capacity.get(row.room_id)
+        size = group_size.get(row.group_id)
+        if capacity is not None and size is not None and capacity < size:
+            conflicts.append({
+                "type": "capacity",
+                "resource_id": row.room_id,
+                "day": DAY_NAMES[row.day_of_week],
+                "message": f"Salle {row.room_id} ({capacity} places) trop petite pour {row.group_id} ({size} étudiants) le {_slot_label(row)}",
+                "slots": [str(row.id)],
+            })
+
+        for u_start, u_end, u_id in unavailable.get(row.teacher_id, ()):
+            if row.start_min < u_end and row.end_min > u_start:
+                conflicts.append({
+                    "type": "unavailability",
+                    "resource_id": row.teacher_id,
+                    "day": DAY_NAMES[row.day_of_week],
+                    "message": f"Enseignant {row.teacher_id} indisponible le {_slot_label(row)}",
+                    "slots": [str(row.id)],
+                    "unavailability_id": u_id,
+                })
+    return conflicts
+
+
+class ConflictEngine:
+    """
+    Conflits mémorisés par jour. Les écritures de séances / d'indisponibilités
+    passent par `touch` avec les jours modifiés : seuls ces jours sont relus et
+    recalculés. Tout le reste (salles, groupes, date du jour, bump sans
+    `touch`, jours inconnus) provoque un rechargement complet.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._touch_lock = threading.Lock()
+        self._version = None
+        self._result = []
+        # n° du jour -> conflits de ce jour
+        self._per_day = {}
+        self._room_capacity = {}
+        self._group_size = {}
+        # Jours modifiés depuis le dernier calcul (None : inconnus, tout relire)
+        self._dirty = None
+        # Versions de DAY_TABLES attendues si toutes les écritures passent par touch
+        self._expected = None
+
+    def touch(self, days, write):
+        """
+        Exécute `write()` (le bump qui suit l'écriture) en notant les n° de
+        jours modifiés ; `days=None` si on ne les connaît pas.
+        """
+        with self._touch_lock:
+            if get_version(*DAY_TABLES) != self._expected:
+                self._dirty = None
+            write()
+            self._expected = get_version(*DAY_TABLES)
+            if days is None:
+                self._dirty = None
+            elif self._dirty is not None:
+                self._dirty.update(d for d in days if d is not None)
+
+    def _load_references(self, db: Session):
+        self._room_capacity = {r_id: cap for r_id, cap in db.query(Room.id, Room.capacity).all() if cap is not None}
+        self._group_size = {}
+        for g_id, g_name, count in db.query(Group.id, Group.name, Group.student_count).all():
+            if count is not None:
+                # Les séances générées référencent le groupe par son nom, les autres par son id
+                self._group_size[g_id] = count
+                self._group_size[g_name] = count
+
+    def _recompute(self, db: Session, days=None):
+        """Recalcule les jours `days` (None : tous) à partir de la base."""
+        slots = db.query(
+            TimeSlot.id, TimeSlot.teacher_id, TimeSlot.room_id, TimeSlot.group_id,
+            TimeSlot.day_of_week, TimeSlot.start_min, TimeSlot.end_min
+        ).filter(
+            TimeSlot.day_of_week.isnot(None), TimeSlot.start_min.isnot(None), TimeSlot.end_min.isnot(None)
+        )
+        # Indisponibilités à venir (ou récurrentes), rangées par (jour, enseignant)
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        absences = db.query(
+            Unavailability.id, Unavailability.teacher_id, Unavailability.day_of_week,
+            Unavailability.start_min, Unavailability.end_min
+        ).filter(
+            Unavailability.day_of_week.isnot(None),
+            or_(Unavailability.date.is_(None), Unavailability.date >= today)
+        )
+        if days is None:
+            self._load_references(db)
+            per_day = {}
+        else:
+            slots = slots.filter(TimeSlot.day_of_week.in_(days))
+            absences = absences.filter(Unavailability.day_of_week.in_(days))
+            per_day = {d: c for d, c in self._per_day.items() if d not in days}
+
+        unavailable_by_day = {}
+        for u_id, t_id, d, s, e in absences.all():
+            if s is not None and e is not None:
+                unavailable_by_day.setdefault(d, {}).setdefault(t_id, []).append((s, e, u_id))
+
+        rows_by_day = {}
+        for row in slots.all():
+            rows_by_day.setdefault(row.day_of_week, []).append(row)
+
+        for d, day_rows in rows_by_day.items():
+            day_rows.sort(key=lambda r: r.id)
+            per_day[d] = _day_conflicts(day_rows, self._room_capacity, self._group_size, unavailable_by_day.get(d, {}))
+
+        self._per_day = per_day
+        self._result = [c for d in sorted(per_day) for c in per_day[d]]
+
+    def get(self, db: Session):
+        # La date du jour fait partie de la version : les absences passées cessent de compter
+        version = get_version(*CONFLICT_TABLES) + (date.today(),)
+        if self._version == version:
+            return self._result
+        with self._lock:
+            with self._touch_lock:
+                version = get_version(*CONFLICT_TABLES) + (date.today(),)
+                if self._version == version:
+                    return self._result
+                dirty = self._dirty if get_version(*DAY_TABLES) == self._expected else None
+                self._dirty = set()
+                self._expected = get_version(*DAY_TABLES)
+            previous, self._version = self._version, None  # calcul interrompu : tout relire
+            incremental = (
+                dirty is not None and previous is not None
+                and previous[1:3] == version[1:3] and previous[4] == version[4]  # salles, groupes, date
+            )
+            if not incremental:
+                self._recompute(db)
+            elif dirty:
+                self._recompute(db, dirty)
+            self._version = version
+        return self._result
+
+
+conflict_engine = ConflictEngine()
+
+
+def find_slot_collisions(db: Session, day_of_week, start_min, end_min, teacher_id=None, room_id=None, group_id=None):
+    """
+    Séances existantes qui chevauchent [start_min, end_min[ pour l'enseignant,
+    la salle ou le groupe donnés (une requête servie par les index composites).
+    """
+    resources = []
+    if teacher_id is not None: resources.append(TimeSlot.teacher_id == teacher_id)
+    if room_id is not None: resources.append(TimeSlot.room_id == room_id)
+    if group_id is not None: resources.append(TimeSlot.group_id == group_id)
+    if not resources or day_of_week is None or start_min is None or end_min is None:
+        return []
+    return db.query(TimeSlot).filter(
+        or_(*resources),
+        TimeSlot.day_of_week == day_of_week,
+        overlaps(TimeSlot.start_min, TimeSlot.end_min, start_min, end_min)
+    ).all()
@@ -1,19 +1,72 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+import threading
+import time
 import os
 
+from .metrics import instrument_queries
+from .sql_diagnostics import instrument_diagnostics
+from .db_metrics import (SESSION_STATS_KEY, InstrumentedAsyncQueuePool, InstrumentedQueuePool, async_db_metrics, db_metrics,
+                         instrument_engine, instrument_sessions, new_session_stats)
+
 # URL de connexion (utilise les identifiants du docker-compose.yml)
 SQLALCHEMY_DATABASE_URL = os.getenv(
     "DATABASE_URL", 
     "postgresql://unitime_user:unitime_password@db:5432/unitime_db"
 )
 
+# Réglages du pool (variables d'environnement, valeurs par défaut raisonnables
+# pour un worker uvicorn face à PostgreSQL)
+def _env_bool(name, default):
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+}
+# Le moteur asynchrone a son propre pool : un worker peut ouvrir jusqu'à
+# pool_size + max_overflow connexions pour chacun des deux moteurs.
+ASYNC_POOL_SETTINGS = {
+    **POOL_SETTINGS,
+    "pool_size": int(os.getenv("DB_ASYNC_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "5")),
+}
+# Durée max d'une requête SQL en ms (PostgreSQL uniquement, 0 = illimitée)
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+
+def engine_options(url, is_async=False):
+    """Arguments de create_engine / create_async_engine pour cette URL."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "sqlite" and (is_async or url.database in (None, "", ":memory:")):
+        # Pool imposé par SQLAlchemy (connexion unique en mémoire, NullPool pour aiosqlite)
+        return {}
+
+    options = dict(ASYNC_POOL_SETTINGS if is_async else POOL_SETTINGS)
+    options["poolclass"] = InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool
+    if backend == "postgresql" and STATEMENT_TIMEOUT_MS > 0:
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
 # Création du moteur
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+instrument_engine(engine)
+instrument_queries(engine)
+instrument_diagnostics(engine)
 
 # Création de la session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_sessions(SessionLocal)
 
 # Base pour les modèles
 Base = declarative_base()
@@ -21,7 +74,79 @@ Base = declarative_base()
 # Dépendance pour récupérer la DB dans les endpoints
 def get_db():
     db = SessionLocal()
+    stats = db.info[SESSION_STATS_KEY] = new_session_stats()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+        db_metrics.record_session(stats, time.perf_counter() - stats["opened_at"])
+
+
+# =====================================================================
+# ACCÈS ASYNCHRONE (endpoints `async def`)
+# =====================================================================
+# Même base, pilote asynchrone : asyncpg pour PostgreSQL, aiosqlite pour SQLite.
+# Le moteur est créé au premier usage, pour que les scripts synchrones
+# (migrations, seeding) n'aient pas besoin des pilotes asynchrones.
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+_async_engine = None
+_async_sessionmaker = None
+_async_lock = threading.Lock()
+
+
+class AsyncBackedSession(Session):
+    """Session synchrone sous-jacente des AsyncSession (statistiques par session)."""
+
+
+instrument_sessions(AsyncBackedSession)
+
+
+def async_database_url(url=SQLALCHEMY_DATABASE_URL):
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"Pas de pilote asynchrone connu pour {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def get_async_engine():
+    global _async_engine, _async_sessionmaker
+    with _async_lock:
+        if _async_engine is None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+            _async_engine = create_async_engine(async_database_url(), **engine_options(async_database_url(), is_async=True))
+            instrument_engine(_async_engine.sync_engine, async_db_metrics)
+            instrument_queries(_async_engine.sync_engine)
+            instrument_diagnostics(_async_engine.sync_engine)
+            # expire_on_commit=False : les objets restent lisibles après commit sans nouvel aller-retour
+            _async_sessionmaker = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False,
+                                                     sync_session_class=AsyncBackedSession)
+        return _async_engine
+
+
+def current_async_engine():
+    """Moteur asynchrone s'il a déjà servi (None sinon), sans le créer."""
+    return _async_engine
+
+
+def AsyncSessionLocal():
+    get_async_engine()
+    return _async_sessionmaker()
+
+
+async def get_async_db():
+    stats = new_session_stats()
+    try:
+        async with AsyncSessionLocal() as db:
+            db.info[SESSION_STATS_KEY] = stats
+            yield db
+    finally:
+        async_db_metrics.record_session(stats, time.perf_counter() - stats["opened_at"])
+
+
+async def dispose_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = _async_sessionmaker = None
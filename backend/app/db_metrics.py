@@ -0,0 +1,193 @@
+"""
+Instrumentation du pool de connexions et des sessions SQLAlchemy.
+
+- pool : attente au checkout, connexions empruntées, débordements (overflow),
+  timeouts, connexions ouvertes / invalidées ;
+- sessions : nombre de requêtes SQL et temps passé en base par session
+  (donc par requête HTTP, une session étant ouverte par `get_db`).
+
+Les compteurs sont en mémoire du processus et exposés par
+GET /admin/db/metrics : `db_metrics` pour le moteur synchrone (get_db),
+`async_db_metrics` pour le moteur asynchrone (get_async_db), qui a son
+propre pool.
+"""
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+SESSION_STATS_KEY = "unitime_stats"
+_QUERY_START_KEY = "unitime_query_start"
+
+
+class _Summary:
+    """Total / nombre / maximum d'une mesure."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count, self.total, self.max = 0, 0.0, 0.0
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def to_dict(self, scale=1.0, digits=3):
+        return {
+            "count": self.count,
+            "total": round(self.total * scale, digits),
+            "avg": round(self.total * scale / self.count, digits) if self.count else 0.0,
+            "max": round(self.max * scale, digits),
+        }
+
+
+class DBMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkout_wait = _Summary()   # secondes
+            self.overflow_checkouts = 0
+            self.checkout_timeouts = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.session_queries = _Summary()
+            self.session_db_time = _Summary()  # secondes
+            self.session_duration = _Summary()  # secondes
+            self.started_at = time.time()
+
+    # --- Pool ---------------------------------------------------------
+    def record_checkout(self, wait, overflow):
+        with self._lock:
+            self.checkout_wait.add(wait)
+            if overflow:
+                self.overflow_checkouts += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.checkout_timeouts += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidation(self):
+        with self._lock:
+            self.invalidations += 1
+
+    # --- Sessions -----------------------------------------------------
+    def record_session(self, stats, duration):
+        with self._lock:
+            self.session_queries.add(stats["queries"])
+            self.session_db_time.add(stats["db_time"])
+            self.session_duration.add(duration)
+
+    def snapshot(self, engine=None):
+        with self._lock:
+            data = {
+                "since": self.started_at,
+                "pool": {
+                    "checkout_wait_ms": self.checkout_wait.to_dict(scale=1000),
+                    "overflow_checkouts": self.overflow_checkouts,
+                    "checkout_timeouts": self.checkout_timeouts,
+                    "connects": self.connects,
+                    "invalidations": self.invalidations,
+                },
+                "sessions": {
+                    "queries": self.session_queries.to_dict(digits=2),
+                    "db_time_ms": self.session_db_time.to_dict(scale=1000),
+                    "duration_ms": self.session_duration.to_dict(scale=1000),
+                },
+            }
+        pool = getattr(engine, "pool", None)
+        if isinstance(pool, QueuePool):
+            data["pool"].update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+            })
+        return data
+
+
+db_metrics = DBMetrics()
+async_db_metrics = DBMetrics()
+
+
+class _TimedCheckout:
+    """Mesure l'attente de chaque checkout dans `metrics`."""
+
+    metrics: DBMetrics = db_metrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeout:
+            # Pool épuisé : aucune connexion libérée avant `pool_timeout`
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start, self.overflow() > 0)
+        return conn
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    """QueuePool du moteur synchrone."""
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """Pool du moteur asynchrone (asyncpg), compté à part."""
+
+    metrics = async_db_metrics
+
+
+def new_session_stats():
+    return {"queries": 0, "db_time": 0.0, "opened_at": time.perf_counter()}
+
+
+def instrument_engine(engine, metrics=db_metrics):
+    """Événements du pool et chronométrage des requêtes SQL (moteur synchrone, ou `.sync_engine`)."""
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, record):
+        metrics.record_connect()
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_conn, record, exception):
+        metrics.record_invalidation()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn, record):
+        # La connexion revient au pool : elle n'appartient plus à la session
+        record.info.pop(SESSION_STATS_KEY, None)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info[_QUERY_START_KEY] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = conn.info.get(SESSION_STATS_KEY)
+        start = conn.info.pop(_QUERY_START_KEY, None)
+        if stats is not None and start is not None:
+            stats["queries"] += 1
+            stats["db_time"] += time.perf_counter() - start
+
+
+def instrument_sessions(session_factory):
+    """Rattache les statistiques de la session à chaque connexion qu'elle emprunte."""
+
+    @event.listens_for(session_factory, "after_begin")
+    def _on_begin(session, transaction, connection):
+        stats = session.info.get(SESSION_STATS_KEY)
+        if stats is not None:
+            # conn.info est partagé par tous les Connection d'une même connexion DBAPI
+            connection.info[SESSION_STATS_KEY] = stats
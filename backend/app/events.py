@@ -0,0 +1,176 @@
+"""
+Diffusion en temps réel des notifications (Server-Sent Events).
+
+Un hub en mémoire, propre au processus, répartit les événements par canal :
+`all`, `role:<rôle>`, `group:<groupe>`, `teacher:<id>`. Chaque client SSE
+s'abonne à ses canaux et reçoit les nouveaux événements sans interroger la
+base. Les derniers événements sont gardés dans un tampon circulaire : à la
+reconnexion, le navigateur renvoie `Last-Event-ID` et ne reçoit que ce qu'il
+a manqué. Si ce trou n'est plus couvert par le tampon (redémarrage, client
+trop lent), un événement `resync` lui demande de recharger /notifications/.
+
+Les endpoints d'écriture sont synchrones (pool de threads) : `publish` est
+donc thread-safe et remet chaque événement à la boucle asyncio de l'abonné.
+"""
+import asyncio
+import itertools
+import json
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+EVENT_HISTORY = int(os.getenv("UNITIME_EVENT_HISTORY", "1000"))
+HEARTBEAT_SECONDS = float(os.getenv("UNITIME_SSE_HEARTBEAT", "15"))
+SUBSCRIBER_QUEUE = 256
+RETRY_MS = 3000
+
+
+def channels_for(role=None, group_id=None, teacher_id=None):
+    """Canaux d'un client : tout le monde + son rôle, son groupe, son identifiant."""
+    channels = {"all"}
+    if role and role != "all":
+        channels.add(f"role:{role}")
+    if group_id:
+        channels.add(f"group:{group_id}")
+    if teacher_id is not None:
+        channels.add(f"teacher:{teacher_id}")
+    return frozenset(channels)
+
+
+def _sse(event_type, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(jsonable_encoder(data), ensure_ascii=False)}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    type: str           # notification, reservation, unavailability
+    channels: frozenset
+    data: dict
+    created_at: datetime
+
+    def encode(self):
+        return _sse(self.type, self.data, self.id)
+
+
+class Subscriber:
+    def __init__(self, channels, loop):
+        self.channels = channels
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE)
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Exécuté dans la boucle de l'abonné
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class EventHub:
+    def __init__(self, history=EVENT_HISTORY):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._history: deque = deque(maxlen=history)
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def connections(self):
+        with self._lock:
+            return len({s for subs in self._subscribers.values() for s in subs})
+
+    @property
+    def last_id(self):
+        with self._lock:
+            return self._history[-1].id if self._history else 0
+
+    def publish(self, event_type, data, *channels):
+        """Publie un événement sur les canaux donnés (appelable depuis n'importe quel thread)."""
+        channels = frozenset(channels or ("all",))
+        with self._lock:
+            event = Event(next(self._ids), event_type, channels, jsonable_encoder(data), datetime.now())
+            self._history.append(event)
+            targets = {s for c in channels for s in self._subscribers.get(c, ())}
+            self.published += 1
+        for subscriber in targets:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+            except RuntimeError:
+                # Boucle fermée : le client est parti, le finally de stream() le désinscrira
+                self.dropped += 1
+        return event
+
+    def subscribe(self, channels, last_id: Optional[int] = None):
+        """Inscrit un abonné ; renvoie (abonné, événements manqués, trou non couvert)."""
+        subscriber = Subscriber(channels, asyncio.get_running_loop())
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscriber)
+            backlog, gap = [], False
+            if last_id is not None:
+                newest = self._history[-1].id if self._history else 0
+                oldest = self._history[0].id if self._history else newest + 1
+                # Identifiant inconnu (redémarrage) ou plus couvert par le tampon
+                gap = last_id > newest or last_id + 1 < oldest
+                if not gap:
+                    backlog = [e for e in self._history if e.id > last_id and e.channels & channels]
+        return subscriber, backlog, gap
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            for channel in subscriber.channels:
+                subs = self._subscribers.get(channel)
+                if subs is not None:
+                    subs.discard(subscriber)
+                    if not subs:
+                        del self._subscribers[channel]
+
+    async def stream(self, request, channels, last_id: Optional[int] = None):
+        """Générateur SSE : rattrapage, puis événements en direct et battements de cœur."""
+        subscriber, backlog, gap = self.subscribe(channels, last_id)
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode()
+            if gap:
+                yield _sse("resync", {"last_id": self.last_id})
+            for event in backlog:
+                yield event.encode()
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield b": ping\n\n"
+                    continue
+                if subscriber.overflowed:
+                    # Le client n'a pas suivi : on lui demande de recharger la liste
+                    subscriber.overflowed = False
+                    yield _sse("resync", {"last_id": self.last_id})
+                yield event.encode()
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        return {
+            "connections": self.connections,
+            "published": self.published,
+            "dropped": self.dropped,
+            "last_id": self.last_id,
+            "history": len(self._history),
+        }
+
+
+event_hub = EventHub()
@@ -0,0 +1,172 @@
+"""
+Exécution des tâches longues (génération d'emploi du temps...) hors requête.
+
+Une tâche est soumise, tourne dans un thread de pilotage et délègue le
+calcul lourd à un pool de processus local ; le client suit sa progression
+via GET /jobs/{id}. Un verrou « single-flight » par type de tâche empêche
+deux générations concurrentes de s'écraser mutuellement.
+"""
+import multiprocessing
+import os
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+MAX_JOB_HISTORY = 100
+POLL_INTERVAL = 0.2
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobConflict(Exception):
+    def __init__(self, job):
+        super().__init__(f"Une tâche {job.kind} est déjà en cours ({job.id})")
+        self.job = job
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    status: str = "queued"      # queued, running, succeeded, failed, cancelled
+    phase: str = "En attente"
+    progress: float = 0.0
+    placed: Optional[int] = None
+    unplaced: Optional[int] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def set_phase(self, phase, progress):
+        self.check_cancelled()
+        self.phase = phase
+        self.progress = progress
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def to_dict(self):
+        return {
+            "id": self.id, "kind": self.kind, "params": self.params, "status": self.status,
+            "phase": self.phase, "progress": round(self.progress, 3),
+            "placed": self.placed, "unplaced": self.unplaced,
+            "result": self.result, "error": self.error,
+            "cancel_requested": self.cancel_event.is_set(),
+            "created_at": self.created_at, "started_at": self.started_at, "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or int(os.getenv("UNITIME_JOB_WORKERS", "0")) or os.cpu_count() or 1
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._runner = ThreadPoolExecutor(max_workers=2, thread_name_prefix="unitime-job")
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    # --- Pool de processus ------------------------------------------
+    def process_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # "spawn" : les workers ne héritent ni des connexions BDD ni des threads du serveur
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def map_in_process(self, job: Job, fn, args_list, on_result=None):
+        """
+        Exécute `fn(*args)` pour chaque tuple de `args_list` en parallèle dans le
+        pool ; `on_result(done, total, value)` est appelé à chaque fin de calcul.
+        """
+        pool = self.process_pool()
+        pending = {pool.submit(fn, *args) for args in args_list}
+        results, total = [], len(pending)
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results.append(future.result())
+                    if on_result:
+                        on_result(len(results), total, results[-1])
+                if job.cancel_event.is_set():
+                    raise JobCancelled()
+        finally:
+            for future in pending:
+                future.cancel()
+        return results
+
+    def shutdown(self):
+        self._runner.shutdown(wait=False, cancel_futures=True)
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    # --- Cycle de vie ------------------------------------------------
+    def submit(self, kind, fn, params=None, single_flight=True):
+        """Soumet `fn(job)` ; lève JobConflict si une tâche du même type tourne déjà."""
+        with self._lock:
+            if single_flight and kind in self._active:
+                raise JobConflict(self._jobs[self._active[kind]])
+            job = Job(id=uuid.uuid4().hex[:12], kind=kind, params=params or {})
+            self._jobs[job.id] = job
+            if single_flight:
+                self._active[kind] = job.id
+            while len(self._jobs) > MAX_JOB_HISTORY:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if oldest.active:
+                    break
+                self._jobs.pop(oldest_id)
+
+        self._runner.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn):
+        job.status, job.started_at = "running", datetime.now()
+        try:
+            job.check_cancelled()
+            job.result = fn(job)
+            job.status, job.phase, job.progress = "succeeded", "Terminé", 1.0
+        except JobCancelled:
+            job.status, job.phase = "cancelled", "Annulé"
+        except Exception as e:
+            traceback.print_exc()
+            job.status, job.phase, job.error = "failed", "Échec", str(e)
+        finally:
+            job.finished_at = datetime.now()
+            with self._lock:
+                if self._active.get(job.kind) == job.id:
+                    self._active.pop(job.kind)
+
+    def get(self, job_id) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self):
+        return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is not None and job.active:
+            job.cancel_event.set()
+        return job
+
+
+job_manager = JobManager()
@@ -0,0 +1,347 @@
+"""
+Envoi des emails hors requête : table d'attente durable + dispatcher dédié.
+
+Les endpoints n'envoient plus rien eux-mêmes : ils ajoutent une ligne
+`mail_outbox` dans la même transaction que leur écriture (`outbox_message`),
+puis réveillent le dispatcher. Un email n'est donc jamais perdu si le
+serveur SMTP est indisponible ou si le processus redémarre.
+
+Le dispatcher tourne dans son propre thread (et sa propre boucle asyncio) :
+- il réserve les emails dus par lots (MAIL_BATCH_SIZE) ;
+- il les envoie sur un petit pool de connexions SMTP persistantes
+  (MAIL_POOL_SIZE), réutilisées d'un lot à l'autre et fermées après
+  MAIL_IDLE_SECONDS d'inactivité ;
+- il respecte un débit maximal (MAIL_RATE_PER_SECOND, seau à jetons) ;
+- un échec temporaire est retenté avec un délai exponentiel
+  (MAIL_RETRY_BASE_SECONDS, plafonné) ; un refus définitif (5xx) ou
+  MAIL_MAX_ATTEMPTS échecs passent l'email en `failed`.
+
+Pour les tests, pointer MAIL_SERVER / MAIL_PORT vers un serveur SMTP local
+(service `mailhog` du docker-compose, profil `mail`).
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+import aiosmtplib
+from sqlalchemy import func, or_, select, update
+
+from .models.models import MailOutbox
+
+POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", "2"))
+BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "50"))
+RATE_PER_SECOND = float(os.getenv("MAIL_RATE_PER_SECOND", "5"))   # 0 = illimité
+MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "6"))
+RETRY_BASE_SECONDS = float(os.getenv("MAIL_RETRY_BASE_SECONDS", "30"))
+RETRY_MAX_SECONDS = float(os.getenv("MAIL_RETRY_MAX_SECONDS", "3600"))
+POLL_SECONDS = float(os.getenv("MAIL_POLL_SECONDS", "5"))
+IDLE_SECONDS = float(os.getenv("MAIL_IDLE_SECONDS", "60"))
+# Un email resté `sending` plus longtemps (processus arrêté en plein envoi) est repris
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def outbox_message(recipient, subject, body, subtype="html"):
+    """Ligne `mail_outbox` à ajouter à la session de l'endpoint avant son commit."""
+    return MailOutbox(recipient=recipient, subject=subject, body=body, subtype=subtype,
+                      status="pending", attempts=0, next_attempt_at=datetime.now())
+
+
+def retry_delay(attempts):
+    """Délai avant la tentative suivante : exponentiel, plafonné, avec un peu d'aléa."""
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def is_permanent(error):
+    # Refus 5xx du serveur (adresse invalide...) : inutile de réessayer
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(500 <= r.code < 600 for r in error.recipients)
+    return isinstance(error, aiosmtplib.SMTPResponseException) and 500 <= error.code < 600 \
+        and not isinstance(error, aiosmtplib.SMTPAuthenticationError)
+
+
+class MailMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.sent = 0
+            self.retried = 0
+            self.failed = 0
+            self.batches = 0
+            self.connections_opened = 0
+            self.send_seconds = 0.0
+            self.max_send_seconds = 0.0
+            self._window = []   # horodatages des derniers envois (débit glissant)
+
+    def record_sent(self, elapsed):
+        with self._lock:
+            self.sent += 1
+            self.send_seconds += elapsed
+            self.max_send_seconds = max(self.max_send_seconds, elapsed)
+            now = time.monotonic()
+            self._window.append(now)
+            while self._window and self._window[0] < now - 60:
+                self._window.pop(0)
+
+    def add(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            recent = sum(1 for t in self._window if t >= now - 60)
+            return {
+                "sent": self.sent,
+                "retried": self.retried,
+                "failed": self.failed,
+                "batches": self.batches,
+                "connections_opened": self.connections_opened,
+                "avg_send_ms": round(self.send_seconds * 1000 / self.sent, 2) if self.sent else 0.0,
+                "max_send_ms": round(self.max_send_seconds * 1000, 2),
+                "sent_per_minute": recent,
+            }
+
+
+class RateLimiter:
+    """Seau à jetons : au plus `rate` envois par seconde (rafale d'une seconde)."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = max(1.0, rate)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class SMTPConnection:
+    """Connexion SMTP ouverte à la demande, gardée entre les lots, rouverte si coupée."""
+
+    def __init__(self, settings, metrics):
+        self.settings = settings
+        self.metrics = metrics
+        self.client = None
+        self.last_used = 0.0
+
+    async def _open(self):
+        s = self.settings
+        self.client = aiosmtplib.SMTP(
+            hostname=s.MAIL_SERVER, port=s.MAIL_PORT, timeout=s.TIMEOUT,
+            use_tls=s.MAIL_SSL_TLS, start_tls=s.MAIL_STARTTLS, validate_certs=s.VALIDATE_CERTS,
+        )
+        await self.client.connect()
+        if s.USE_CREDENTIALS:
+            await self.client.login(s.MAIL_USERNAME, s.MAIL_PASSWORD)
+        self.metrics.add(connections_opened=1)
+
+    async def send(self, message):
+        if self.client is None or not self.client.is_connected:
+            await self._open()
+        try:
+            await self.client.send_message(message)
+        except aiosmtplib.SMTPServerDisconnected:
+            # Connexion fermée par le serveur entre deux lots : une seule reprise
+            await self.close()
+            await self._open()
+            await self.client.send_message(message)
+        self.last_used = time.monotonic()
+
+    async def close(self):
+        if self.client is not None:
+            try:
+                if self.client.is_connected:
+                    await self.client.quit()
+            except aiosmtplib.SMTPException:
+                self.client.close()
+            self.client = None
+
+    async def close_if_idle(self, idle_seconds):
+        if self.client is not None and time.monotonic() - self.last_used > idle_seconds:
+            await self.close()
+
+
+class MailDispatcher:
+    def __init__(self, settings, session_factory, pool_size=POOL_SIZE, batch_size=BATCH_SIZE, rate=RATE_PER_SECOND):
+        self.settings = settings
+        self.session_factory = session_factory
+        self.pool_size = max(1, pool_size)
+        self.batch_size = batch_size
+        self.rate = rate
+        self.metrics = MailMetrics()
+        self._thread = None
+        self._loop = None
+        self._wake = None
+        self._stopping = False
+
+    # --- Cycle de vie ------------------------------------------------
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="unitime-mailer", daemon=True)
+        self._thread.start()
+        ready.wait(timeout=5)
+
+    def stop(self, timeout=10):
+        if self._thread is None:
+            return
+        self._stopping = True
+        self.wake()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def wake(self):
+        """Signale de nouveaux emails (appelable depuis n'importe quel thread)."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake.set)
+
+    def _run(self, ready):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._wake = asyncio.Event()
+        ready.set()
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _main(self):
+        limiter = RateLimiter(self.rate)
+        pool = [SMTPConnection(self.settings, self.metrics) for _ in range(self.pool_size)]
+        try:
+            while not self._stopping:
+                self._wake.clear()
+                try:
+                    batch = await self._loop.run_in_executor(None, self._claim_batch)
+                except Exception as e:
+                    print(f"⚠️ Mailer : lecture de la file impossible ({e})")
+                    batch = []
+                if batch:
+                    results = await self._send_batch(batch, pool, limiter)
+                    await self._loop.run_in_executor(None, self._record_results, results)
+                    continue
+                for conn in pool:
+                    await conn.close_if_idle(IDLE_SECONDS)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for conn in pool:
+                await conn.close()
+
+    # --- File d'attente ----------------------------------------------
+    def _claim_batch(self):
+        """Réserve (status=sending) un lot d'emails dus ; SKIP LOCKED entre processus sous PostgreSQL."""
+        now = datetime.now()
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(MailOutbox).where(or_(
+                    (MailOutbox.status == "pending") & (MailOutbox.next_attempt_at <= now),
+                    (MailOutbox.status == "sending") & (MailOutbox.claimed_at < now - CLAIM_TIMEOUT),
+                )).order_by(MailOutbox.id).limit(self.batch_size).with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not rows:
+                return []
+            db.execute(update(MailOutbox).where(MailOutbox.id.in_([r.id for r in rows]))
+                       .values(status="sending", claimed_at=now))
+            batch = [(r.id, r.recipient, r.subject, r.body, r.subtype, r.attempts) for r in rows]
+            db.commit()
+            return batch
+        finally:
+            db.close()
+
+    def _record_results(self, results):
+        now = datetime.now()
+        db = self.session_factory()
+        try:
+            sent = [mail_id for mail_id, _, error in results if error is None]
+            if sent:
+                db.execute(update(MailOutbox).where(MailOutbox.id.in_(sent))
+                           .values(status="sent", sent_at=now, last_error=None, claimed_at=None))
+            retried = failed = 0
+            for mail_id, attempts, error in results:
+                if error is None:
+                    continue
+                attempts += 1
+                give_up = attempts >= MAX_ATTEMPTS or is_permanent(error)
+                values = {"attempts": attempts, "last_error": str(error)[:500], "claimed_at": None,
+                          "status": "failed" if give_up else "pending"}
+                if not give_up:
+                    values["next_attempt_at"] = now + timedelta(seconds=retry_delay(attempts))
+                db.execute(update(MailOutbox).where(MailOutbox.id == mail_id).values(**values))
+                failed, retried = (failed + 1, retried) if give_up else (failed, retried + 1)
+            db.commit()
+            self.metrics.add(batches=1, retried=retried, failed=failed)
+        finally:
+            db.close()
+
+    # --- Envoi -------------------------------------------------------
+    def _build(self, recipient, subject, body, subtype):
+        message = EmailMessage()
+        message["From"] = self.settings.MAIL_FROM
+        message["To"] = recipient
+        message["Subject"] = subject
+        message.set_content(body, subtype=subtype or "plain")
+        return message
+
+    async def _send_batch(self, batch, pool, limiter):
+        queue = asyncio.Queue()
+        for item in batch:
+            queue.put_nowait(item)
+        results = []
+
+        async def worker(conn):
+            while not queue.empty():
+                mail_id, recipient, subject, body, subtype, attempts = queue.get_nowait()
+                await limiter.acquire()
+                start = time.perf_counter()
+                try:
+                    if not self.settings.SUPPRESS_SEND:
+                        await conn.send(self._build(recipient, subject, body, subtype))
+                    self.metrics.record_sent(time.perf_counter() - start)
+                    results.append((mail_id, attempts, None))
+                except Exception as e:
+                    await conn.close()
+                    results.append((mail_id, attempts, e))
+
+        await asyncio.gather(*(worker(conn) for conn in pool[:len(batch)]))
+        return results
+
+    # --- Suivi -------------------------------------------------------
+    def queue_depth(self, db):
+        return dict(db.execute(select(MailOutbox.status, func.count()).group_by(MailOutbox.status)).all())
+
+    def snapshot(self, db):
+        return {
+            "running": self._thread is not None,
+            "pool_size": self.pool_size,
+            "batch_size": self.batch_size,
+            "rate_per_second": self.rate,
+            "queue": self.queue_depth(db),
+            **self.metrics.snapshot(),
+        }
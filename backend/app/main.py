@@ -1,28 +1,48 @@
-from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import OperationalError
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional
-from datetime import datetime
+from pydantic import AliasChoices, BaseModel, EmailStr, Field
+from typing import List, Literal, Optional
+from datetime import date, datetime
+import asyncio
 import time
-import random 
 import os
+import secrets
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # --- IMPORT EMAIL ---
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
+from fastapi_mail import ConnectionConfig
 
 # Imports internes
-from .database import engine, get_db, Base
+from .database import engine, get_db, Base, SessionLocal, get_async_db, dispose_async_engine, current_async_engine, POOL_SETTINGS, ASYNC_POOL_SETTINGS, STATEMENT_TIMEOUT_MS
+from .db_metrics import async_db_metrics, db_metrics
+from .metrics import MetricsMiddleware, http_metrics
 # [MODIF] Ajout de GlobalNotification dans l'import pour le Point 3
 from .models.models import User, Teacher, Room, Group, Course, TimeSlot, Reservation, Unavailability, GlobalNotification
-
-from fastapi.responses import FileResponse 
-from fpdf import FPDF 
+from .scheduler import load_schedule_input, regenerate, select_target_groups, run_start, start_seeds, best_of
+from .jobs import JobConflict, job_manager
+from .migrations import run_migrations
+from .timeutils import DAY_NAMES
+from .conflicts import CONFLICT_TABLES, conflict_engine, find_slot_collisions
+from .bootstrap import Section, bootstrap_response
+from .events import channels_for, event_hub
+from .notifications import DEFAULT_LIMIT, RetentionWorker, notifications_query
+from .mailer import MailDispatcher, outbox_message
+from .bulk import CHUNK_SIZE as BULK_CHUNK_SIZE, BulkResource, BulkResults, bulk_upsert, chunks, dedupe, existing_keys, iter_records, upsert_statement, validate_rows
+from .stats import STATS_TABLES, compute_stats
+from .cache import VersionedCache, bump, cached_response, etag_matches, get_version, make_etag
+from .pdf_export import build_cards, chunk, render_multipage, render_pages, render_timetable, safe_filename, zip_documents
+from .availability import room_index
+from .pagination import PageParams, paginate, paginate_async, NEXT_CURSOR_HEADER
+
+from fastapi.responses import Response, StreamingResponse
+import io
 
 # =====================================================================
 # 🛡️ SÉCURITÉ : ATTENTE BDD (Empêche le crash au démarrage)
@@ -34,6 +54,7 @@ print("⏳ Connexion à la base de données...")
 for i in range(MAX_RETRIES):
     try:
         Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
         print("✅ Base de données connectée et prête !")
         break
     except OperationalError:
@@ -52,7 +73,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
+# Latences, statuts et requêtes SQL par route (exposés sur /metrics)
+app.add_middleware(MetricsMiddleware)
 
 # =====================================================================
 # 📧 CONFIGURATION EMAIL
@@ -61,14 +85,17 @@ conf = ConnectionConfig(
     MAIL_USERNAME = os.getenv("MAIL_USERNAME"),
     MAIL_PASSWORD = os.getenv("MAIL_PASSWORD"),
     MAIL_FROM = os.getenv("MAIL_FROM"),
-    MAIL_PORT = 587,
-    MAIL_SERVER = "smtp.gmail.com",
-    MAIL_STARTTLS = True,
+    MAIL_PORT = int(os.getenv("MAIL_PORT", "587")),
+    MAIL_SERVER = os.getenv("MAIL_SERVER", "smtp.gmail.com"),
+    MAIL_STARTTLS = os.getenv("MAIL_STARTTLS", "true").lower() in ("1", "true", "yes"),
     MAIL_SSL_TLS = False,
-    USE_CREDENTIALS = True,
+    USE_CREDENTIALS = os.getenv("MAIL_USE_CREDENTIALS", "true").lower() in ("1", "true", "yes"),
     VALIDATE_CERTS = True
 )
 
+# Les emails passent par la table mail_outbox ; ce dispatcher les envoie hors requête
+mail_dispatcher = MailDispatcher(conf, SessionLocal)
+
 # =====================================================================
 # SCHÉMAS
 # =====================================================================
@@ -132,6 +159,57 @@ class UserValidationRequest(BaseModel):
     group_id: str
     semester: str
 
+class BatchValidationItem(BaseModel):
+    user_id: int
+    group_id: Optional[str] = None
+    semester: Optional[str] = None
+
+class BatchValidationRequest(BaseModel):
+    # Soit une liste détaillée (items), soit des identifiants + filière/semestre communs
+    items: List[BatchValidationItem] = []
+    user_ids: List[int] = []
+    group_id: Optional[str] = None
+    semester: Optional[str] = None
+    notify: bool = True
+
+class UserImportRow(BaseModel):
+    nom: str = Field(validation_alias=AliasChoices("nom", "name"))
+    email: EmailStr
+    password: Optional[str] = None
+    role: Optional[Literal["admin", "enseignant", "student"]] = None
+    group_id: Optional[str] = None
+    semester: Optional[str] = None
+    department_id: Optional[str] = None
+    is_active: Optional[bool] = None
+
+# Lignes des imports en masse du catalogue (cellule vide = valeur par défaut / inchangée)
+class RoomImportRow(BaseModel):
+    name: str
+    capacity: Optional[int] = Field(None, ge=0)
+    type: Optional[str] = None
+    equipment: Optional[str] = None
+
+class TeacherImportRow(BaseModel):
+    name: str
+    email: Optional[str] = None
+    department: Optional[str] = None
+
+class GroupImportRow(BaseModel):
+    id: Optional[str] = None
+    name: str
+    student_count: Optional[int] = Field(None, ge=0)
+    filiere: Optional[str] = None
+    semester: Optional[str] = None
+
+class CourseImportRow(BaseModel):
+    name: str
+    code: Optional[str] = None
+    group_id: Optional[str] = None
+    teacher_id: Optional[int] = None
+    hours_cours: Optional[int] = Field(None, ge=0)
+    hours_td: Optional[int] = Field(None, ge=0)
+    hours_tp: Optional[int] = Field(None, ge=0)
+
 # =====================================================================
 # ENDPOINTS AUTHENTIFICATION & EMAIL
 # =====================================================================
@@ -162,8 +240,8 @@ def login(request: LoginRequest, db: Session = Depends(get_db)):
     }
 
 @app.post("/register/")
-async def register(request: RegisterRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == request.email).first()
+async def register(request: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
+    existing_user = await db.scalar(select(User).where(User.email == request.email).limit(1))
     if existing_user:
         raise HTTPException(status_code=400, detail="Cet email est déjà utilisé.")
 
@@ -176,30 +254,29 @@ async def register(request: RegisterRequest, background_tasks: BackgroundTasks,
         is_active=False 
     )
     db.add(new_user)
-    db.commit()
 
-    # ENVOI EMAIL : CONFIRMATION D'INSCRIPTION 
-    message = MessageSchema(
-        subject="Bienvenue sur UniTime - Inscription enregistrée",
-        recipients=[request.email],
-        body=f"""
+    # ENVOI EMAIL : CONFIRMATION D'INSCRIPTION (mis en file dans la même transaction)
+    db.add(outbox_message(
+        request.email,
+        "Bienvenue sur UniTime - Inscription enregistrée",
+        f"""
         <h3>Bonjour {request.name},</h3>
         <p>Votre demande d'inscription a bien été prise en compte.</p>
         <p>Votre compte est actuellement <strong>en attente de validation</strong> par un administrateur.</p>
         <p>Vous recevrez un nouvel email dès que votre accès sera activé.</p>
         <br>
         <p>Cordialement,<br>L'équipe UniTime</p>
-        """,
-        subtype=MessageType.html
-    )
-    fm = FastMail(conf)
-    background_tasks.add_task(fm.send_message, message)
+        """
+    ))
+    await db.commit()
+    bump("users")
+    mail_dispatcher.wake()
 
     return {"message": "Inscription réussie."}
 
 @app.post("/forgot-password/")
-async def forgot_password(request: ForgotPasswordRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == request.email).first()
+async def forgot_password(request: ForgotPasswordRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.email == request.email).limit(1))
     if not user:
         raise HTTPException(status_code=404, detail="Email introuvable")
     
@@ -207,21 +284,20 @@ async def forgot_password(request: ForgotPasswordRequest, background_tasks: Back
     # Lien vers votre Frontend React (port 5173 par défaut)
     reset_link = f"http://localhost:5173/reset-password?email={request.email}"
     
-    message = MessageSchema(
-        subject="Réinitialisation de votre mot de passe - UniTime",
-        recipients=[request.email],
-        body=f"""
+    db.add(outbox_message(
+        request.email,
+        "Réinitialisation de votre mot de passe - UniTime",
+        f"""
         <h3>Demande de réinitialisation</h3>
         <p>Vous avez demandé à réinitialiser votre mot de passe UniTime.</p>
         <p>Cliquez sur le lien ci-dessous pour créer un nouveau mot de passe :</p>
         <a href="{reset_link}" style="padding: 10px 20px; background-color: #6B5DD3; color: white; text-decoration: none; border-radius: 5px;">Réinitialiser mon mot de passe</a>
         <br><br>
         <p>Si vous n'êtes pas à l'origine de cette demande, ignorez cet email.</p>
-        """,
-        subtype=MessageType.html
-    )
-    fm = FastMail(conf)
-    background_tasks.add_task(fm.send_message, message)
+        """
+    ))
+    await db.commit()
+    mail_dispatcher.wake()
 
     return {"message": "Email envoyé"}
 
@@ -232,6 +308,7 @@ def reset_password_confirm(request: NewPasswordRequest, db: Session = Depends(ge
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     user.password_hash = request.new_password
     db.commit()
+    bump("users")
     return {"message": "Mot de passe modifié !"}
 
 # =====================================================================
@@ -243,8 +320,8 @@ def get_pending_users(db: Session = Depends(get_db)):
     return db.query(User).filter(User.is_active == False).all()
 
 @app.put("/admin/users/{user_id}/validate")
-async def validate_user(user_id: int, validation_data: UserValidationRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def validate_user(user_id: int, validation_data: UserValidationRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await db.get(User, user_id)
     if not user: 
         raise HTTPException(status_code=404, detail="Introuvable")
     
@@ -252,27 +329,150 @@ async def validate_user(user_id: int, validation_data: UserValidationRequest, ba
     user.group_id = validation_data.group_id
     user.semester = validation_data.semester
     user.is_active = True
-    
-    db.commit()
 
-    # ENVOI EMAIL : NOTIFICATION DE VALIDATION 
-    message = MessageSchema(
-        subject="Compte UniTime Activé !",
-        recipients=[user.email],
-        body=f"""
-        <h3>Félicitations {user.nom} !</h3>
+    # ENVOI EMAIL : NOTIFICATION DE VALIDATION (mis en file dans la même transaction)
+    db.add(validation_mail(user.email, user.nom, user.group_id, user.semester))
+    await db.commit()
+    bump("users")
+    mail_dispatcher.wake()
+
+    return {"message": "Utilisateur configuré et validé"}
+
+def validation_mail(email, nom, group_id, semester):
+    return outbox_message(
+        email,
+        "Compte UniTime Activé !",
+        f"""
+        <h3>Félicitations {nom} !</h3>
         <p>Votre compte a été validé et configuré par un administrateur.</p>
-        <p><strong>Filière :</strong> {user.group_id}</p>
-        <p><strong>Semestre :</strong> {user.semester}</p>
+        <p><strong>Filière :</strong> {group_id}</p>
+        <p><strong>Semestre :</strong> {semester}</p>
         <br>
         <p>Vous pouvez vous connecter ici : <a href="http://localhost:5173/login">Se connecter</a></p>
-        """,
-        subtype=MessageType.html
+        """
     )
-    fm = FastMail(conf)
-    background_tasks.add_task(fm.send_message, message)
 
-    return {"message": "Utilisateur configuré et validé"}
+def import_mail(email, nom, group_id, semester, generated_password):
+    # Sans mot de passe fourni, l'utilisateur en choisit un via la réinitialisation
+    access = (f'<p>Choisissez votre mot de passe ici : <a href="http://localhost:5173/reset-password?email={email}">Créer mon mot de passe</a></p>'
+              if generated_password else
+              '<p>Vous pouvez vous connecter ici : <a href="http://localhost:5173/login">Se connecter</a></p>')
+    return outbox_message(
+        email,
+        "Votre compte UniTime a été créé",
+        f"""
+        <h3>Bonjour {nom},</h3>
+        <p>Un administrateur a créé votre compte UniTime.</p>
+        <p><strong>Filière :</strong> {group_id or "-"}</p>
+        <p><strong>Semestre :</strong> {semester or "-"}</p>
+        <br>
+        {access}
+        """
+    )
+
+# VALIDATION EN MASSE : une requête de lecture, un UPDATE groupé et un commit par lot
+@app.post("/admin/users/validate-batch")
+async def validate_users_batch(payload: BatchValidationRequest, db: AsyncSession = Depends(get_async_db)):
+    items = payload.items + [BatchValidationItem(user_id=i) for i in payload.user_ids]
+    results = BulkResults(statuses=("validated",))
+    pending, seen = [], set()
+    for n, item in enumerate(items, start=1):
+        group_id, semester = item.group_id or payload.group_id, item.semester or payload.semester
+        if item.user_id in seen:
+            results.error(n, "Utilisateur en double dans la demande", user_id=item.user_id)
+        elif not group_id or not semester:
+            results.error(n, "group_id et semester sont obligatoires", user_id=item.user_id)
+        else:
+            seen.add(item.user_id)
+            pending.append((n, item.user_id, group_id, semester))
+
+    for start in range(0, len(pending), BULK_CHUNK_SIZE):
+        batch = pending[start:start + BULK_CHUNK_SIZE]
+        found = {row.id: row for row in await db.execute(
+            select(User.id, User.email, User.nom).where(User.id.in_([b[1] for b in batch])))}
+        values, mails = [], []
+        for n, user_id, group_id, semester in batch:
+            user = found.get(user_id)
+            if user is None:
+                results.error(n, "Introuvable", user_id=user_id)
+                continue
+            values.append({"id": user_id, "group_id": group_id, "semester": semester, "is_active": True})
+            if payload.notify:
+                mails.append(validation_mail(user.email, user.nom, group_id, semester))
+            results.add(n, "validated", user_id=user_id)
+        if values:
+            await db.execute(update(User), values)
+            db.add_all(mails)
+            await db.commit()
+
+    if results.counts["validated"]:
+        bump("users")
+        mail_dispatcher.wake()
+    return results.to_dict()
+
+# IMPORT EN MASSE (CSV / JSON / NDJSON lus en flux)
+@app.post("/admin/users/import")
+async def import_users(request: Request, mode: Literal["create", "upsert"] = "create", notify: bool = True,
+                       db: AsyncSession = Depends(get_async_db)):
+    """
+    Colonnes : nom (ou name), email, password, role, group_id, semester,
+    department_id, is_active. `mode=create` refuse les emails existants ;
+    `mode=upsert` met à jour les comptes existants (une cellule vide conserve
+    la valeur actuelle). Les nouveaux comptes sont actifs, étudiants par
+    défaut, et reçoivent un email (sauf notify=false).
+    """
+    results = BulkResults()
+    seen, changed = set(), False
+    dialect = db.bind.dialect.name
+    async for batch in chunks(iter_records(request), BULK_CHUNK_SIZE):
+        valid = dedupe(validate_rows(UserImportRow, batch, results), "email", results, seen)
+        if not valid:
+            continue
+        # Unicité des emails : une seule requête par lot, via l'index users.email
+        existing = dict((await db.execute(existing_keys(User, "email", [row.email for _, row in valid]))).all())
+        if mode == "create":
+            for n, row in valid:
+                if row.email in existing:
+                    results.error(n, "Cet email est déjà utilisé.", email=row.email, id=existing[row.email])
+            valid = [(n, row) for n, row in valid if row.email not in existing]
+            if not valid:
+                continue
+
+        rows, generated = [], set()
+        for _, row in valid:
+            data = row.model_dump(exclude={"password"})
+            data["password_hash"] = row.password
+            if row.email not in existing:
+                if not row.password:
+                    data["password_hash"] = secrets.token_urlsafe(12)
+                    generated.add(row.email)
+                if data["is_active"] is None:
+                    data["is_active"] = True
+                if data["role"] is None:
+                    data["role"] = "student"
+            rows.append(data)
+
+        update_columns = [] if mode == "create" else ["nom", "password_hash", "role", "group_id", "semester", "department_id", "is_active"]
+        ids = dict((await db.execute(upsert_statement(dialect, User, rows, "email", update_columns))).all())
+
+        mails = []
+        for n, row in valid:
+            if row.email not in ids:
+                results.error(n, "Cet email est déjà utilisé.", email=row.email)
+            elif row.email in existing:
+                results.add(n, "updated", email=row.email, id=ids[row.email])
+            else:
+                results.add(n, "created", email=row.email, id=ids[row.email])
+                if notify:
+                    mails.append(import_mail(row.email, row.nom, row.group_id, row.semester, row.email in generated))
+        db.add_all(mails)
+        await db.commit()
+        changed = True
+
+    if changed:
+        bump("users")
+        mail_dispatcher.wake()
+    return results.to_dict()
 
 @app.delete("/admin/users/{user_id}")
 def delete_user(user_id: int, db: Session = Depends(get_db)):
@@ -280,81 +480,152 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
     if not user: raise HTTPException(404, "Introuvable")
     db.delete(user)
     db.commit()
+    bump("users")
     return {"message": "Supprimé"}
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Métriques au format texte Prometheus."""
+    pool = db_metrics.snapshot(engine)["pool"]
+    async_engine = current_async_engine()
+    async_pool = async_db_metrics.snapshot(async_engine.sync_engine if async_engine is not None else None)["pool"]
+    gauges = [
+        ("unitime_db_pool_checked_out", "gauge", "Connexions empruntées au pool.", pool.get("checked_out", 0)),
+        ("unitime_db_pool_overflow", "gauge", "Connexions ouvertes au-delà de pool_size.", pool.get("overflow", 0)),
+        ("unitime_db_pool_checkout_timeouts_total", "counter", "Checkouts abandonnés (pool épuisé).", pool["checkout_timeouts"]),
+        ("unitime_db_async_pool_checked_out", "gauge", "Connexions empruntées au pool asynchrone.", async_pool.get("checked_out", 0)),
+        ("unitime_db_async_pool_checkout_timeouts_total", "counter", "Checkouts asynchrones abandonnés (pool épuisé).", async_pool["checkout_timeouts"]),
+        ("unitime_jobs_running", "gauge", "Tâches de fond en cours.", sum(1 for j in job_manager.list() if j.active)),
+        ("unitime_sse_connections", "gauge", "Clients abonnés au flux /notifications/stream.", event_hub.connections),
+        ("unitime_sse_events_total", "counter", "Événements publiés sur le hub.", event_hub.published),
+        ("unitime_mail_sent_total", "counter", "Emails envoyés par le dispatcher.", mail_dispatcher.metrics.sent),
+        ("unitime_mail_retried_total", "counter", "Envois en échec temporaire, replanifiés.", mail_dispatcher.metrics.retried),
+        ("unitime_mail_failed_total", "counter", "Emails abandonnés (refus définitif ou trop d'essais).", mail_dispatcher.metrics.failed),
+    ]
+    return Response(content=http_metrics.render(gauges), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/admin/db/metrics")
+def get_db_metrics(reset: bool = False):
+    """
+    État du pool de connexions et statistiques SQL par session (requête HTTP).
+    `async` : même chose pour le pool du moteur asynchrone (get_async_db).
+    """
+    async_engine = current_async_engine()
+    data = db_metrics.snapshot(engine)
+    data["config"] = {**POOL_SETTINGS, "statement_timeout_ms": STATEMENT_TIMEOUT_MS}
+    data["async"] = async_db_metrics.snapshot(async_engine.sync_engine if async_engine is not None else None)
+    data["async"]["config"] = ASYNC_POOL_SETTINGS
+    if reset:
+        db_metrics.reset()
+        async_db_metrics.reset()
+    return data
+
+@app.get("/admin/mail/metrics")
+def get_mail_metrics(reset: bool = False, db: Session = Depends(get_db)):
+    """File d'attente des emails (par statut) et débit du dispatcher."""
+    data = mail_dispatcher.snapshot(db)
+    if reset:
+        mail_dispatcher.metrics.reset()
+    return data
+
 # =====================================================================
 # ENDPOINTS LECTURE (GETTERS)
 # =====================================================================
 
 @app.get("/seances/")
-def get_all_seances(db: Session = Depends(get_db)):
-    return db.query(TimeSlot).all()
+def get_all_seances(request: Request, group_id: Optional[str] = None, teacher_id: Optional[int] = None,
+                    room_id: Optional[int] = None, day: Optional[str] = None, type: Optional[str] = None,
+                    page: PageParams = Depends(), db: Session = Depends(get_db)):
+    def build(headers):
+        query = db.query(TimeSlot)
+        if group_id is not None: query = query.filter(TimeSlot.group_id == group_id)
+        if teacher_id is not None: query = query.filter(TimeSlot.teacher_id == teacher_id)
+        if room_id is not None: query = query.filter(TimeSlot.room_id == room_id)
+        if day is not None: query = query.filter(TimeSlot.day == day)
+        if type is not None: query = query.filter(TimeSlot.type == type)
+        return paginate(query, TimeSlot, page, headers)
+    return cached_response(request, ("time_slots",), build)
 
 @app.get("/teachers/")
-def get_all_teachers(db: Session = Depends(get_db)):
-    return db.query(Teacher).all()
+def get_all_teachers(request: Request, department: Optional[str] = None,
+                     page: PageParams = Depends(), db: Session = Depends(get_db)):
+    def build(headers):
+        query = db.query(Teacher)
+        if department is not None: query = query.filter(Teacher.department == department)
+        return paginate(query, Teacher, page, headers)
+    return cached_response(request, ("teachers",), build)
 
 @app.get("/rooms/")
-def get_all_rooms(db: Session = Depends(get_db)):
-    return db.query(Room).all()
+def get_all_rooms(request: Request, type: Optional[str] = None, min_capacity: Optional[int] = None,
+                  page: PageParams = Depends(), db: Session = Depends(get_db)):
+    def build(headers):
+        query = db.query(Room)
+        if type is not None: query = query.filter(Room.type == type)
+        if min_capacity is not None: query = query.filter(Room.capacity >= min_capacity)
+        return paginate(query, Room, page, headers)
+    return cached_response(request, ("rooms",), build)
 
 @app.get("/groups/")
-def get_all_groups(db: Session = Depends(get_db)):
-    return db.query(Group).all()
+def get_all_groups(request: Request, db: Session = Depends(get_db)):
+    return cached_response(request, ("groups",), lambda headers: db.query(Group).all())
 
 @app.get("/courses/")
-def get_all_courses(db: Session = Depends(get_db)):
-    return db.query(Course).all()
+def get_all_courses(request: Request, group_id: Optional[str] = None, teacher_id: Optional[int] = None,
+                    page: PageParams = Depends(), db: Session = Depends(get_db)):
+    def build(headers):
+        query = db.query(Course)
+        if group_id is not None: query = query.filter(Course.group_id == group_id)
+        if teacher_id is not None: query = query.filter(Course.teacher_id == teacher_id)
+        return paginate(query, Course, page, headers)
+    return cached_response(request, ("courses",), build)
 
 @app.get("/teachers/{teacher_id}/courses")
 def get_teacher_courses(teacher_id: int, db: Session = Depends(get_db)):
     return db.query(Course).all()
 
+# Tables dont dépend la projection d'un emploi du temps
+TIMETABLE_TABLES = ("time_slots", "courses", "teachers", "rooms")
+
+def build_seances(db, condition, default_teacher):
+    """Une seule requête (jointures externes) au lieu de 3 .get() par créneau."""
+    rows = db.query(
+        TimeSlot.id, TimeSlot.day, TimeSlot.start_time, TimeSlot.end_time, TimeSlot.type, TimeSlot.group_id,
+        Course.name, Teacher.name, Room.name
+    ).outerjoin(TimeSlot.course).outerjoin(TimeSlot.teacher).outerjoin(TimeSlot.room
+    ).filter(condition).order_by(TimeSlot.id).all()
+
+    return [
+        SeanceDisplay(
+            id=slot_id,
+            course_name=c_name or "Cours Inconnu",
+            teacher_name=t_name or default_teacher,
+            room_name=r_name or "Salle Inconnue",
+            day=day, start_time=start, end_time=end, type=s_type, group_id=group_id
+        ).model_dump()
+        for slot_id, day, start, end, s_type, group_id, c_name, t_name, r_name in rows
+    ]
+
+# Déclaré avant /timetable/{group_id} pour ne pas être capturé par ce dernier
+@app.get("/timetable/conflicts")
+def get_conflicts(db: Session = Depends(get_db)):
+    return conflict_engine.get(db)
+
 # 👇 Endpoint Robuste pour Étudiant
 @app.get("/timetable/{group_id}", response_model=List[SeanceDisplay])
-def get_timetable(group_id: str, db: Session = Depends(get_db)):
-    slots = db.query(TimeSlot).filter(TimeSlot.group_id == group_id).all()
-    results = []
-    for slot in slots:
-        c = db.query(Course).get(slot.course_id)
-        t = db.query(Teacher).get(slot.teacher_id)
-        r = db.query(Room).get(slot.room_id)
-        
-        results.append({
-            "id": slot.id, 
-            "course_name": c.name if c else "Cours Inconnu", 
-            "teacher_name": t.name if t else "Prof Inconnu", 
-            "room_name": r.name if r else "Salle Inconnue",
-            "day": slot.day, 
-            "start_time": slot.start_time, 
-            "end_time": slot.end_time,
-            "type": slot.type, 
-            "group_id": slot.group_id
-        })
-    return results
+def get_timetable(group_id: str, request: Request, db: Session = Depends(get_db)):
+    # La projection JSON est précalculée et resservie tant que les tables n'ont pas changé
+    return cached_response(
+        request, TIMETABLE_TABLES,
+        lambda headers: build_seances(db, TimeSlot.group_id == group_id, "Prof Inconnu")
+    )
 
 # Endpoint pour l'emploi du temps du PROFESSEUR
 @app.get("/timetable/teacher/{teacher_id}", response_model=List[SeanceDisplay])
-def get_teacher_timetable(teacher_id: int, db: Session = Depends(get_db)):
-    slots = db.query(TimeSlot).filter(TimeSlot.teacher_id == teacher_id).all()
-    results = []
-    for slot in slots:
-        c = db.query(Course).get(slot.course_id)
-        t = db.query(Teacher).get(slot.teacher_id)
-        r = db.query(Room).get(slot.room_id)
-        
-        results.append({
-            "id": slot.id, 
-            "course_name": c.name if c else "Cours Inconnu", 
-            "teacher_name": t.name if t else "Moi-même", 
-            "room_name": r.name if r else "Salle Inconnue",
-            "day": slot.day, 
-            "start_time": slot.start_time, 
-            "end_time": slot.end_time,
-            "type": slot.type, 
-            "group_id": slot.group_id
-        })
-    return results
+def get_teacher_timetable(teacher_id: int, request: Request, db: Session = Depends(get_db)):
+    return cached_response(
+        request, TIMETABLE_TABLES,
+        lambda headers: build_seances(db, TimeSlot.teacher_id == teacher_id, "Moi-même")
+    )
 
 # =====================================================================
 # [NOUVEAU] GESTION DES NOTIFICATIONS GLOBALES (Point 3)
@@ -370,14 +641,51 @@ def create_notification(notif: NotificationCreate, db: Session = Depends(get_db)
     )
     db.add(new_notif)
     db.commit()
+    bump("global_notifications")
+    event_hub.publish("notification", notification_payload(new_notif),
+                      "all" if new_notif.target_role == "all" else f"role:{new_notif.target_role}")
     return new_notif
 
+def notification_payload(n):
+    return {"id": n.id, "title": n.title, "message": n.message, "type": n.type,
+            "target_role": n.target_role, "created_at": n.created_at}
+
+# Flux temps réel (SSE) : remplace le rechargement périodique de /notifications/
+@app.get("/notifications/stream")
+async def stream_notifications(request: Request, role: str = "all", group_id: Optional[str] = None,
+                               teacher_id: Optional[int] = None, last_id: Optional[int] = None):
+    # Le navigateur renvoie Last-Event-ID à la reconnexion ; last_id sert au premier abonnement
+    header = request.headers.get("last-event-id")
+    if header and header.isdigit():
+        last_id = int(header)
+    return StreamingResponse(
+        event_hub.stream(request, channels_for(role, group_id, teacher_id), last_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/notifications/")
-def get_notifications(role: str = "all", db: Session = Depends(get_db)):
-    # On récupère les notifs destinées à "all" OU au rôle spécifique
-    return db.query(GlobalNotification).filter(
-        or_(GlobalNotification.target_role == "all", GlobalNotification.target_role == role)
-    ).order_by(GlobalNotification.created_at.desc()).all()
+def get_notifications(response: Response, role: str = "all", since_id: Optional[int] = None, since: Optional[datetime] = None,
+                      page: PageParams = Depends(), db: Session = Depends(get_db)):
+    """
+    Notifications destinées à "all" OU au rôle demandé. Sans curseur : les
+    plus récentes d'abord (`limit`, 50 par défaut). Avec `since_id` / `since` :
+    uniquement les nouveautés, dans l'ordre chronologique (reprise au dernier vu).
+    """
+    if page.limit is None:
+        page.limit = DEFAULT_LIMIT
+    incremental = since_id is not None or since is not None
+    query = notifications_query(db, role, since_id, since)
+    return paginate(query, GlobalNotification, page, response.headers, descending=not incremental)
+
+@app.post("/admin/notifications/archive", status_code=202)
+def archive_old_notifications():
+    """Lance tout de suite la rétention (archivage des notifications anciennes ou en surnombre)."""
+    try:
+        job = job_manager.submit("notification_retention", lambda job: retention_worker.run_once())
+    except JobConflict as e:
+        raise HTTPException(status_code=409, detail={"message": "Archivage déjà en cours", "job_id": e.job.id})
+    return {"message": "Archivage lancé", "job_id": job.id, "status": job.status}
 
 # =====================================================================
 # FONCTIONNALITÉS PROFESSEUR
@@ -385,21 +693,9 @@ def get_notifications(role: str = "all", db: Session = Depends(get_db)):
 
 # 1. RECHERCHE DE SALLE
 @app.get("/rooms/search/")
-def search_rooms(day: str, start_time: str, end_time: str, capacity: int = 0, db: Session = Depends(get_db)):
-    candidates = db.query(Room).filter(Room.capacity >= capacity).all()
-    available = []
-    
-    for room in candidates:
-        collision = db.query(TimeSlot).filter(
-            TimeSlot.room_id == room.id,
-            TimeSlot.day == day,
-            TimeSlot.start_time < end_time,
-            TimeSlot.end_time > start_time
-        ).first()
-        
-        if not collision:
-            available.append(room)
-    return available
+def search_rooms(day: str, start_time: str, end_time: str, capacity: int = 0, type: Optional[str] = None, db: Session = Depends(get_db)):
+    # Index en mémoire (séances + réservations approuvées) au lieu d'une requête par salle
+    return room_index.free_rooms(db, day, start_time, end_time, capacity, type)
 
 # 2. CRÉATION RÉSERVATION (Gère maintenant les modules/groupes pour notifications)
 @app.post("/reservations/")
@@ -423,6 +719,7 @@ def create_reservation(res: ReservationCreate, db: Session = Depends(get_db)):
     )
     db.add(new_res)
     db.commit()
+    bump("reservations")
     return {"message": "Demande envoyée"}
 
 # 3. CRÉATION INDISPONIBILITÉ (Gère la date précise)
@@ -446,95 +743,157 @@ def create_unavailability(un: UnavailabilityCreate, db: Session = Depends(get_db
     )
     db.add(new_un)
     db.commit()
+    conflict_engine.touch((new_un.day_of_week,), lambda: bump("unavailabilities"))
+    # Les étudiants voient toutes les absences ; l'enseignant concerné aussi
+    event_hub.publish("unavailability", {
+        "id": new_un.id, "teacher_id": new_un.teacher_id, "date": new_un.date,
+        "day": new_un.day, "start_time": new_un.start_time, "end_time": new_un.end_time, "reason": new_un.reason,
+    }, "role:student", "role:admin", f"teacher:{new_un.teacher_id}")
     return {"message": "Indisponibilité enregistrée"}
 
 #Endpoint pour permettre aux étudiants de voir les absences des profs
 @app.get("/unavailabilities/")
-def get_all_unavailabilities(db: Session = Depends(get_db)):
-    return db.query(Unavailability).all()
+def get_all_unavailabilities(response: Response, teacher_id: Optional[int] = None,
+                             date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                             page: PageParams = Depends(), db: Session = Depends(get_db)):
+    query = db.query(Unavailability)
+    if teacher_id is not None: query = query.filter(Unavailability.teacher_id == teacher_id)
+    if date_from is not None: query = query.filter(Unavailability.date >= date_from)
+    if date_to is not None: query = query.filter(Unavailability.date <= date_to)
+    return paginate(query, Unavailability, page, response.headers)
 
 # =====================================================================
 # GÉNÉRATION INTELLIGENTE
 # =====================================================================
 
-def is_slot_available(db, day, start, teacher_id, room_id, group_name):
-    if db.query(TimeSlot).filter_by(day=day, start_time=start, teacher_id=teacher_id).first(): return False
-    if db.query(TimeSlot).filter_by(day=day, start_time=start, room_id=room_id).first(): return False
-    if db.query(TimeSlot).filter_by(day=day, start_time=start, group_id=group_name).first(): return False
-    return True
-
-def count_daily_hours(db, group_name, day):
-    return db.query(TimeSlot).filter_by(group_id=group_name, day=day).count() * 2
-
-def check_pedagogical_constraints(db, group_name, course_id, day, s_type):
-    if s_type != "Cours":
-        has_cours = db.query(TimeSlot).filter_by(group_id=group_name, course_id=course_id, day=day, type="Cours").first()
-        if has_cours: return False
-    if count_daily_hours(db, group_name, day) >= 6: return False
-    return True
-
-@app.post("/timetable/generate")
-def generate_timetable_auto(db: Session = Depends(get_db)):
-    db.query(TimeSlot).delete()
-    db.commit()
+def split_csv(value):
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
 
-    all_groups = db.query(Group).all()
-    all_rooms = db.query(Room).all()
-    all_teachers = db.query(Teacher).all()
+def run_generation_job(job, groups, teacher_ids, room_ids, keep_locked, seed, starts=1, improve=False):
+    """Corps d'une tâche de génération (thread de pilotage, calcul dans le pool de processus)."""
+    db = SessionLocal()
+    try:
+        job.set_phase("Chargement des données", 0.05)
+        data = load_schedule_input(db)
+        if not data.groups or not data.rooms:
+            return {"message": "Données insuffisantes (Groupes/Salles) pour générer."}
+
+        existing = db.query(TimeSlot).all()
+        targets = select_target_groups(data, existing, groups, teacher_ids, room_ids)
+        if not targets:
+            raise ValueError("Aucun groupe concerné par ces filtres")
+
+        best = {}
+
+        def on_start_done(done, total, candidate):
+            # Progression de 20 % à 80 % au fil des départs terminés
+            if "score" not in best or candidate.score < best["score"]:
+                best["score"] = candidate.score
+                job.placed, job.unplaced = len(candidate.result.placements), len(candidate.result.unplaced)
+            job.set_phase(f"Placement des séances ({done}/{total} essais)", 0.2 + 0.6 * done / total)
+
+        def solve(engine, target_groups, already_placed):
+            job.set_phase("Placement des séances", 0.2)
+            candidates = job_manager.map_in_process(
+                job, run_start,
+                [(engine, target_groups, s, already_placed, improve) for s in start_seeds(starts, seed)],
+                on_start_done
+            )
+            winner = best_of(candidates)
+            best.update(seed=winner.seed, breakdown=winner.breakdown)
+            job.set_phase("Écriture de l'emploi du temps", 0.8)
+            return winner.result
+
+        report = regenerate(db, data, targets, keep_locked=keep_locked, existing_slots=existing, solve=solve)
+        job.check_cancelled()
+        db.commit()
+        # Jours modifiés inconnus ici : les conflits seront entièrement recalculés
+        conflict_engine.touch(None, lambda: bump("time_slots"))
+
+        placed = report.inserted + report.unchanged
+        return {
+            "message": f"Génération terminée : {placed} séances créées.",
+            "placed": placed,
+            "unplaced": report.unplaced,
+            "groups": report.target_groups,
+            "kept": report.kept,
+            "inserted": report.inserted,
+            "deleted": report.deleted,
+            "unchanged": report.unchanged,
+            "starts": starts,
+            "seed": best.get("seed"),
+            "score": best.get("score"),
+            "quality": best.get("breakdown")
+        }
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
 
-    if not all_groups or not all_rooms:
-        return {"message": "Données insuffisantes (Groupes/Salles) pour générer."}
+@app.post("/timetable/generate", status_code=202)
+def generate_timetable_auto(groups: Optional[str] = None, teachers: Optional[str] = None, rooms: Optional[str] = None,
+                            keep_locked: bool = True, seed: Optional[int] = None,
+                            starts: int = Query(1, ge=1, le=64), improve: bool = False):
+    """
+    Lance la génération en tâche de fond et renvoie l'identifiant à suivre
+    sur GET /jobs/{id}. Sans filtre, tout le campus est recalculé ; avec
+    `groups`, `teachers` ou `rooms` (listes séparées par des virgules), seuls
+    les groupes concernés le sont. `keep_locked` conserve les séances
+    verrouillées et les rattrapages. `starts` lance plusieurs essais
+    (graines différentes) en parallèle et garde le mieux noté ; `improve`
+    ajoute une recherche locale pour placer les séances restantes.
+    """
+    try:
+        teacher_ids = [int(t) for t in split_csv(teachers)]
+        room_ids = [int(r) for r in split_csv(rooms)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="teachers et rooms attendent des identifiants numériques")
 
-    time_slots = [("08:00", "10:00"), ("10:15", "12:15"), ("14:00", "16:00"), ("16:15", "18:15")]
-    days = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"]
-    assigned_count = 0
-    
-    for group in all_groups:
-        courses = db.query(Course).filter(Course.group_id == group.id).all()
-        random.shuffle(courses)
-
-        pending_sessions = []
-        for course in courses:
-            h_cours = int(course.hours_cours or 0)
-            h_td = int(course.hours_td or 0)
-            h_tp = int(course.hours_tp or 0)
-
-            for _ in range((h_cours + 1) // 2): pending_sessions.append({"course": course, "type": "Cours"})
-            for _ in range((h_td + 1) // 2):    pending_sessions.append({"course": course, "type": "TD"})
-            for _ in range((h_tp + 1) // 2):    pending_sessions.append({"course": course, "type": "TP"})
-
-        pending_sessions.sort(key=lambda x: (x["type"] != "Cours"))
-
-        for item in pending_sessions:
-            course, s_type, placed = item["course"], item["type"], False
-            t_id = course.teacher_id or (all_teachers[course.id % len(all_teachers)].id if all_teachers else None)
-            if not t_id: continue
-
-            req_type = "Amphi" if s_type == "Cours" else ("Labo Info" if s_type == "TP" else "Standard")
-            valid_rooms = sorted(all_rooms, key=lambda r: (r.type != req_type, r.capacity < (group.student_count or 0)))
-
-            pref_days = list(days)
-            if s_type != "Cours": random.shuffle(pref_days)
-
-            for day in pref_days:
-                if not check_pedagogical_constraints(db, group.name, course.id, day, s_type): continue
-                for start, end in time_slots:
-                    for room in valid_rooms:
-                        if is_slot_available(db, day, start, t_id, room.id, group.name):
-                            new_slot = TimeSlot(
-                                course_id=course.id, teacher_id=t_id, room_id=room.id,
-                                group_id=group.name, day=day, start_time=start, end_time=end, type=s_type
-                            )
-                            db.add(new_slot)
-                            db.flush() 
-                            assigned_count += 1
-                            placed = True
-                            break
-                    if placed: break
-                if placed: break
-    
+    params = {"groups": split_csv(groups), "teachers": teacher_ids, "rooms": room_ids,
+              "keep_locked": keep_locked, "seed": seed, "starts": starts, "improve": improve}
+    try:
+        job = job_manager.submit(
+            "timetable_generation",
+            lambda job: run_generation_job(job, params["groups"], teacher_ids, room_ids, keep_locked, seed, starts, improve),
+            params
+        )
+    except JobConflict as e:
+        raise HTTPException(status_code=409, detail={"message": "Une génération est déjà en cours", "job_id": e.job.id})
+
+    return {"message": "Génération lancée", "job_id": job.id, "status": job.status}
+
+# =====================================================================
+# SUIVI DES TÂCHES DE FOND
+# =====================================================================
+@app.get("/jobs/")
+def list_jobs():
+    return [job.to_dict() for job in job_manager.list()]
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Tâche introuvable")
+    return job.to_dict()
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Tâche introuvable")
+    return job.to_dict()
+
+@app.put("/seances/{slot_id}/lock")
+def lock_seance(slot_id: int, locked: bool = True, db: Session = Depends(get_db)):
+    slot = db.query(TimeSlot).filter(TimeSlot.id == slot_id).first()
+    if not slot:
+        raise HTTPException(status_code=404, detail="Séance introuvable")
+    slot.locked = locked
     db.commit()
-    return {"message": f"Génération terminée : {assigned_count} séances créées."}
+    # Le verrou ne change aucun conflit
+    conflict_engine.touch((), lambda: bump("time_slots"))
+    return {"message": "Séance verrouillée" if locked else "Séance déverrouillée"}
 
 # =====================================================================
 # CRUD ADMIN
@@ -547,17 +906,20 @@ def add_room(room: dict, db: Session = Depends(get_db)):
         if existing:
             for k, v in room.items(): setattr(existing, k, v)
             db.commit()
+            bump("rooms")
             return {"message": "Salle modifiée"}
     
     new_room = Room(**room)
     db.add(new_room)
     db.commit()
+    bump("rooms")
     return {"message": "Salle ajoutée"}
 
 @app.delete("/admin/rooms/{room_id}")
 def delete_room(room_id: int, db: Session = Depends(get_db)):
     db.query(Room).filter(Room.id == room_id).delete()
     db.commit()
+    bump("rooms")
     return {"message": "Supprimé"}
 
 @app.post("/admin/teachers/")
@@ -567,6 +929,7 @@ def add_teacher(teacher: dict, db: Session = Depends(get_db)):
         if existing:
             for k, v in teacher.items(): setattr(existing, k, v)
             db.commit()
+            bump("teachers")
             return {"message": "Prof modifié"}
 
     valid_keys = ["name", "email", "department"]
@@ -574,12 +937,14 @@ def add_teacher(teacher: dict, db: Session = Depends(get_db)):
     new_t = Teacher(**clean_data)
     db.add(new_t)
     db.commit()
+    bump("teachers")
     return {"message": "Ajouté"}
 
 @app.delete("/admin/teachers/{t_id}")
 def delete_teacher(t_id: int, db: Session = Depends(get_db)):
     db.query(Teacher).filter(Teacher.id == t_id).delete()
     db.commit()
+    bump("teachers")
     return {"message": "Supprimé"}
 
 @app.post("/admin/groups/")
@@ -590,17 +955,20 @@ def add_group(group: dict, db: Session = Depends(get_db)):
             existing.name = group["name"]
             existing.student_count = group["student_count"]
             db.commit()
+            bump("groups")
             return {"message": "Groupe modifié"}
 
     new_g = Group(name=group["name"], student_count=group.get("student_count", 30))
     db.add(new_g)
     db.commit()
+    bump("groups")
     return {"message": "Ajouté"}
 
 @app.delete("/admin/groups/{g_id}")
 def delete_group(g_id: int, db: Session = Depends(get_db)):
     db.query(Group).filter(Group.id == g_id).delete()
     db.commit()
+    bump("groups")
     return {"message": "Supprimé"}
 
 @app.post("/admin/courses/")
@@ -610,38 +978,102 @@ def add_course(course: dict, db: Session = Depends(get_db)):
         if existing:
             for k, v in course.items(): setattr(existing, k, v)
             db.commit()
+            bump("courses")
             return {"message": "Module modifié"}
 
     if "code" not in course: course["code"] = course["name"][:5].upper()
     new_c = Course(**course)
     db.add(new_c)
     db.commit()
+    bump("courses")
     return {"message": "Ajouté"}
 
 @app.delete("/admin/courses/{c_id}")
 def delete_course(c_id: int, db: Session = Depends(get_db)):
     db.query(Course).filter(Course.id == c_id).delete()
     db.commit()
+    bump("courses")
     return {"message": "Supprimé"}
 
+# --- IMPORT EN MASSE DU CATALOGUE (CSV / JSON / NDJSON, upsert par lots) ---
+def default_group_id(row):
+    # Comme le reste de l'application : identifiant du groupe = son nom
+    if not row.id:
+        row.id = row.name
+    return row
+
+def default_course_code(row):
+    # Même règle que add_course
+    if not row.code:
+        row.code = row.name[:5].upper()
+    return row
+
+async def check_course_refs(db, valid, results):
+    """Groupes et enseignants référencés : une requête par table pour tout le lot."""
+    group_ids = {row.group_id for _, row in valid if row.group_id}
+    teacher_ids = {row.teacher_id for _, row in valid if row.teacher_id is not None}
+    known_groups = set((await db.execute(select(Group.id).where(Group.id.in_(group_ids)))).scalars()) if group_ids else set()
+    known_teachers = set((await db.execute(select(Teacher.id).where(Teacher.id.in_(teacher_ids)))).scalars()) if teacher_ids else set()
+    kept = []
+    for n, row in valid:
+        if row.group_id and row.group_id not in known_groups:
+            results.error(n, f"Groupe inconnu : {row.group_id}", key=row.code)
+        elif row.teacher_id is not None and row.teacher_id not in known_teachers:
+            results.error(n, f"Enseignant inconnu : {row.teacher_id}", key=row.code)
+        else:
+            kept.append((n, row))
+    return kept
+
+BULK_RESOURCES = {
+    "rooms": BulkResource(Room, RoomImportRow, key="name", table="rooms", defaults={"type": "Standard", "equipment": ""}),
+    "teachers": BulkResource(Teacher, TeacherImportRow, key="name", table="teachers"),
+    "groups": BulkResource(Group, GroupImportRow, key="name", table="groups", defaults={"student_count": 30},
+                           prepare=default_group_id),
+    "courses": BulkResource(Course, CourseImportRow, key="code", table="courses",
+                            defaults={"hours_cours": 0, "hours_td": 0, "hours_tp": 0},
+                            prepare=default_course_code, check=check_course_refs),
+}
+
+@app.post("/admin/rooms/bulk")
+async def bulk_rooms(request: Request, mode: Literal["create", "upsert"] = "upsert", db: AsyncSession = Depends(get_async_db)):
+    """Salles identifiées par leur nom : name, capacity, type, equipment."""
+    return await bulk_upsert(db, iter_records(request), BULK_RESOURCES["rooms"], mode)
+
+@app.post("/admin/teachers/bulk")
+async def bulk_teachers(request: Request, mode: Literal["create", "upsert"] = "upsert", db: AsyncSession = Depends(get_async_db)):
+    """Enseignants identifiés par leur nom : name, email, department."""
+    return await bulk_upsert(db, iter_records(request), BULK_RESOURCES["teachers"], mode)
+
+@app.post("/admin/groups/bulk")
+async def bulk_groups(request: Request, mode: Literal["create", "upsert"] = "upsert", db: AsyncSession = Depends(get_async_db)):
+    """Groupes identifiés par leur nom : id (= nom par défaut), name, student_count, filiere, semester."""
+    return await bulk_upsert(db, iter_records(request), BULK_RESOURCES["groups"], mode)
+
+@app.post("/admin/courses/bulk")
+async def bulk_courses(request: Request, mode: Literal["create", "upsert"] = "upsert", db: AsyncSession = Depends(get_async_db)):
+    """Modules identifiés par leur code : name, code, group_id, teacher_id, hours_cours, hours_td, hours_tp."""
+    return await bulk_upsert(db, iter_records(request), BULK_RESOURCES["courses"], mode)
+
 # --- AUTRES ENDPOINTS ---
-@app.get("/timetable/conflicts")
-def get_conflicts(db: Session = Depends(get_db)):
-    return []
 
 @app.get("/stats/")
-def get_stats(db: Session = Depends(get_db)):
-    return {
-        "rooms_count": db.query(Room).count(),
-        "teachers_count": db.query(Teacher).count(),
-        "students_count": db.query(User).filter(User.role == "student").count(),
-        "sessions_count": db.query(TimeSlot).count(),
-        "courses_count": db.query(Course).count()
-    }
+def get_stats(request: Request, db: Session = Depends(get_db)):
+    # Compteurs + répartitions en deux requêtes, mémorisés jusqu'à la prochaine écriture
+    return cached_response(request, STATS_TABLES, lambda headers: compute_stats(db))
 
 @app.get("/reservations/")
-def get_reservations(db: Session = Depends(get_db)):
-    return db.query(Reservation).all()
+def get_reservations(response: Response, status: Optional[str] = None, teacher_id: Optional[int] = None,
+                     room_id: Optional[int] = None, group_id: Optional[str] = None,
+                     date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                     page: PageParams = Depends(), db: Session = Depends(get_db)):
+    query = db.query(Reservation)
+    if status is not None: query = query.filter(Reservation.status == status)
+    if teacher_id is not None: query = query.filter(Reservation.teacher_id == teacher_id)
+    if room_id is not None: query = query.filter(Reservation.room_id == room_id)
+    if group_id is not None: query = query.filter(Reservation.group_id == group_id)
+    if date_from is not None: query = query.filter(Reservation.date >= date_from)
+    if date_to is not None: query = query.filter(Reservation.date <= date_to)
+    return paginate(query, Reservation, page, response.headers)
 
 # [MODIF] VALIDATION INTELLIGENTE AVEC CRÉATION DE CRÉNEAU (Point 2 & 5)
 @app.put("/reservations/{reservation_id}")
@@ -650,30 +1082,68 @@ def update_reservation_status(reservation_id: int, status_update: ReservationSta
     if not reservation:
         raise HTTPException(status_code=404, detail="Réservation introuvable")
     
+    creates_slot = status_update.status == "approved" and reservation.room_id and reservation.group_id
+    if creates_slot:
+        # Refuse une validation qui provoquerait une double réservation
+        collisions = find_slot_collisions(
+            db, reservation.day_of_week, reservation.start_min, reservation.end_min,
+            teacher_id=reservation.teacher_id, room_id=reservation.room_id, group_id=reservation.group_id
+        )
+        if collisions:
+            raise HTTPException(status_code=409, detail={
+                "message": "Créneau déjà occupé (enseignant, salle ou groupe)",
+                "slots": [c.id for c in collisions]
+            })
+
+    was_approved = reservation.status == "approved"
     reservation.status = status_update.status
-    db.commit()
+    occupies = status_update.status == "approved" and not was_approved
 
     # Si c'est validé, on CRÉE le créneau dans l'emploi du temps !
-    if status_update.status == "approved" and reservation.room_id and reservation.group_id:
-        days_map = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
-        day_name = days_map[reservation.date.weekday()]
-        
+    if creates_slot:
         new_slot = TimeSlot(
             course_id=reservation.course_id or 1, # Fallback si pas de module
             teacher_id=reservation.teacher_id,
             room_id=reservation.room_id,
             group_id=reservation.group_id,
-            day=day_name,
+            day=DAY_NAMES[reservation.date.weekday()],
             start_time=reservation.start_time,
             end_time=reservation.end_time,
             type="Rattrapage"
         )
         db.add(new_slot)
         db.commit()
+        # Séance et réservation occupent le même créneau : ajout en place dans l'index des salles
+        conflict_engine.touch((reservation.day_of_week,), lambda: room_index.occupy(
+            reservation.room_id, reservation.day_of_week, reservation.start_min, reservation.end_min,
+            "reservations", "time_slots", "approved_reservations"))
+        publish_reservation(reservation, notify_group=True)
         return {"message": "Réservation validée et créneau ajouté à l'emploi du temps !"}
 
+    db.commit()
+    if occupies:
+        room_index.occupy(reservation.room_id, reservation.day_of_week, reservation.start_min, reservation.end_min,
+                          "reservations", "approved_reservations")
+    elif was_approved and status_update.status != "approved":
+        # Créneau libéré : l'index des salles sera reconstruit
+        bump("reservations", "approved_reservations")
+    else:
+        # Demande en attente ou refusée : l'index des salles n'est pas concerné
+        bump("reservations")
+    publish_reservation(reservation)
     return {"message": f"Statut mis à jour : {status_update.status}"}
 
+def publish_reservation(reservation, notify_group=False):
+    # L'enseignant apprend la décision ; le groupe n'est prévenu que d'un rattrapage ajouté
+    channels = [f"teacher:{reservation.teacher_id}"]
+    if notify_group:
+        channels.append(f"group:{reservation.group_id}")
+    event_hub.publish("reservation", {
+        "id": reservation.id, "status": reservation.status, "teacher_id": reservation.teacher_id,
+        "room_id": reservation.room_id, "course_id": reservation.course_id, "group_id": reservation.group_id,
+        "date": reservation.date, "start_time": reservation.start_time, "end_time": reservation.end_time,
+    }, *channels)
+
 
 # =====================================================================
 # SEEDING
@@ -734,264 +1204,257 @@ def seed_data():
     finally:
         db.close()
 
+retention_worker = RetentionWorker(SessionLocal)
+
+@app.on_event("startup")
+def start_background_workers():
+    retention_worker.start()
+    mail_dispatcher.start()
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    retention_worker.stop()
+    mail_dispatcher.stop()
+    job_manager.shutdown()
+    await dispose_async_engine()
+
 # =====================================================================
-# GÉNÉRATION PDF (PLEINE LARGEUR & TEXTE NEUTRE)
+# 🚀 BOOTSTRAP DES TABLEAUX DE BORD (une requête au lieu d'une dizaine)
 # =====================================================================
+def rows_of(model, *conditions, order=None, limit=None):
+    def build(db):
+        query = db.query(model).filter(*conditions).order_by(order if order is not None else model.id)
+        return query.limit(limit).all() if limit else query.all()
+    return build
+
+def notifications_for(role, limit=50):
+    return rows_of(GlobalNotification, or_(GlobalNotification.target_role == "all", GlobalNotification.target_role == role),
+                   order=GlobalNotification.id.desc(), limit=limit)
+
+def require(model, key, label):
+    def build(db):
+        obj = db.get(model, key)
+        if obj is None:
+            raise HTTPException(status_code=404, detail=f"{label} introuvable")
+        return obj
+    return build
+
+@app.get("/bootstrap/admin")
+def bootstrap_admin(request: Request, db: Session = Depends(get_db)):
+    """Toutes les collections d'AdminDashboard (include=..., fields.<section>=...)."""
+    return bootstrap_response(request, db, ("admin",), [
+        Section("groups", ("groups",), rows_of(Group), Group),
+        Section("seances", ("time_slots",), rows_of(TimeSlot), TimeSlot),
+        Section("teachers", ("teachers",), rows_of(Teacher), Teacher),
+        Section("rooms", ("rooms",), rows_of(Room), Room),
+        Section("courses", ("courses",), rows_of(Course), Course),
+        Section("stats", STATS_TABLES, compute_stats),
+        Section("reservations", ("reservations",), rows_of(Reservation), Reservation),
+        # Comme conflict_engine.get : les indisponibilités passées cessent de compter à minuit
+        Section("conflicts", CONFLICT_TABLES, conflict_engine.get, vary=date.today),
+        Section("pending_users", ("users",), rows_of(User, User.is_active == False), User),
+        Section("users", ("users",), rows_of(User), User),
+    ])
+
+@app.get("/bootstrap/teacher/{teacher_id}")
+def bootstrap_teacher(teacher_id: int, request: Request, db: Session = Depends(get_db)):
+    """Données de TeacherDashboard, filtrées sur l'enseignant quand c'est possible."""
+    return bootstrap_response(request, db, ("teacher", teacher_id), [
+        Section("teacher", ("teachers",), require(Teacher, teacher_id, "Enseignant")),
+        Section("timetable", TIMETABLE_TABLES, lambda db: build_seances(db, TimeSlot.teacher_id == teacher_id, "Moi-même")),
+        Section("seances", ("time_slots",), rows_of(TimeSlot, TimeSlot.teacher_id == teacher_id), TimeSlot),
+        Section("courses", ("courses",), rows_of(Course, Course.teacher_id == teacher_id), Course),
+        Section("reservations", ("reservations",), rows_of(Reservation, Reservation.teacher_id == teacher_id), Reservation),
+        Section("unavailabilities", ("unavailabilities",), rows_of(Unavailability, Unavailability.teacher_id == teacher_id), Unavailability),
+        Section("rooms", ("rooms",), rows_of(Room), Room),
+        Section("teachers", ("teachers",), rows_of(Teacher), Teacher),
+        Section("groups", ("groups",), rows_of(Group), Group),
+        Section("notifications", ("global_notifications",), notifications_for("teacher"), GlobalNotification),
+    ])
+
+@app.get("/bootstrap/student/{group_id}")
+def bootstrap_student(group_id: str, request: Request, db: Session = Depends(get_db)):
+    """Données de StudentDashboard pour un groupe (et la vue « filière » : groupes de même préfixe)."""
+    in_filiere = TimeSlot.group_id.startswith(group_id.split(" ")[0], autoescape=True)
+    return bootstrap_response(request, db, ("student", group_id), [
+        Section("timetable", TIMETABLE_TABLES, lambda db: build_seances(db, TimeSlot.group_id == group_id, "Prof Inconnu")),
+        Section("seances", ("time_slots",), rows_of(TimeSlot, in_filiere), TimeSlot),
+        Section("courses", ("courses", "time_slots"),
+                rows_of(Course, or_(Course.group_id == group_id, Course.id.in_(select(TimeSlot.course_id).where(in_filiere)))), Course),
+        Section("teachers", ("teachers",), rows_of(Teacher), Teacher),
+        Section("rooms", ("rooms",), rows_of(Room), Room),
+        Section("groups", ("groups",), rows_of(Group), Group),
+        Section("reservations", ("reservations",), rows_of(Reservation, Reservation.group_id == group_id), Reservation),
+        Section("unavailabilities", ("unavailabilities",), rows_of(Unavailability), Unavailability),
+        Section("notifications", ("global_notifications",), notifications_for("student"), GlobalNotification),
+    ])
 
-def draw_header(pdf, title, subtitle):
-    # Fond de l'en-tête (Bande légère)
-    pdf.set_fill_color(248, 250, 252)
-    pdf.rect(0, 0, 297, 35, 'F') # Hauteur réduite pour gagner de la place
-    
-    # Titre Principal (Gros et Centré)
-    pdf.set_font("Helvetica", 'B', 22)
-    pdf.set_text_color(107, 93, 211) # Violet UniTime
-    pdf.set_xy(10, 10)
-    pdf.cell(0, 10, title, ln=True, align='C')
-    
-    # Sous-titre (Date)
-    pdf.set_font("Helvetica", 'I', 10)
-    pdf.set_text_color(100, 116, 139) # Gris Moyen
-    pdf.set_xy(10, 20)
-    pdf.cell(0, 5, f"{subtitle} - {datetime.now().strftime('%d/%m/%Y')}", ln=True, align='C')
-
-    # Ligne de séparation
-    pdf.set_draw_color(107, 93, 211)
-    pdf.set_line_width(0.5)
-    pdf.line(10, 32, 287, 32)
-
-def draw_course_card(pdf, x, y, w, h, course_name, type_cours, room, teacher, group=""):
-    # Ombre portée
-    pdf.set_fill_color(230, 230, 240)
-    pdf.set_draw_color(255, 255, 255) 
-    pdf.rect(x + 1, y + 1, w, h, 'F')
-
-    # Couleurs selon le type
-    if "TP" in type_cours.upper():
-        accent_color = (147, 51, 234) # Purple
-        bg_color = (250, 245, 255)
-    elif "TD" in type_cours.upper():
-        accent_color = (16, 185, 129) # Emerald
-        bg_color = (240, 253, 244)
-    else: # Cours
-        accent_color = (59, 130, 246) # Blue
-        bg_color = (239, 246, 255)
-
-    # Fond de la carte
-    pdf.set_fill_color(*bg_color)
-    pdf.set_draw_color(200, 200, 200)
-    pdf.set_line_width(0.1)
-    pdf.rect(x, y, w, h, 'FD')
-
-    # Bande latérale colorée
-    pdf.set_fill_color(*accent_color)
-    pdf.rect(x, y, 2, h, 'F')
-
-    # Contenu Texte
-    # 1. Type
-    pdf.set_font("Helvetica", 'B', 7)
-    pdf.set_text_color(*accent_color)
-    pdf.set_xy(x + 4, y + 2)
-    pdf.cell(w - 6, 4, type_cours.upper(), ln=True)
-
-    # 2. Nom du Cours
-    pdf.set_font("Helvetica", 'B', 9) # Police légèrement réduite pour tenir
-    pdf.set_text_color(30, 41, 59)
-    pdf.set_xy(x + 4, y + 7)
-    short_name = (course_name[:25] + '..') if len(course_name) > 25 else course_name
-    pdf.cell(w - 6, 5, short_name, ln=True)
-
-    # 3. Professeur
-    pdf.set_font("Helvetica", '', 7)
-    pdf.set_text_color(100, 116, 139)
-    pdf.set_xy(x + 4, y + 13)
-    teacher_txt = teacher if teacher else "Non assigné"
-    pdf.cell(w - 6, 4, teacher_txt, ln=True)
-
-    # 4. Salle & Groupe
-    pdf.set_font("Helvetica", 'B', 8)
-    pdf.set_text_color(71, 85, 105)
-    pdf.set_xy(x + 4, y + 20)
-    
-    info_bottom = f"SALLE: {room}"
-    if group:
-        info_bottom += f" | {group}"
-        
-    pdf.cell(w - 6, 4, info_bottom, ln=True)
 
+# =====================================================================
+# GÉNÉRATION PDF (PLEINE LARGEUR & TEXTE NEUTRE)
+# =====================================================================
+
+PDF_TABLES = TIMETABLE_TABLES + ("groups",)
+pdf_cache = VersionedCache(max_entries=256)
+# Exports groupés (ZIP / PDF d'un département) : cache séparé, borné en octets
+BULK_PDF_CACHE_BYTES = int(os.getenv("UNITIME_BULK_PDF_CACHE_MB", "64")) * 1024 * 1024
+bulk_pdf_cache = VersionedCache(max_entries=16, max_bytes=BULK_PDF_CACHE_BYTES)
+
+def load_pdf_rows(db, condition=None):
+    """Séances + noms (cours, salle, enseignant) en une seule requête jointe."""
+    query = db.query(
+        TimeSlot.day_of_week, TimeSlot.start_min, TimeSlot.type, TimeSlot.group_id, TimeSlot.teacher_id,
+        Course.name.label("course_name"), Room.name.label("room_name"), Teacher.name.label("teacher_name"),
+        Teacher.department.label("teacher_department")
+    ).outerjoin(TimeSlot.course).outerjoin(TimeSlot.room).outerjoin(TimeSlot.teacher)
+    if condition is not None:
+        query = query.filter(condition)
+    return query.order_by(TimeSlot.id).all()
+
+def pdf_response(request, key, filename, render):
+    # Rendu mis en cache par (cible, version de l'emploi du temps, date affichée dans l'en-tête)
+    today = datetime.now().strftime('%Y-%m-%d')
+    etag = make_etag(key + (today,), get_version(*PDF_TABLES))
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Content-Disposition": f'attachment; filename="{filename}"'}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    content = pdf_cache.get_or_build(key + (today,), PDF_TABLES, render)
+    return Response(content=content, media_type='application/pdf', headers=headers)
 
 # 1. Pour les ÉTUDIANTS et l'ADMIN
 @app.get("/export-pdf/{group_id}")
-def export_timetable_pdf(group_id: str, db: Session = Depends(get_db)):
-    slots = db.query(TimeSlot).filter(TimeSlot.group_id == group_id).all()
-    
-    pdf = FPDF(orientation='L', unit='mm', format='A4')
-    pdf.add_page()
-    
-    draw_header(pdf, f"EMPLOI DU TEMPS - {group_id}", "Semaine S1")
-
-    days = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"]
-    times = ["08:00", "10:15", "14:00", "16:15"]
-    
-    # --- DIMENSIONS RECALCULÉES POUR A4 PAYSAGE (297mm) ---
-    # Marge Gauche: 10mm | Colonne Heure: 22mm | 5 Colonnes Jours: 51mm chacune
-    # Total: 10 + 22 + (5 * 51) = 287mm (Reste 10mm marge droite -> PARFAIT)
-    col_width = 51 
-    hour_col_width = 22
-    row_height = 30
-    header_height = 10
-    margin_left = 10 
-    start_y = 40 
-
-    # DESSIN DES JOURS
-    pdf.set_xy(margin_left + hour_col_width, start_y)
-    pdf.set_font("Helvetica", 'B', 11)
-    pdf.set_fill_color(107, 93, 211)
-    pdf.set_text_color(255, 255, 255)
-    pdf.set_draw_color(107, 93, 211)
-    
-    for day in days:
-        pdf.cell(col_width, header_height, day, border=1, align='C', fill=True)
-    pdf.ln(header_height)
+def export_timetable_pdf(group_id: str, request: Request, db: Session = Depends(get_db)):
+    def render():
+        cards = build_cards(load_pdf_rows(db, TimeSlot.group_id == group_id))
+        return render_timetable(f"EMPLOI DU TEMPS - {group_id}", "Semaine S1", cards)
 
-    # GRILLE
-    y_current = pdf.get_y()
-    
-    for i, start_time in enumerate(times):
-        # Colonne Heure
-        pdf.set_xy(margin_left, y_current + (i * row_height))
-        pdf.set_font("Helvetica", 'B', 9)
-        pdf.set_fill_color(241, 245, 249)
-        pdf.set_text_color(71, 85, 105)
-        pdf.set_draw_color(226, 232, 240)
-        pdf.cell(hour_col_width, row_height, start_time, border=1, align='C', fill=True)
-        
-        # Colonnes Jours
-        for day in days:
-            current_slot = None
-            for slot in slots:
-                if slot.day == day and slot.start_time.startswith(start_time[:2]):
-                    current_slot = slot
-                    break
-            
-            x_curr = pdf.get_x()
-            y_curr = pdf.get_y()
-            
-            # Fond vide
-            pdf.set_fill_color(255, 255, 255)
-            pdf.set_draw_color(230, 230, 230)
-            pdf.cell(col_width, row_height, "", border=1, fill=True)
-            
-            if current_slot:
-                course = db.query(Course).get(current_slot.course_id)
-                room = db.query(Room).get(current_slot.room_id)
-                teacher = db.query(Teacher).get(current_slot.teacher_id)
-                
-                c_name = course.name if course else "Inconnu"
-                r_name = room.name if room else "?"
-                t_name = teacher.name if teacher else ""
-                s_type = current_slot.type or "Cours"
-
-                draw_course_card(pdf, x_curr + 1, y_curr + 1, col_width - 2, row_height - 2, c_name, s_type, r_name, t_name)
-                
-            pdf.set_xy(x_curr + col_width, y_curr)
-
-    # Sauvegarde
-    filename = f"/tmp/timetable_{group_id}.pdf"
-    pdf.output(filename)
-    return FileResponse(filename, media_type='application/pdf', filename=f"timetable_{group_id}.pdf")
+    return pdf_response(request, ("group", group_id), f"timetable_{group_id}.pdf", render)
 
 
 # 2. Pour les PROFESSEURS
 @app.get("/export-pdf/teacher/{teacher_id}")
-def export_teacher_pdf(teacher_id: int, db: Session = Depends(get_db)):
-    slots = db.query(TimeSlot).filter(TimeSlot.teacher_id == teacher_id).all()
-    teacher = db.query(Teacher).get(teacher_id)
-    teacher_name = teacher.name if teacher else "Professeur"
-
-    pdf = FPDF(orientation='L', unit='mm', format='A4')
-    pdf.add_page()
-    
-    draw_header(pdf, f"EMPLOI DU TEMPS", teacher_name.upper())
-
-    days = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"]
-    times = ["08:00", "10:15", "14:00", "16:15"]
-    
-    # --- MÊMES DIMENSIONS OPTIMISÉES ---
-    col_width = 51 
-    hour_col_width = 22
-    row_height = 30
-    header_height = 10
-    margin_left = 10 
-    start_y = 40
-
-    pdf.set_xy(margin_left + hour_col_width, start_y)
-    pdf.set_font("Helvetica", 'B', 11)
-    pdf.set_fill_color(107, 93, 211)
-    pdf.set_text_color(255, 255, 255)
-    pdf.set_draw_color(107, 93, 211)
-    for day in days:
-        pdf.cell(col_width, header_height, day, border=1, align='C', fill=True)
-    pdf.ln(header_height)
-
-    y_current = pdf.get_y()
-    for i, start_time in enumerate(times):
-        pdf.set_xy(margin_left, y_current + (i * row_height))
-        pdf.set_font("Helvetica", 'B', 9)
-        pdf.set_fill_color(241, 245, 249)
-        pdf.set_text_color(71, 85, 105)
-        pdf.set_draw_color(226, 232, 240)
-        pdf.cell(hour_col_width, row_height, start_time, border=1, align='C', fill=True)
-        
-        for day in days:
-            current_slot = None
-            for slot in slots:
-                if slot.day == day and slot.start_time.startswith(start_time[:2]):
-                    current_slot = slot
-                    break
-            
-            x_curr = pdf.get_x()
-            y_curr = pdf.get_y()
-            
-            pdf.set_fill_color(255, 255, 255)
-            pdf.set_draw_color(230, 230, 230)
-            pdf.cell(col_width, row_height, "", border=1, fill=True)
-            
-            if current_slot:
-                course = db.query(Course).get(current_slot.course_id)
-                room = db.query(Room).get(current_slot.room_id)
-                group_name = current_slot.group_id or "?"
-                
-                c_name = course.name if course else "Inconnu"
-                r_name = room.name if room else "?"
-                s_type = current_slot.type or "Cours"
-
-                draw_course_card(pdf, x_curr + 1, y_curr + 1, col_width - 2, row_height - 2, c_name, s_type, r_name, f"Gr: {group_name}")
-                
-            pdf.set_xy(x_curr + col_width, y_curr)
+def export_teacher_pdf(teacher_id: int, request: Request, db: Session = Depends(get_db)):
+    def render():
+        teacher = db.query(Teacher).get(teacher_id)
+        teacher_name = teacher.name if teacher else "Professeur"
+        cards = build_cards(load_pdf_rows(db, TimeSlot.teacher_id == teacher_id), for_teacher=True)
+        return render_timetable("EMPLOI DU TEMPS", teacher_name.upper(), cards)
+
+    return pdf_response(request, ("teacher", teacher_id), f"timetable_teacher_{teacher_id}.pdf", render)
+
+
+# 3. EXPORT GROUPÉ (tout un département en une requête)
+def bulk_pages(db, department, filiere, semester, kind):
+    """Pages (groupes puis enseignants) du périmètre demandé, à partir d'un seul chargement des séances."""
+    group_filters = []
+    if filiere: group_filters.append(Group.filiere == filiere)
+    if semester: group_filters.append(Group.semester == semester)
+    if department and not filiere:
+        # Sans filière, les groupes d'un département sont ceux qu'enseignent ses professeurs
+        dept_groups = select(TimeSlot.group_id).join(TimeSlot.teacher).where(Teacher.department == department)
+        group_filters.append(or_(Group.name.in_(dept_groups), Group.id.in_(dept_groups)))
+    groups_q = db.query(Group).filter(*group_filters)
+    teachers_q = db.query(Teacher.id, Teacher.name)
+    if department: teachers_q = teachers_q.filter(Teacher.department == department)
+
+    # La base ne renvoie que les séances des groupes et des enseignants retenus
+    # (les séances générées référencent le groupe par son nom, les autres par son id)
+    scope = []
+    if kind in ("all", "groups"):
+        scope.append(or_(
+            TimeSlot.group_id.in_(select(Group.name).where(*group_filters)),
+            TimeSlot.group_id.in_(select(Group.id).where(*group_filters)),
+        ) if group_filters else None)
+    if kind in ("all", "teachers"):
+        scope.append(Teacher.department == department if department else None)
+    rows = load_pdf_rows(db, None if any(c is None for c in scope) else or_(*scope))
+
+    pages = []
+    if kind in ("all", "groups"):
+        rows_by_group = {}
+        for row in rows:
+            rows_by_group.setdefault(row.group_id, []).append(row)
+        for group in groups_q.order_by(Group.name).all():
+            key = group.name if group.name in rows_by_group else group.id
+            cards = build_cards(rows_by_group.get(key, []))
+            pages.append((f"groupes/{safe_filename(key)}.pdf", f"EMPLOI DU TEMPS - {key}", "Semaine S1", cards))
+
+    if kind in ("all", "teachers"):
+        rows_by_teacher = {}
+        for row in rows:
+            rows_by_teacher.setdefault(row.teacher_id, []).append(row)
+        for t_id, t_name in teachers_q.order_by(Teacher.name).all():
+            name = t_name or "Professeur"
+            cards = build_cards(rows_by_teacher.get(t_id, []), for_teacher=True)
+            pages.append((f"enseignants/{t_id}_{safe_filename(name)}.pdf", "EMPLOI DU TEMPS", name.upper(), cards))
+    return pages
+
+@app.get("/export-pdf-bulk/")
+async def export_bulk_pdf(
+    request: Request,
+    department: Optional[str] = None,
+    filiere: Optional[str] = None,
+    semester: Optional[str] = None,
+    kind: str = Query("all", pattern="^(all|groups|teachers)$"),
+    format: str = Query("zip", pattern="^(zip|pdf)$"),
+    db: Session = Depends(get_db)
+):
+    """
+    ZIP (un PDF par groupe / enseignant) ou PDF unique multi-pages.
+    Le rendu du ZIP est réparti entre les processus du pool de calcul ; la
+    requête les attend sans bloquer de thread du serveur.
+    """
+    async def render():
+        pages = await run_in_threadpool(bulk_pages, db, department, filiere, semester, kind)
+        if not pages:
+            raise HTTPException(status_code=404, detail="Aucun emploi du temps dans ce périmètre")
+        pool = job_manager.process_pool()
+        if format == "pdf":
+            return await asyncio.wrap_future(pool.submit(render_multipage, pages))
+        batches = chunk(pages, job_manager.max_workers)
+        rendered = await asyncio.gather(*(asyncio.wrap_future(pool.submit(render_pages, b)) for b in batches))
+        return await run_in_threadpool(zip_documents, [doc for batch in rendered for doc in batch])
+
+    key = ("bulk", department, filiere, semester, kind, format)
+    label = safe_filename("_".join(v for v in (department, filiere, semester) if v) or "tous")
+    today = datetime.now().strftime('%Y-%m-%d')
+    etag = make_etag(key + (today,), get_version(*PDF_TABLES))
+    headers = {
+        "ETag": etag, "Cache-Control": "no-cache",
+        "Content-Disposition": f'attachment; filename="emplois_du_temps_{label}.{format}"',
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
 
-    # Sauvegarde
-    filename = f"/tmp/timetable_teacher_{teacher_id}.pdf"
-    pdf.output(filename)
-    return FileResponse(filename, media_type='application/pdf', filename=f"timetable_teacher_{teacher_id}.pdf")
+    found, content = bulk_pdf_cache.peek(key + (today,), PDF_TABLES)
+    if not found:
+        version = get_version(*PDF_TABLES)
+        content = await render()
+        bulk_pdf_cache.put(key + (today,), version, content)
+    media_type = "application/pdf" if format == "pdf" else "application/zip"
+    return StreamingResponse(io.BytesIO(content), media_type=media_type, headers=headers)
 
 
 # 1. RÉCUPÉRER TOUS LES UTILISATEURS (actifs + inactifs)
 @app.get("/admin/users/all")
-async def get_all_users(db: Session = Depends(get_db)):
+async def get_all_users(response: Response, role: Optional[str] = None, is_active: Optional[bool] = None,
+                        group_id: Optional[str] = None, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_db)):
     """Récupère tous les utilisateurs pour le CRUD admin"""
-    users = db.query(User).all()
-    return users
+    stmt = select(User)
+    if role is not None: stmt = stmt.where(User.role == role)
+    if is_active is not None: stmt = stmt.where(User.is_active == is_active)
+    if group_id is not None: stmt = stmt.where(User.group_id == group_id)
+    return await paginate_async(db, stmt, User, page, response.headers)
 
 # 2. CRÉER/MODIFIER UN UTILISATEUR
 @app.post("/admin/users/")
-async def create_or_update_user(user_data: dict, db: Session = Depends(get_db)):
+async def create_or_update_user(user_data: dict, db: AsyncSession = Depends(get_async_db)):
     """Créer ou modifier un utilisateur"""
     user_id = user_data.get('id')
     
     if user_id:
         # MODIFICATION
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
         
@@ -1014,7 +1477,7 @@ async def create_or_update_user(user_data: dict, db: Session = Depends(get_db)):
     else:
         # CRÉATION
         # Vérifier si l'email existe déjà
-        existing = db.query(User).filter(User.email == user_data['email']).first()
+        existing = await db.scalar(select(User).where(User.email == user_data['email']).limit(1))
         if existing:
             raise HTTPException(status_code=400, detail="Cet email existe déjà")
         
@@ -1030,18 +1493,20 @@ async def create_or_update_user(user_data: dict, db: Session = Depends(get_db)):
         )
         db.add(user)
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    bump("users")
+    await db.refresh(user)
     return {"message": "Utilisateur enregistré avec succès", "user": user}
 
 # 3. SUPPRIMER UN UTILISATEUR
 @app.delete("/admin/users/{user_id}")
-async def delete_user(user_id: int, db: Session = Depends(get_db)):
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """Supprimer un utilisateur"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+    bump("users")
     return {"message": "Utilisateur supprimé avec succès"}
\ No newline at end of file
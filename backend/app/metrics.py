@@ -0,0 +1,192 @@
+"""
+Métriques HTTP au format Prometheus (GET /metrics).
+
+Un middleware ASGI mesure chaque requête : latence par route (histogramme),
+statuts, requêtes en cours, nombre de requêtes SQL et temps passé en base.
+Les requêtes SQL sont attribuées à la requête HTTP courante via une
+ContextVar (propagée par Starlette jusque dans le threadpool des endpoints
+synchrones) alimentée par les événements du moteur SQLAlchemy.
+
+Pas de dépendance à prometheus_client : quelques compteurs sous verrou
+suffisent et gardent le chemin critique léger.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+_START_KEY = "unitime_metrics_start"
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "scope", "statements")
+
+    def __init__(self, scope=None):
+        self.queries = 0
+        self.db_time = 0.0
+        self.scope = scope
+        self.statements = None  # rempli par le mode diagnostic SQL (sql_diagnostics)
+
+
+def route_of(scope):
+    return getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+# Fonctions appelées en fin de requête : hook(method, route, stats)
+request_finished_hooks = []
+
+
+current_request: ContextVar = ContextVar("unitime_current_request", default=None)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # dernière case : +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(**labels):
+    return ",".join(f'{k}="{v}"' for k, v in labels.items())
+
+
+class HTTPMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = {}       # (method, route, status) -> nombre
+        self.latency = {}        # (method, route) -> Histogram
+        self.sql_queries = {}    # (method, route) -> Histogram
+        self.sql_seconds = {}    # (method, route) -> total
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, method, route, status, duration, stats):
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+            latency = self.latency.get(key)
+            if latency is None:
+                latency = self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.sql_queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+                self.sql_seconds[key] = 0.0
+            latency.observe(duration)
+            self.sql_queries[key].observe(stats.queries)
+            self.sql_seconds[key] += stats.db_time
+
+    def _histogram_lines(self, name, histograms):
+        lines = []
+        for (method, route), h in sorted(histograms.items()):
+            cumulative = 0
+            for bound, n in zip(h.buckets + (float("inf"),), h.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{{{_labels(method=method, route=route, le=le)}}} {cumulative}")
+            lines.append(f"{name}_sum{{{_labels(method=method, route=route)}}} {h.sum}")
+            lines.append(f"{name}_count{{{_labels(method=method, route=route)}}} {h.count}")
+        return lines
+
+    def render(self, extra_gauges=()):
+        """Exposition au format texte Prometheus 0.0.4."""
+        with self._lock:
+            lines = [
+                "# HELP unitime_http_requests_in_flight Requêtes HTTP en cours de traitement.",
+                "# TYPE unitime_http_requests_in_flight gauge",
+                f"unitime_http_requests_in_flight {self.in_flight}",
+                "# HELP unitime_http_requests_total Requêtes HTTP traitées.",
+                "# TYPE unitime_http_requests_total counter",
+            ]
+            for (method, route, status), n in sorted(self.requests.items()):
+                lines.append(f"unitime_http_requests_total{{{_labels(method=method, route=route, status=status)}}} {n}")
+
+            lines += [
+                "# HELP unitime_http_request_duration_seconds Latence des requêtes HTTP.",
+                "# TYPE unitime_http_request_duration_seconds histogram",
+            ]
+            lines += self._histogram_lines("unitime_http_request_duration_seconds", self.latency)
+
+            lines += [
+                "# HELP unitime_http_request_sql_queries Requêtes SQL émises par requête HTTP.",
+                "# TYPE unitime_http_request_sql_queries histogram",
+            ]
+            lines += self._histogram_lines("unitime_http_request_sql_queries", self.sql_queries)
+
+            lines += [
+                "# HELP unitime_http_request_sql_seconds_total Temps passé en base par route.",
+                "# TYPE unitime_http_request_sql_seconds_total counter",
+            ]
+            for (method, route), total in sorted(self.sql_seconds.items()):
+                lines.append(f"unitime_http_request_sql_seconds_total{{{_labels(method=method, route=route)}}} {total}")
+
+        for name, kind, help_text, value in extra_gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+http_metrics = HTTPMetrics()
+
+
+class MetricsMiddleware:
+    """Middleware ASGI pur (pas de BaseHTTPMiddleware : pas de tâche ni de copie du corps)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        http_metrics.started()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            current_request.reset(token)
+            # Gabarit de la route (/timetable/{group_id}) et non l'URL : cardinalité bornée
+            route = route_of(scope)
+            http_metrics.finished(scope["method"], route, status_holder[0], duration, stats)
+            for hook in request_finished_hooks:
+                hook(scope["method"], route, stats)
+
+
+def instrument_queries(engine):
+    """Attribue chaque requête SQL de `engine` à la requête HTTP en cours."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_request.get() is not None:
+            conn.info[_START_KEY] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_request.get()
+        start = conn.info.pop(_START_KEY, None)
+        if stats is not None and start is not None:
+            stats.queries += 1
+            stats.db_time += time.perf_counter() - start
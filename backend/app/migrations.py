@@ -0,0 +1,77 @@
+"""
+Migrations légères appliquées au démarrage (pas d'Alembic dans le projet).
+
+`create_all` crée les tables manquantes mais n'ajoute ni colonnes ni index
+aux tables existantes : chaque migration ci-dessous est idempotente et
+peut être relancée sans risque (`python -m app.migrations`).
+"""
+from sqlalchemy import bindparam, inspect, text
+
+from .models.models import GlobalNotification, Reservation, TimeSlot, Unavailability, compact_time_fields
+
+COMPACT_TIME_COLUMNS = ("day_of_week", "start_min", "end_min")
+
+
+def _add_missing_columns(conn, table, columns, ddl_type="INTEGER"):
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    for name in columns:
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl_type}"))
+
+
+def _create_missing_indexes(conn, model):
+    for index in model.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+
+def _backfill_compact_time(conn, model, has_date):
+    table = model.__table__
+    cols = [table.c.id, table.c.start_time, table.c.end_time]
+    cols += [table.c.date] if has_date else []
+    cols += [table.c.day] if "day" in table.c else []
+
+    rows = conn.execute(table.select().with_only_columns(*cols).where(table.c.day_of_week.is_(None))).mappings().all()
+    updates = []
+    for row in rows:
+        values = compact_time_fields(row.get("day"), row.get("date"), row["start_time"], row["end_time"])
+        updates.append({"_id": row["id"], **values})
+    if updates:
+        conn.execute(
+            table.update().where(table.c.id == bindparam("_id")).values(
+                day_of_week=bindparam("day_of_week"), start_min=bindparam("start_min"), end_min=bindparam("end_min")),
+            updates
+        )
+    return len(updates)
+
+
+def migrate_compact_time(engine):
+    """Ajoute day_of_week / start_min / end_min, les remplit et crée les index composites."""
+    with engine.begin() as conn:
+        for model, has_date in ((TimeSlot, False), (Reservation, True), (Unavailability, True)):
+            _add_missing_columns(conn, model.__tablename__, COMPACT_TIME_COLUMNS)
+            _backfill_compact_time(conn, model, has_date)
+            _create_missing_indexes(conn, model)
+
+
+def migrate_locked_slots(engine):
+    """Ajoute time_slots.locked (séances conservées par la régénération incrémentale)."""
+    with engine.begin() as conn:
+        _add_missing_columns(conn, TimeSlot.__tablename__, ("locked",), ddl_type="BOOLEAN DEFAULT FALSE")
+
+
+def migrate_notification_index(engine):
+    """Index (target_role, created_at) des notifications globales."""
+    with engine.begin() as conn:
+        _create_missing_indexes(conn, GlobalNotification)
+
+
+def run_migrations(engine):
+    migrate_compact_time(engine)
+    migrate_locked_slots(engine)
+    migrate_notification_index(engine)
+
+
+if __name__ == "__main__":
+    from .database import engine
+    run_migrations(engine)
+    print("✅ Migrations appliquées.")
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Text, Index, event
 from sqlalchemy.orm import relationship
 from ..database import Base
+from ..timeutils import day_index, to_minutes
 from datetime import datetime
 
 # 1. Modèle Utilisateur
@@ -86,6 +87,19 @@ class TimeSlot(Base):
     start_time = Column(String)
     end_time = Column(String)
     type = Column(String) # "Cours", "TD", "TP", "Rattrapage"
+    # Séance verrouillée : conservée par la régénération incrémentale
+    locked = Column(Boolean, default=False)
+
+    # Forme entière (0 = Lundi, minutes depuis minuit) pour les recherches par intervalle
+    day_of_week = Column(Integer, nullable=True)
+    start_min = Column(Integer, nullable=True)
+    end_min = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_time_slots_room_day_start", "room_id", "day_of_week", "start_min"),
+        Index("ix_time_slots_teacher_day_start", "teacher_id", "day_of_week", "start_min"),
+        Index("ix_time_slots_group_day_start", "group_id", "day_of_week", "start_min"),
+    )
 
     course = relationship("Course", back_populates="time_slots")
     teacher = relationship("Teacher", back_populates="time_slots")
@@ -108,6 +122,14 @@ class Reservation(Base):
     start_time = Column(String)
     end_time = Column(String)
     status = Column(String, default="pending") 
+
+    day_of_week = Column(Integer, nullable=True)
+    start_min = Column(Integer, nullable=True)
+    end_min = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_reservations_room_day_start", "room_id", "day_of_week", "start_min"),
+    )
     
     teacher = relationship("Teacher", back_populates="reservations")
     room = relationship("Room", back_populates="reservations")
@@ -125,6 +147,14 @@ class Unavailability(Base):
     start_time = Column(String)
     end_time = Column(String)
     reason = Column(String, nullable=True)
+
+    day_of_week = Column(Integer, nullable=True)
+    start_min = Column(Integer, nullable=True)
+    end_min = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_unavailabilities_teacher_day_start", "teacher_id", "day_of_week", "start_min"),
+    )
     
     teacher = relationship("Teacher", back_populates="unavailabilities")
 
@@ -135,4 +165,65 @@ class GlobalNotification(Base):
     message = Column(String)
     type = Column(String) # 'info', 'warning', 'alert'
     target_role = Column(String) # 'all', 'student', 'teacher'
-    created_at = Column(DateTime, default=datetime.now)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        Index("ix_global_notifications_role_created", "target_role", "created_at"),
+    )
+
+# Notifications sorties de la table active par la rétention (même schéma + date d'archivage)
+class GlobalNotificationArchive(Base):
+    __tablename__ = "global_notifications_archive"
+    id = Column(Integer, primary_key=True)
+    title = Column(String)
+    message = Column(String)
+    type = Column(String)
+    target_role = Column(String)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.now, index=True)
+
+
+# File d'attente durable des emails (envoyés par app.mailer)
+class MailOutbox(Base):
+    __tablename__ = "mail_outbox"
+    id = Column(Integer, primary_key=True, index=True)
+    recipient = Column(String)
+    subject = Column(String)
+    body = Column(Text)
+    subtype = Column(String, default="html")
+    status = Column(String, default="pending")  # 'pending', 'sending', 'sent', 'failed'
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.now)
+    claimed_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_mail_outbox_status_next", "status", "next_attempt_at"),
+    )
+
+
+# =====================================================================
+# SYNCHRONISATION DES COLONNES ENTIÈRES (jour / minutes)
+# =====================================================================
+def compact_time_fields(day=None, date=None, start_time=None, end_time=None):
+    """Valeurs de day_of_week / start_min / end_min à partir des champs texte."""
+    d = date.weekday() if date is not None else day_index(day)
+    return {"day_of_week": d, "start_min": to_minutes(start_time), "end_min": to_minutes(end_time)}
+
+
+def _sync_time_slot(mapper, connection, target):
+    for k, v in compact_time_fields(target.day, None, target.start_time, target.end_time).items():
+        setattr(target, k, v)
+
+def _sync_dated(mapper, connection, target):
+    for k, v in compact_time_fields(getattr(target, "day", None), target.date,
+                                    target.start_time, target.end_time).items():
+        setattr(target, k, v)
+
+# Les INSERT groupés (Core) ne passent pas par ces événements : ils doivent
+# fournir eux-mêmes les colonnes (voir compact_time_fields).
+for _model, _listener in ((TimeSlot, _sync_time_slot), (Reservation, _sync_dated), (Unavailability, _sync_dated)):
+    event.listen(_model, "before_insert", _listener)
+    event.listen(_model, "before_update", _listener)
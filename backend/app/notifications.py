@@ -0,0 +1,123 @@
+"""
+Lecture incrémentale et rétention des notifications globales.
+
+Lecture : `since_id` (ou `since`, une date) ne renvoie que les notifications
+plus récentes, des plus anciennes aux plus récentes, pour qu'un client puisse
+reprendre au dernier identifiant vu ; sans curseur, les `limit` plus récentes.
+L'index (target_role, created_at) borne chaque lecture au nombre de nouveautés.
+
+Rétention : un thread de fond déplace régulièrement vers
+`global_notifications_archive` les notifications trop anciennes
+(UNITIME_NOTIF_RETENTION_DAYS) et, par rôle cible, celles au-delà des
+UNITIME_NOTIF_MAX_LIVE plus récentes. La table active reste petite.
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, delete, insert, literal, or_, select
+
+from .cache import bump
+from .models.models import GlobalNotification, GlobalNotificationArchive
+
+DEFAULT_LIMIT = 50
+RETENTION_DAYS = int(os.getenv("UNITIME_NOTIF_RETENTION_DAYS", "90"))
+MAX_LIVE = int(os.getenv("UNITIME_NOTIF_MAX_LIVE", "500"))
+RETENTION_INTERVAL = float(os.getenv("UNITIME_NOTIF_RETENTION_INTERVAL", "3600"))  # 0 = désactivé
+ARCHIVE_CHUNK = 1000
+
+ARCHIVED_COLUMNS = ("id", "title", "message", "type", "target_role", "created_at")
+
+
+def notifications_query(db, role, since_id=None, since=None):
+    """Notifications visibles pour `role`, éventuellement limitées aux nouveautés."""
+    query = db.query(GlobalNotification).filter(
+        or_(GlobalNotification.target_role == "all", GlobalNotification.target_role == role)
+    )
+    if since_id is not None:
+        query = query.filter(GlobalNotification.id > since_id)
+    if since is not None:
+        query = query.filter(GlobalNotification.created_at > since)
+    return query
+
+
+def _expired_ids(db, cutoff):
+    return db.execute(select(GlobalNotification.id).where(GlobalNotification.created_at < cutoff)).scalars().all()
+
+
+def _overflow_ids(db, max_live):
+    # Au-delà des `max_live` plus récentes de chaque rôle cible
+    ids = []
+    for (role,) in db.execute(select(GlobalNotification.target_role).distinct()).all():
+        ids += db.execute(
+            select(GlobalNotification.id).where(GlobalNotification.target_role == role)
+            .order_by(GlobalNotification.id.desc()).offset(max_live)
+        ).scalars().all()
+    return ids
+
+
+def _move_to_archive(db, ids, now):
+    source = GlobalNotification.__table__
+    columns = [source.c[name] for name in ARCHIVED_COLUMNS]
+    for i in range(0, len(ids), ARCHIVE_CHUNK):
+        chunk = ids[i:i + ARCHIVE_CHUNK]
+        db.execute(
+            insert(GlobalNotificationArchive).from_select(
+                list(ARCHIVED_COLUMNS) + ["archived_at"],
+                select(*columns, literal(now, DateTime)).where(source.c.id.in_(chunk))
+            )
+        )
+        db.execute(delete(GlobalNotification).where(GlobalNotification.id.in_(chunk)))
+        db.commit()
+
+
+def archive_notifications(db, retention_days=RETENTION_DAYS, max_live=MAX_LIVE, now=None):
+    """Archive les notifications expirées ou en surnombre ; renvoie les volumes déplacés."""
+    now = now or datetime.now()
+    expired = set(_expired_ids(db, now - timedelta(days=retention_days))) if retention_days > 0 else set()
+    overflow = set(_overflow_ids(db, max_live)) - expired if max_live > 0 else set()
+    ids = sorted(expired | overflow)
+    if ids:
+        _move_to_archive(db, ids, now)
+        bump("global_notifications")
+    return {"archived": len(ids), "expired": len(expired), "overflow": len(overflow),
+            "retention_days": retention_days, "max_live": max_live}
+
+
+class RetentionWorker:
+    """Thread de fond qui lance `archive_notifications` toutes les `interval` secondes."""
+
+    def __init__(self, session_factory, interval=RETENTION_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.last_run = None
+        self.last_result = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        db = self.session_factory()
+        try:
+            self.last_result = archive_notifications(db)
+            self.last_run = datetime.now()
+            return self.last_result
+        finally:
+            db.close()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"⚠️ Rétention des notifications : {e}")
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="unitime-notif-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
@@ -0,0 +1,102 @@
+"""
+Pagination par curseur (keyset), projection de champs et filtres communs
+pour les endpoints de liste.
+
+Le corps de la réponse reste une liste JSON (compatible avec les tableaux de
+bord existants) ; le curseur de la page suivante est renvoyé dans l'en-tête
+`X-Next-Cursor`. Sans `limit`, une page compte DEFAULT_PAGE_SIZE lignes : les
+clients suivent le curseur pour obtenir la liste complète.
+"""
+import base64
+import json
+from typing import Optional
+
+from fastapi import HTTPException, Query
+from sqlalchemy import inspect
+
+MAX_PAGE_SIZE = 1000
+DEFAULT_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Curseur opaque renvoyé dans X-Next-Cursor"),
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description=f"{DEFAULT_PAGE_SIZE} par défaut"),
+        fields: Optional[str] = Query(None, description="Champs à renvoyer, séparés par des virgules"),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))["id"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+
+def projected_columns(model, fields):
+    """Colonnes demandées par `fields=` (l'identifiant est toujours inclus)."""
+    columns = {c.key: c for c in inspect(model).columns}
+    unknown = [f for f in fields if f not in columns]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Champs inconnus : {', '.join(unknown)}")
+    names = ["id"] + [f for f in fields if f != "id"]
+    return names, [columns[n] for n in names]
+
+
+def _page_query(query, model, page: PageParams, descending, project):
+    """Filtre du curseur, tri, projection et limite ; fonctionne pour Query et select()."""
+    if page.limit is None:
+        page.limit = DEFAULT_PAGE_SIZE
+    pk = model.id
+    if page.cursor is not None:
+        last_id = decode_cursor(page.cursor)
+        query = query.filter(pk < last_id if descending else pk > last_id)
+    query = query.order_by(pk.desc() if descending else pk.asc())
+
+    names = None
+    if page.fields:
+        names, columns = projected_columns(model, page.fields)
+        query = project(query, columns)
+
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    query = query.limit(page.limit + 1)
+    return query, names
+
+
+def _page_rows(rows, names, page: PageParams, headers):
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(last[0] if names else last.id)
+    if names:
+        return [dict(zip(names, row)) for row in rows]
+    return rows
+
+
+def paginate(query, model, page: PageParams, headers, descending=False):
+    """
+    Applique curseur, limite et projection à `query` ; le curseur suivant est
+    écrit dans `headers` (en-têtes de la réponse).
+
+    Le tri se fait sur la clé primaire : une page coûte un parcours d'index
+    borné, quelle que soit la taille de la table.
+    """
+    query, names = _page_query(query, model, page, descending, lambda q, cols: q.with_entities(*cols))
+    return _page_rows(query.all(), names, page, headers)
+
+
+async def paginate_async(db, stmt, model, page: PageParams, headers, descending=False):
+    """Équivalent de `paginate` pour un select() exécuté sur une AsyncSession."""
+    stmt, names = _page_query(stmt, model, page, descending, lambda q, cols: q.with_only_columns(*cols))
+    result = await db.execute(stmt)
+    rows = result.all() if names else result.scalars().all()
+    return _page_rows(rows, names, page, headers)
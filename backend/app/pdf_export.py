@@ -0,0 +1,244 @@
+"""
+Rendu PDF des emplois du temps.
+
+La grille statique (en-tête des jours, colonne des heures, cases vides) est
+dessinée une seule fois dans un gabarit, copié à chaque rendu ; seules les
+cartes de cours sont ajoutées. Les séances sont rangées dans un
+dictionnaire (jour, ligne) construit une fois, et le document est produit
+en mémoire (aucun fichier temporaire partagé entre requêtes).
+"""
+import copy
+import io
+import re
+import threading
+import zipfile
+from datetime import datetime
+
+from fpdf import FPDF
+
+DAYS = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"]
+TIMES = ["08:00", "10:15", "14:00", "16:15"]
+
+# --- DIMENSIONS RECALCULÉES POUR A4 PAYSAGE (297mm) ---
+# Marge Gauche: 10mm | Colonne Heure: 22mm | 5 Colonnes Jours: 51mm chacune
+# Total: 10 + 22 + (5 * 51) = 287mm (Reste 10mm marge droite -> PARFAIT)
+COL_WIDTH = 51
+HOUR_COL_WIDTH = 22
+ROW_HEIGHT = 30
+HEADER_HEIGHT = 10
+MARGIN_LEFT = 10
+START_Y = 40
+GRID_Y = START_Y + HEADER_HEIGHT
+
+
+def draw_header(pdf, title, subtitle):
+    # Fond de l'en-tête (Bande légère)
+    pdf.set_fill_color(248, 250, 252)
+    pdf.rect(0, 0, 297, 35, 'F') # Hauteur réduite pour gagner de la place
+    
+    # Titre Principal (Gros et Centré)
+    pdf.set_font("Helvetica", 'B', 22)
+    pdf.set_text_color(107, 93, 211) # Violet UniTime
+    pdf.set_xy(10, 10)
+    pdf.cell(0, 10, title, ln=True, align='C')
+    
+    # Sous-titre (Date)
+    pdf.set_font("Helvetica", 'I', 10)
+    pdf.set_text_color(100, 116, 139) # Gris Moyen
+    pdf.set_xy(10, 20)
+    pdf.cell(0, 5, f"{subtitle} - {datetime.now().strftime('%d/%m/%Y')}", ln=True, align='C')
+
+    # Ligne de séparation
+    pdf.set_draw_color(107, 93, 211)
+    pdf.set_line_width(0.5)
+    pdf.line(10, 32, 287, 32)
+
+def draw_course_card(pdf, x, y, w, h, course_name, type_cours, room, teacher, group=""):
+    # Ombre portée
+    pdf.set_fill_color(230, 230, 240)
+    pdf.set_draw_color(255, 255, 255) 
+    pdf.rect(x + 1, y + 1, w, h, 'F')
+
+    # Couleurs selon le type
+    if "TP" in type_cours.upper():
+        accent_color = (147, 51, 234) # Purple
+        bg_color = (250, 245, 255)
+    elif "TD" in type_cours.upper():
+        accent_color = (16, 185, 129) # Emerald
+        bg_color = (240, 253, 244)
+    else: # Cours
+        accent_color = (59, 130, 246) # Blue
+        bg_color = (239, 246, 255)
+
+    # Fond de la carte
+    pdf.set_fill_color(*bg_color)
+    pdf.set_draw_color(200, 200, 200)
+    pdf.set_line_width(0.1)
+    pdf.rect(x, y, w, h, 'FD')
+
+    # Bande latérale colorée
+    pdf.set_fill_color(*accent_color)
+    pdf.rect(x, y, 2, h, 'F')
+
+    # Contenu Texte
+    # 1. Type
+    pdf.set_font("Helvetica", 'B', 7)
+    pdf.set_text_color(*accent_color)
+    pdf.set_xy(x + 4, y + 2)
+    pdf.cell(w - 6, 4, type_cours.upper(), ln=True)
+
+    # 2. Nom du Cours
+    pdf.set_font("Helvetica", 'B', 9) # Police légèrement réduite pour tenir
+    pdf.set_text_color(30, 41, 59)
+    pdf.set_xy(x + 4, y + 7)
+    short_name = (course_name[:25] + '..') if len(course_name) > 25 else course_name
+    pdf.cell(w - 6, 5, short_name, ln=True)
+
+    # 3. Professeur
+    pdf.set_font("Helvetica", '', 7)
+    pdf.set_text_color(100, 116, 139)
+    pdf.set_xy(x + 4, y + 13)
+    teacher_txt = teacher if teacher else "Non assigné"
+    pdf.cell(w - 6, 4, teacher_txt, ln=True)
+
+    # 4. Salle & Groupe
+    pdf.set_font("Helvetica", 'B', 8)
+    pdf.set_text_color(71, 85, 105)
+    pdf.set_xy(x + 4, y + 20)
+    
+    info_bottom = f"SALLE: {room}"
+    if group:
+        info_bottom += f" | {group}"
+        
+    pdf.cell(w - 6, 4, info_bottom, ln=True)
+
+
+def draw_grid(pdf):
+    """Grille vide : jours, heures et cases blanches."""
+    # DESSIN DES JOURS
+    pdf.set_xy(MARGIN_LEFT + HOUR_COL_WIDTH, START_Y)
+    pdf.set_font("Helvetica", 'B', 11)
+    pdf.set_fill_color(107, 93, 211)
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_draw_color(107, 93, 211)
+    for day in DAYS:
+        pdf.cell(COL_WIDTH, HEADER_HEIGHT, day, border=1, align='C', fill=True)
+
+    # GRILLE
+    for i, start_time in enumerate(TIMES):
+        # Colonne Heure
+        pdf.set_xy(MARGIN_LEFT, GRID_Y + (i * ROW_HEIGHT))
+        pdf.set_font("Helvetica", 'B', 9)
+        pdf.set_fill_color(241, 245, 249)
+        pdf.set_text_color(71, 85, 105)
+        pdf.set_draw_color(226, 232, 240)
+        pdf.cell(HOUR_COL_WIDTH, ROW_HEIGHT, start_time, border=1, align='C', fill=True)
+
+        # Colonnes Jours (fond vide)
+        pdf.set_fill_color(255, 255, 255)
+        pdf.set_draw_color(230, 230, 230)
+        for _ in DAYS:
+            pdf.cell(COL_WIDTH, ROW_HEIGHT, "", border=1, fill=True)
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def new_page_from_template():
+    """Copie du gabarit pré-rendu (page A4 paysage avec la grille vide)."""
+    global _template
+    with _template_lock:
+        if _template is None:
+            pdf = FPDF(orientation='L', unit='mm', format='A4')
+            pdf.add_page()
+            draw_grid(pdf)
+            _template = pdf
+        return copy.deepcopy(_template)
+
+
+def index_cells(slots):
+    """
+    {(n° du jour, n° de ligne): séance}. Une séance tombe dans la ligne dont
+    l'heure de début a la même heure pleine (08:00 et 08:30 -> ligne 08:00).
+    `slots` : objets avec day_of_week et start_min ; la première séance gagne.
+    """
+    row_by_hour = {int(t[:2]): i for i, t in enumerate(TIMES)}
+    cells = {}
+    for slot in slots:
+        if slot.day_of_week is None or slot.start_min is None or slot.day_of_week >= len(DAYS):
+            continue
+        row = row_by_hour.get(slot.start_min // 60)
+        if row is not None:
+            cells.setdefault((slot.day_of_week, row), slot)
+    return cells
+
+
+def build_cards(slots, for_teacher=False):
+    """
+    Cartes à dessiner pour des lignes (day_of_week, start_min, type, group_id,
+    course_name, room_name, teacher_name). Sur l'emploi du temps d'un
+    enseignant, la dernière ligne de la carte indique le groupe.
+    """
+    return {
+        pos: (
+            slot.course_name or "Inconnu", slot.type or "Cours", slot.room_name or "?",
+            f"Gr: {slot.group_id or '?'}" if for_teacher else (slot.teacher_name or ""),
+        )
+        for pos, slot in index_cells(slots).items()
+    }
+
+
+def draw_cards(pdf, cards):
+    """`cards` : {(jour, ligne): (cours, type, salle, texte enseignant/groupe)}."""
+    for (d, row), (c_name, s_type, r_name, t_name) in sorted(cards.items()):
+        x = MARGIN_LEFT + HOUR_COL_WIDTH + d * COL_WIDTH
+        y = GRID_Y + row * ROW_HEIGHT
+        draw_course_card(pdf, x + 1, y + 1, COL_WIDTH - 2, ROW_HEIGHT - 2, c_name, s_type, r_name, t_name)
+
+
+def render_timetable(title, subtitle, cards):
+    """Document complet en mémoire (bytes)."""
+    pdf = new_page_from_template()
+    draw_header(pdf, title, subtitle)
+    draw_cards(pdf, cards)
+    return bytes(pdf.output())
+
+
+# =====================================================================
+# EXPORT GROUPÉ (ZIP OU PDF MULTI-PAGES)
+# =====================================================================
+# Une page = (nom de fichier, titre, sous-titre, cartes) : uniquement des
+# types simples, pour pouvoir être envoyée aux processus du pool.
+
+def safe_filename(name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", str(name)).strip("_") or "sans_nom"
+
+
+def render_pages(pages):
+    """[(nom, bytes)] : un document par page (exécuté dans un processus du pool)."""
+    return [(filename, render_timetable(title, subtitle, cards)) for filename, title, subtitle, cards in pages]
+
+
+def render_multipage(pages):
+    """Un seul document, une page par emploi du temps."""
+    pdf = FPDF(orientation='L', unit='mm', format='A4')
+    for _, title, subtitle, cards in pages:
+        pdf.add_page()
+        draw_grid(pdf)
+        draw_header(pdf, title, subtitle)
+        draw_cards(pdf, cards)
+    return bytes(pdf.output())
+
+
+def zip_documents(documents):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for filename, content in documents:
+            archive.writestr(filename, content)
+    return buffer.getvalue()
+
+
+def chunk(items, n_chunks):
+    size = max(1, -(-len(items) // max(1, n_chunks)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
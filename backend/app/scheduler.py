@@ -0,0 +1,535 @@
+"""
+Moteur de génération d'emploi du temps en mémoire.
+
+Toutes les données (groupes, salles, enseignants, modules) sont chargées une
+seule fois, puis l'occupation est tenue dans des bitsets (un entier Python par
+enseignant, salle et groupe, un bit par couple (jour, créneau)). La recherche
+d'un placement ne touche donc jamais la base, et le résultat final est écrit
+en un seul INSERT groupé.
+"""
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from .models.models import Course, Group, Room, Teacher, TimeSlot, compact_time_fields
+from .timeutils import day_index, to_minutes
+
+DAYS = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"]
+TIME_SLOTS = [("08:00", "10:00"), ("10:15", "12:15"), ("14:00", "16:00"), ("16:15", "18:15")]
+
+# Une séance dure 2h : au-delà de 3 séances (6h) par jour, le groupe est saturé
+MAX_DAILY_SESSIONS = 3
+SESSION_TYPES = ("Cours", "TD", "TP")
+ROOM_TYPE_FOR_SESSION = {"Cours": "Amphi", "TD": "Standard", "TP": "Labo Info"}
+
+
+# =====================================================================
+# DONNÉES D'ENTRÉE (objets simples, sérialisables)
+# =====================================================================
+@dataclass(frozen=True)
+class RoomInfo:
+    id: int
+    type: str
+    capacity: int
+
+
+@dataclass(frozen=True)
+class CourseInfo:
+    id: int
+    teacher_id: Optional[int]
+    hours_cours: int = 0
+    hours_td: int = 0
+    hours_tp: int = 0
+
+
+@dataclass(frozen=True)
+class GroupInfo:
+    id: str
+    name: str
+    student_count: int
+    courses: Tuple[CourseInfo, ...] = ()
+
+
+@dataclass
+class ScheduleInput:
+    groups: List[GroupInfo]
+    rooms: List[RoomInfo]
+    teacher_ids: List[int]
+
+
+@dataclass(frozen=True)
+class SessionRequest:
+    course_id: int
+    teacher_id: int
+    group_key: str
+    type: str
+
+
+@dataclass(frozen=True)
+class Placement:
+    course_id: int
+    teacher_id: int
+    room_id: int
+    group_id: str
+    day: str
+    start_time: str
+    end_time: str
+    type: str
+
+    def as_row(self):
+        return {
+            "course_id": self.course_id, "teacher_id": self.teacher_id, "room_id": self.room_id,
+            "group_id": self.group_id, "day": self.day, "start_time": self.start_time,
+            "end_time": self.end_time, "type": self.type,
+            **compact_time_fields(day=self.day, start_time=self.start_time, end_time=self.end_time),
+        }
+
+
+@dataclass
+class ScheduleResult:
+    placements: List[Placement] = field(default_factory=list)
+    unplaced: List[SessionRequest] = field(default_factory=list)
+
+
+def load_schedule_input(db: Session) -> ScheduleInput:
+    """Charge en 4 requêtes tout ce dont le moteur a besoin."""
+    rooms = [RoomInfo(r.id, r.type or "Standard", r.capacity or 0) for r in db.query(Room).order_by(Room.id).all()]
+    teacher_ids = [t_id for (t_id,) in db.query(Teacher.id).order_by(Teacher.id).all()]
+
+    courses_by_group: Dict[str, List[CourseInfo]] = {}
+    for c in db.query(Course).filter(Course.group_id.isnot(None)).order_by(Course.id).all():
+        courses_by_group.setdefault(c.group_id, []).append(CourseInfo(
+            c.id, c.teacher_id, int(c.hours_cours or 0), int(c.hours_td or 0), int(c.hours_tp or 0)
+        ))
+
+    groups = [
+        GroupInfo(g.id, g.name, g.student_count or 0, tuple(courses_by_group.get(g.id, ())))
+        for g in db.query(Group).order_by(Group.id).all()
+    ]
+    return ScheduleInput(groups=groups, rooms=rooms, teacher_ids=teacher_ids)
+
+
+# =====================================================================
+# MOTEUR
+# =====================================================================
+class SchedulerEngine:
+    """Occupation indexée par enseignant, salle et groupe pour chaque (jour, créneau)."""
+
+    def __init__(self, data: ScheduleInput, days=DAYS, time_slots=TIME_SLOTS):
+        self.data = data
+        self.days = list(days)
+        self.time_slots = list(time_slots)
+        self.n_slots = len(self.time_slots)
+
+        self.rooms = list(data.rooms)
+        self.room_index = {r.id: i for i, r in enumerate(self.rooms)}
+        self.all_rooms_mask = (1 << len(self.rooms)) - 1
+
+        # Bitsets d'occupation : bit (jour * n_slots + créneau)
+        self.teacher_busy: Dict[int, int] = {}
+        self.group_busy: Dict[str, int] = {}
+        # Pour chaque (jour, créneau), masque des salles libres (bit = index de salle)
+        self.free_rooms = [self.all_rooms_mask] * (len(self.days) * self.n_slots)
+        # Contraintes pédagogiques
+        self.cours_days: Dict[Tuple[str, int], int] = {}
+        self._cours_count: Counter = Counter()
+        self.daily_count: Dict[str, List[int]] = {}
+
+        self._tier_cache: Dict[Tuple[str, int], List[int]] = {}
+        self._start_index = {start: i for i, (start, _) in enumerate(self.time_slots)}
+
+    # --- Occupation -------------------------------------------------
+    def _bit(self, day_idx, slot_idx):
+        return day_idx * self.n_slots + slot_idx
+
+    def _mark_busy(self, pos, teacher_id, room_id, group_key):
+        bit = 1 << pos
+        if teacher_id is not None:
+            self.teacher_busy[teacher_id] = self.teacher_busy.get(teacher_id, 0) | bit
+        if group_key is not None:
+            self.group_busy[group_key] = self.group_busy.get(group_key, 0) | bit
+        room_i = self.room_index.get(room_id)
+        if room_i is not None:
+            self.free_rooms[pos] &= ~(1 << room_i)
+
+    def _count_session(self, day_idx, group_key, course_id, s_type):
+        if group_key is None:
+            return
+        self.daily_count.setdefault(group_key, [0] * len(self.days))[day_idx] += 1
+        if s_type == "Cours" and course_id is not None:
+            key = (group_key, course_id)
+            self.cours_days[key] = self.cours_days.get(key, 0) | (1 << day_idx)
+            self._cours_count[(group_key, course_id, day_idx)] += 1
+
+    def occupy(self, day_idx, slot_idx, teacher_id, room_id, group_key, course_id=None, s_type=None):
+        self._mark_busy(self._bit(day_idx, slot_idx), teacher_id, room_id, group_key)
+        self._count_session(day_idx, group_key, course_id, s_type)
+
+    def release(self, placement: "Placement"):
+        """Annule `occupy` pour une séance placée par le moteur (recherche locale)."""
+        d, t = self.days.index(placement.day), self._start_index[placement.start_time]
+        bit = 1 << self._bit(d, t)
+        self.teacher_busy[placement.teacher_id] &= ~bit
+        self.group_busy[placement.group_id] &= ~bit
+        self.free_rooms[self._bit(d, t)] |= 1 << self.room_index[placement.room_id]
+        self.daily_count[placement.group_id][d] -= 1
+        if placement.type == "Cours":
+            key = (placement.group_id, placement.course_id)
+            self._cours_count[key + (d,)] -= 1
+            if self._cours_count[key + (d,)] <= 0:
+                self.cours_days[key] &= ~(1 << d)
+
+    def reserve_existing(self, slots):
+        """
+        Marque comme occupées des séances déjà en base (objets TimeSlot). Une
+        séance hors grille (ex. rattrapage 12:30-13:30) bloque tous les
+        créneaux de la grille qu'elle chevauche.
+        """
+        day_pos = {day_index(d): i for i, d in enumerate(self.days)}
+        grid = [(to_minutes(start), to_minutes(end)) for start, end in self.time_slots]
+        for s in slots:
+            d = day_pos.get(s.day_of_week)
+            if d is None or s.start_min is None or s.end_min is None:
+                continue
+            hit = [t for t, (g_start, g_end) in enumerate(grid) if s.start_min < g_end and s.end_min > g_start]
+            for t in hit:
+                self._mark_busy(self._bit(d, t), s.teacher_id, s.room_id, s.group_id)
+            if hit:
+                self._count_session(d, s.group_id, s.course_id, s.type)
+
+    # --- Contraintes -------------------------------------------------
+    def day_allowed(self, group_key, course_id, day_idx, s_type):
+        if s_type != "Cours" and (self.cours_days.get((group_key, course_id), 0) >> day_idx) & 1:
+            return False
+        counts = self.daily_count.get(group_key)
+        if counts and counts[day_idx] >= MAX_DAILY_SESSIONS:
+            return False
+        return True
+
+    def room_tiers(self, s_type, student_count):
+        """
+        Masques de salles par ordre de préférence : bon type et assez grande,
+        bon type mais trop petite, autre type assez grande, puis le reste.
+        """
+        req_type = ROOM_TYPE_FOR_SESSION.get(s_type, "Standard")
+        key = (req_type, student_count)
+        tiers = self._tier_cache.get(key)
+        if tiers is None:
+            tiers = [0, 0, 0, 0]
+            for i, r in enumerate(self.rooms):
+                tiers[((r.type != req_type) << 1) | (r.capacity < student_count)] |= 1 << i
+            tiers = [m for m in tiers if m]
+            self._tier_cache[key] = tiers
+        return tiers
+
+    def find_room(self, day_idx, slot_idx, tiers):
+        free = self.free_rooms[self._bit(day_idx, slot_idx)]
+        for mask in tiers:
+            candidates = free & mask
+            if candidates:
+                return self.rooms[(candidates & -candidates).bit_length() - 1]
+        return None
+
+    # --- Résolution --------------------------------------------------
+    def build_sessions(self, group: GroupInfo, rng: random.Random, already_placed: Optional[Counter] = None):
+        """
+        Séances à placer pour un groupe ; `already_placed` compte les séances
+        conservées (verrouillées) par (course_id, type), qui ne sont pas refaites.
+        """
+        remaining = Counter(already_placed or ())
+        courses = list(group.courses)
+        rng.shuffle(courses)
+        teacher_ids = self.data.teacher_ids
+
+        sessions = []
+        for course in courses:
+            t_id = course.teacher_id or (teacher_ids[course.id % len(teacher_ids)] if teacher_ids else None)
+            if not t_id: continue
+            for s_type, hours in (("Cours", course.hours_cours), ("TD", course.hours_td), ("TP", course.hours_tp)):
+                for _ in range((hours + 1) // 2):
+                    if remaining[(course.id, s_type)] > 0:
+                        remaining[(course.id, s_type)] -= 1
+                        continue
+                    sessions.append(SessionRequest(course.id, t_id, group.name, s_type))
+        sessions.sort(key=lambda s: s.type != "Cours")
+        return sessions
+
+    def place(self, session: SessionRequest, student_count, rng: random.Random):
+        pref_days = list(range(len(self.days)))
+        if session.type != "Cours": rng.shuffle(pref_days)
+        tiers = self.room_tiers(session.type, student_count)
+
+        for d in pref_days:
+            if not self.day_allowed(session.group_key, session.course_id, d, session.type): continue
+            for t in range(self.n_slots):
+                placement = self.place_at(session, d, t, tiers)
+                if placement: return placement
+        return None
+
+    def place_at(self, session: SessionRequest, d, t, tiers):
+        """Place la séance en (jour d, créneau t) si enseignant, groupe et une salle sont libres."""
+        bit = 1 << self._bit(d, t)
+        if (self.teacher_busy.get(session.teacher_id, 0) | self.group_busy.get(session.group_key, 0)) & bit:
+            return None
+        room = self.find_room(d, t, tiers)
+        if room is None:
+            return None
+
+        self.occupy(d, t, session.teacher_id, room.id, session.group_key, session.course_id, session.type)
+        start, end = self.time_slots[t]
+        return Placement(session.course_id, session.teacher_id, room.id, session.group_key,
+                         self.days[d], start, end, session.type)
+
+    def place_anywhere(self, session: SessionRequest, student_count):
+        tiers = self.room_tiers(session.type, student_count)
+        for d in range(len(self.days)):
+            if not self.day_allowed(session.group_key, session.course_id, d, session.type): continue
+            for t in range(self.n_slots):
+                placement = self.place_at(session, d, t, tiers)
+                if placement: return placement
+        return None
+
+    def repair(self, result: ScheduleResult, student_counts, max_rounds=2):
+        """
+        Recherche locale : pour chaque séance non placée, on tente de déplacer
+        une séance déjà placée du même groupe ou du même enseignant afin de
+        libérer un créneau, puis de replacer les deux.
+        """
+        for _ in range(max_rounds):
+            still_unplaced = []
+            for session in result.unplaced:
+                count = student_counts.get(session.group_key, 0)
+                placement = self.place_anywhere(session, count)
+                if placement is None:
+                    placement = self._place_by_moving(session, result, student_counts)
+                if placement:
+                    result.placements.append(placement)
+                else:
+                    still_unplaced.append(session)
+            improved = len(still_unplaced) < len(result.unplaced)
+            result.unplaced = still_unplaced
+            if not improved or not still_unplaced:
+                break
+        return result
+
+    def _place_by_moving(self, session, result, student_counts):
+        for i, other in enumerate(result.placements):
+            if other.group_id != session.group_key and other.teacher_id != session.teacher_id:
+                continue
+            self.release(other)
+            placement = self.place_anywhere(session, student_counts.get(session.group_key, 0))
+            if placement:
+                moved = self.place_anywhere(
+                    SessionRequest(other.course_id, other.teacher_id, other.group_id, other.type),
+                    student_counts.get(other.group_id, 0)
+                )
+                if moved:
+                    result.placements[i] = moved
+                    return placement
+                self.release(placement)
+            # Échec : on remet la séance déplacée à sa place d'origine
+            self.occupy(self.days.index(other.day), self._start_index[other.start_time], other.teacher_id,
+                        other.room_id, other.group_id, other.course_id, other.type)
+        return None
+
+    def solve(self, groups: Optional[List[GroupInfo]] = None, seed=None, already_placed=None) -> ScheduleResult:
+        """`already_placed` : {nom de groupe: Counter((course_id, type))} des séances conservées."""
+        rng = random.Random(seed)
+        result = ScheduleResult()
+        already_placed = already_placed or {}
+        for group in (groups if groups is not None else self.data.groups):
+            for session in self.build_sessions(group, rng, already_placed.get(group.name)):
+                placement = self.place(session, group.student_count, rng)
+                if placement:
+                    result.placements.append(placement)
+                else:
+                    result.unplaced.append(session)
+        return result
+
+
+# =====================================================================
+# MULTI-DÉPART ET ÉVALUATION DE LA QUALITÉ
+# =====================================================================
+SCORE_WEIGHTS = {"unplaced": 1000, "capacity": 20, "oversize": 1, "gaps": 5, "daily_load": 3}
+
+
+@dataclass
+class ScoredSchedule:
+    score: float
+    breakdown: Dict[str, float]
+    result: ScheduleResult
+    seed: Optional[int] = None
+
+
+def score_schedule(engine: SchedulerEngine, result: ScheduleResult, groups: List[GroupInfo]):
+    """
+    Note d'un emploi du temps (plus bas = meilleur) : séances non placées,
+    salles trop petites (ou beaucoup trop grandes), trous dans la journée
+    des groupes et déséquilibre de charge entre les jours.
+    """
+    capacities = {r.id: r.capacity for r in engine.rooms}
+    sizes = {g.name: g.student_count for g in groups}
+
+    capacity = oversize = 0
+    for p in result.placements:
+        cap, size = capacities.get(p.room_id, 0), sizes.get(p.group_id, 0)
+        if cap < size:
+            capacity += 1
+        elif size:
+            oversize += (cap - size) / cap
+
+    gaps = daily_load = 0
+    n = engine.n_slots
+    day_mask = (1 << n) - 1
+    for g in groups:
+        busy = engine.group_busy.get(g.name, 0)
+        for d in range(len(engine.days)):
+            bits = (busy >> (d * n)) & day_mask
+            if bits:
+                lowest = (bits & -bits).bit_length() - 1
+                gaps += bits.bit_length() - lowest - bin(bits).count("1")
+        counts = engine.daily_count.get(g.name)
+        if counts:
+            daily_load += max(counts) - min(counts)
+
+    breakdown = {"unplaced": len(result.unplaced), "capacity": capacity, "oversize": round(oversize, 2),
+                 "gaps": gaps, "daily_load": daily_load}
+    score = round(sum(SCORE_WEIGHTS[k] * v for k, v in breakdown.items()), 2)
+    return score, breakdown
+
+
+def run_start(engine: SchedulerEngine, groups, seed, already_placed=None, improve=False) -> ScoredSchedule:
+    """Un départ : résolution gloutonne avec `seed`, recherche locale optionnelle, puis note."""
+    result = engine.solve(groups, seed=seed, already_placed=already_placed)
+    if improve and result.unplaced:
+        engine.repair(result, {g.name: g.student_count for g in groups})
+    score, breakdown = score_schedule(engine, result, groups)
+    return ScoredSchedule(score, breakdown, result, seed)
+
+
+def start_seeds(starts, seed=None):
+    base = seed if seed is not None else random.randrange(2 ** 31)
+    return [base + i for i in range(max(1, starts))]
+
+
+def best_of(candidates: List[ScoredSchedule]) -> ScoredSchedule:
+    return min(candidates, key=lambda c: (c.score, c.seed if c.seed is not None else 0))
+
+
+# =====================================================================
+# ÉCRITURE
+# =====================================================================
+DELETE_CHUNK = 500
+
+
+def write_schedule(db: Session, placements: List[Placement]):
+    """Insère toutes les séances en un seul INSERT groupé (sans commit)."""
+    if placements:
+        db.execute(insert(TimeSlot), [p.as_row() for p in placements])
+
+
+def is_locked(slot):
+    """Séance à conserver : verrouillée à la main ou rattrapage validé."""
+    return bool(slot.locked) or slot.type == "Rattrapage"
+
+
+def _slot_key(slot):
+    return (slot.course_id, slot.teacher_id, slot.room_id, slot.group_id, slot.day, slot.start_time, slot.end_time, slot.type)
+
+
+@dataclass
+class RegenerationReport:
+    target_groups: List[str]
+    kept: int = 0
+    inserted: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    unplaced: int = 0
+
+
+def select_target_groups(data: ScheduleInput, existing_slots, groups=None, teachers=None, rooms=None):
+    """
+    Groupes à recalculer : ceux demandés explicitement, ceux dont un module
+    est assuré par un enseignant demandé, et ceux qui ont cours dans une
+    salle demandée. Sans filtre, tous les groupes.
+    """
+    if not (groups or teachers or rooms):
+        return list(data.groups)
+    groups, teachers, rooms = set(groups or ()), set(teachers or ()), set(rooms or ())
+    keys_in_rooms = {s.group_id for s in existing_slots if s.room_id in rooms}
+    return [
+        g for g in data.groups
+        if g.id in groups or g.name in groups
+        or any(c.teacher_id in teachers for c in g.courses)
+        or g.name in keys_in_rooms or g.id in keys_in_rooms
+    ]
+
+
+def regenerate(db: Session, data: ScheduleInput, target_groups: List[GroupInfo], keep_locked=True,
+               seed=None, existing_slots=None, solve=None):
+    """
+    Recalcule les groupes ciblés et écrit uniquement la différence.
+
+    Les séances des autres groupes (et, avec `keep_locked`, les séances
+    verrouillées ou de rattrapage) sont chargées comme occupation fixe du
+    moteur ; seules les séances réellement différentes sont supprimées ou
+    insérées, dans une seule transaction (commit laissé à l'appelant).
+    `solve(engine, groups, already_placed)` permet de changer de solveur.
+    """
+    if existing_slots is None:
+        existing_slots = db.query(TimeSlot).all()
+    full_rebuild = len(target_groups) == len(data.groups)
+    target_keys = {g.name for g in target_groups} | {g.id for g in target_groups}
+
+    replaced, kept = [], []
+    for slot in existing_slots:
+        in_scope = full_rebuild or slot.group_id in target_keys
+        if in_scope and not (keep_locked and is_locked(slot)):
+            replaced.append(slot)
+        else:
+            kept.append(slot)
+
+    engine = SchedulerEngine(data)
+    engine.reserve_existing(kept)
+    already_placed = {}
+    for slot in kept:
+        if slot.group_id in target_keys and slot.type in SESSION_TYPES:
+            already_placed.setdefault(slot.group_id, Counter())[(slot.course_id, slot.type)] += 1
+
+    if solve is None:
+        result = engine.solve(target_groups, seed=seed, already_placed=already_placed)
+    else:
+        result = solve(engine, target_groups, already_placed)
+
+    # Diff : on ne touche qu'aux séances qui changent réellement
+    new_by_key = Counter(_slot_key(p) for p in result.placements)
+    to_delete = []
+    for slot in replaced:
+        key = _slot_key(slot)
+        if new_by_key[key] > 0:
+            new_by_key[key] -= 1
+        else:
+            to_delete.append(slot.id)
+    to_insert = []
+    for p in result.placements:
+        key = _slot_key(p)
+        if new_by_key[key] > 0:
+            new_by_key[key] -= 1
+            to_insert.append(p)
+
+    for i in range(0, len(to_delete), DELETE_CHUNK):
+        db.query(TimeSlot).filter(TimeSlot.id.in_(to_delete[i:i + DELETE_CHUNK])).delete(synchronize_session=False)
+    write_schedule(db, to_insert)
+
+    return RegenerationReport(
+        target_groups=[g.name for g in target_groups],
+        kept=len(kept),
+        inserted=len(to_insert),
+        deleted=len(to_delete),
+        unchanged=len(replaced) - len(to_delete),
+        unplaced=len(result.unplaced),
+    )
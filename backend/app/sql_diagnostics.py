@@ -0,0 +1,119 @@
+"""
+Mode diagnostic SQL (développement) : détection des N+1 et journal des
+requêtes lentes.
+
+Activé par UNITIME_SQL_DIAGNOSTICS=1. Chaque requête SQL est rattachée à la
+requête HTTP en cours (ContextVar de `metrics`) et regroupée par forme
+normalisée (littéraux et listes IN remplacés par des jokers). En fin de
+requête HTTP, toute forme exécutée au moins UNITIME_N_PLUS_ONE_THRESHOLD fois
+est signalée avec sa route : c'est la signature d'une requête dans une boucle.
+Les requêtes plus lentes que UNITIME_SLOW_QUERY_MS sont journalisées au fil
+de l'eau.
+
+`assert_max_queries` sert à borner le nombre de requêtes d'un appel
+d'endpoint (scripts de vérification, benchmarks).
+"""
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from .metrics import current_request, request_finished_hooks, route_of
+
+logger = logging.getLogger("unitime.sql")
+
+DIAGNOSTICS_ENABLED = os.getenv("UNITIME_SQL_DIAGNOSTICS", "0").strip().lower() in ("1", "true", "yes", "on")
+N_PLUS_ONE_THRESHOLD = int(os.getenv("UNITIME_N_PLUS_ONE_THRESHOLD", "5"))
+SLOW_QUERY_MS = float(os.getenv("UNITIME_SLOW_QUERY_MS", "100"))
+
+_START_KEY = "unitime_diag_start"
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)\s*,?)+\)", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_sql(statement):
+    """Forme d'une requête : deux exécutions de la même boucle donnent la même forme."""
+    sql = _STRING.sub("?", statement)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def _short(sql, limit=300):
+    return sql if len(sql) <= limit else sql[:limit] + "..."
+
+
+def repeated_statements(statements, threshold=N_PLUS_ONE_THRESHOLD):
+    """[(forme, nombre)] des formes exécutées au moins `threshold` fois."""
+    return [(sql, n) for sql, n in statements.most_common() if n >= threshold]
+
+
+def report_request(method, route, stats):
+    if not stats.statements:
+        return
+    for sql, n in repeated_statements(stats.statements):
+        logger.warning("N+1 probable sur %s %s : %d exécutions de « %s »", method, route, n, _short(sql))
+
+
+def instrument_diagnostics(engine):
+    """Branche le mode diagnostic sur `engine` (sans effet s'il est désactivé)."""
+    if not DIAGNOSTICS_ENABLED:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info[_START_KEY] = time.perf_counter()
+        stats = current_request.get()
+        if stats is not None:
+            if stats.statements is None:
+                stats.statements = Counter()
+            stats.statements[normalize_sql(statement)] += 1
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop(_START_KEY, None)
+        if start is None:
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms >= SLOW_QUERY_MS:
+            stats = current_request.get()
+            endpoint = f"{stats.scope['method']} {route_of(stats.scope)}" if stats is not None and stats.scope else "hors requête"
+            logger.warning("Requête lente (%.1f ms) sur %s : %s", elapsed_ms, endpoint, _short(normalize_sql(statement)))
+
+    if report_request not in request_finished_hooks:
+        request_finished_hooks.append(report_request)
+
+
+@contextmanager
+def assert_max_queries(engine, max_queries):
+    """
+    Échoue (AssertionError) si le bloc exécute plus de `max_queries` requêtes
+    SQL sur `engine`, quel que soit le thread qui les émet :
+
+        with assert_max_queries(engine, 3):
+            client.get("/timetable/G1")
+
+    Le message liste les formes de requêtes, les plus répétées d'abord.
+    """
+    statements = Counter()
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements[normalize_sql(statement)] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+
+    total = sum(statements.values())
+    if total > max_queries:
+        details = "\n".join(f"  {n} x {_short(sql)}" for sql, n in statements.most_common())
+        raise AssertionError(f"{total} requêtes SQL exécutées (maximum {max_queries}) :\n{details}")
@@ -0,0 +1,74 @@
+"""
+Statistiques du tableau de bord (/stats/, NEON, bootstrap admin).
+
+Deux requêtes au lieu d'un COUNT(*) par table :
+- une requête d'agrégats (sous-requêtes scalaires) pour tous les compteurs ;
+- un GROUP BY unique sur les séances (salle x département) d'où sont tirées
+  la répartition par département et l'occupation des salles.
+
+Le résultat est mémorisé tant qu'aucune table concernée n'a changé : les
+ouvertures successives du tableau de bord ne touchent pas la base.
+"""
+from sqlalchemy import func, select
+
+from .cache import VersionedCache
+from .models.models import Course, Reservation, Room, Teacher, TimeSlot, User
+from .scheduler import DAYS, TIME_SLOTS
+
+STATS_TABLES = ("rooms", "teachers", "users", "time_slots", "courses", "reservations")
+
+# Créneaux hebdomadaires de la grille : base du taux d'occupation d'une salle
+WEEKLY_SLOTS = len(DAYS) * len(TIME_SLOTS)
+
+_stats_cache = VersionedCache(max_entries=4)
+
+
+def _count(model, *conditions):
+    return select(func.count()).select_from(model).where(*conditions).scalar_subquery()
+
+
+def _compute(db):
+    counters = db.execute(select(
+        _count(Room).label("rooms_count"),
+        _count(Teacher).label("teachers_count"),
+        _count(User, User.role == "student").label("students_count"),
+        _count(TimeSlot).label("sessions_count"),
+        _count(Course).label("courses_count"),
+        _count(Reservation, Reservation.status == "pending").label("pending_reservations_count"),
+        _count(User, User.is_active == False).label("pending_users_count"),
+    )).one()
+    stats = dict(counters._mapping)
+
+    rows = db.execute(
+        select(TimeSlot.room_id, Room.name, Room.capacity, Teacher.department, func.count())
+        .select_from(TimeSlot)
+        .outerjoin(Room, Room.id == TimeSlot.room_id)
+        .outerjoin(Teacher, Teacher.id == TimeSlot.teacher_id)
+        .group_by(TimeSlot.room_id, Room.name, Room.capacity, Teacher.department)
+    ).all()
+
+    per_department, per_room = {}, {}
+    for room_id, room_name, capacity, department, n in rows:
+        dept = department or "Non renseigné"
+        per_department[dept] = per_department.get(dept, 0) + n
+        if room_id is not None:
+            entry = per_room.setdefault(room_id, {"room_id": room_id, "room_name": room_name, "capacity": capacity, "sessions": 0})
+            entry["sessions"] += n
+
+    utilization = sorted(per_room.values(), key=lambda r: (-r["sessions"], r["room_id"]))
+    for entry in utilization:
+        entry["utilization"] = round(entry["sessions"] / WEEKLY_SLOTS, 3)
+    used = len(per_room)
+
+    stats["breakdowns"] = {
+        "sessions_per_department": dict(sorted(per_department.items(), key=lambda kv: -kv[1])),
+        "room_utilization": utilization,
+        "rooms_unused": max(0, stats["rooms_count"] - used),
+        "average_room_utilization": round(stats["sessions_count"] / (WEEKLY_SLOTS * stats["rooms_count"]), 3) if stats["rooms_count"] else 0.0,
+        "weekly_slots_per_room": WEEKLY_SLOTS,
+    }
+    return stats
+
+
+def compute_stats(db):
+    return _stats_cache.get_or_build("stats", STATS_TABLES, lambda: _compute(db))
@@ -0,0 +1,40 @@
+"""
+Représentation compacte des jours et horaires.
+
+Les jours sont stockés en entier (0 = Lundi, comme `datetime.weekday()`) et
+les heures en minutes depuis minuit, ce qui rend les tests de chevauchement
+indexables (comparaisons d'entiers au lieu de chaînes "HH:MM").
+"""
+DAY_NAMES = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
+_DAY_INDEX = {name.lower(): i for i, name in enumerate(DAY_NAMES)}
+
+
+def day_index(day):
+    """'Mardi' -> 1 (accepte aussi un entier déjà converti). None si inconnu."""
+    if day is None:
+        return None
+    if isinstance(day, int):
+        return day if 0 <= day < len(DAY_NAMES) else None
+    day = str(day).strip()
+    if day.isdigit():
+        return day_index(int(day))
+    return _DAY_INDEX.get(day.lower())
+
+
+def to_minutes(hhmm):
+    """'08:30' -> 510. Renvoie None si l'heure est illisible."""
+    try:
+        h, m = str(hhmm).strip().replace("h", ":").split(":")[:2]
+        return int(h) * 60 + int(m or 0)
+    except (ValueError, AttributeError):
+        return None
+
+
+def from_minutes(minutes):
+    """510 -> '08:30'."""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def overlaps(column_start, column_end, start_min, end_min):
+    """Condition SQL de chevauchement de [start_min, end_min[ avec un intervalle en base."""
+    return (column_start < end_min) & (column_end > start_min)
@@ -0,0 +1,152 @@
+"""
+Générateur de données synthétiques à l'échelle d'un campus.
+
+Départements, filières et semestres, salles (amphis, salles de TD, labos),
+enseignants rattachés à un département, groupes, modules et comptes
+utilisateurs (enseignants et étudiants). Insertion en masse
+(`insert(...)` avec une liste de lignes) pour rester rapide même à
+l'échelle « campus ».
+
+    python -m benchmarks.datagen --scale campus      # remplit DATABASE_URL
+"""
+import argparse
+import random
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import insert
+
+DEPARTMENTS = {
+    "Informatique": ["LST AD", "LST GI", "MST SIDI"],
+    "Mathématiques": ["LST MA", "MST MAS"],
+    "Physique": ["LST PH", "MST PEE"],
+    "Chimie": ["LST CH", "MST CA"],
+    "Biologie": ["LST BV", "MST BIO"],
+    "Génie Civil": ["LST GC", "Cycle Ing. GC"],
+    "Génie Électrique": ["LST GE", "Cycle Ing. GEMI"],
+    "Sciences de la Terre": ["LST GEO"],
+}
+SEMESTERS = ["S1", "S2", "S3", "S4", "S5", "S6"]
+
+# Répartition des salles par type : (type, part, capacité min, capacité max)
+ROOM_MIX = [
+    ("Amphi", 0.15, 120, 300),
+    ("Standard", 0.60, 30, 60),
+    ("Labo Info", 0.25, 20, 40),
+]
+
+
+@dataclass(frozen=True)
+class Scale:
+    groups: int
+    rooms: int
+    teachers: int
+    courses_per_group: int
+    students: int
+
+
+SCALES = {
+    "small": Scale(groups=20, rooms=15, teachers=30, courses_per_group=5, students=500),
+    "medium": Scale(groups=200, rooms=120, teachers=250, courses_per_group=6, students=6000),
+    "campus": Scale(groups=2000, rooms=1000, teachers=2500, courses_per_group=6, students=60000),
+}
+
+CHUNK = 5000
+
+
+def _insert(db, model, rows):
+    for i in range(0, len(rows), CHUNK):
+        db.execute(insert(model), rows[i:i + CHUNK])
+
+
+def generate_campus(db, scale: Scale, seed=42):
+    """Insère un campus synthétique ; renvoie les volumes créés."""
+    from app.models.models import Course, Group, Room, Teacher, User
+
+    rnd = random.Random(seed)
+    departments = list(DEPARTMENTS)
+
+    # --- Salles -------------------------------------------------------
+    rooms = []
+    for r_type, share, low, high in ROOM_MIX:
+        for i in range(max(1, round(scale.rooms * share))):
+            rooms.append({
+                "name": f"{r_type} {i + 1}", "type": r_type,
+                "capacity": rnd.randrange(low, high + 1, 5), "equipment": "",
+            })
+    _insert(db, Room, rooms)
+
+    # --- Enseignants --------------------------------------------------
+    teachers = []
+    for i in range(scale.teachers):
+        teachers.append({
+            "name": f"Enseignant {i + 1:05d}", "email": f"prof{i + 1:05d}@bench.unitime.ma",
+            "department": departments[i % len(departments)],
+        })
+    _insert(db, Teacher, teachers)
+    teacher_ids = {dept: [] for dept in departments}
+    for t_id, dept in db.query(Teacher.id, Teacher.department).filter(Teacher.email.like("%@bench.unitime.ma")):
+        teacher_ids[dept].append(t_id)
+
+    # --- Groupes et modules -------------------------------------------
+    groups, courses = [], []
+    for i in range(scale.groups):
+        dept = departments[i % len(departments)]
+        filiere = rnd.choice(DEPARTMENTS[dept])
+        semester = SEMESTERS[(i // len(departments)) % len(SEMESTERS)]
+        g_id = f"{filiere.replace(' ', '')}-{semester}-G{i + 1:04d}"
+        groups.append({
+            "id": g_id, "name": g_id, "student_count": rnd.choice([20, 25, 30, 35, 40, 45, 55]),
+            "filiere": filiere, "semester": semester,
+        })
+        for j in range(scale.courses_per_group):
+            code = f"M{i + 1:04d}{j + 1:02d}"
+            courses.append({
+                "name": f"Module {code}", "code": code, "group_id": g_id,
+                "teacher_id": rnd.choice(teacher_ids[dept] or [None]),
+                "hours_cours": 2, "hours_td": rnd.choice([0, 2]), "hours_tp": rnd.choice([0, 0, 2]),
+            })
+    _insert(db, Group, groups)
+    _insert(db, Course, courses)
+
+    # --- Comptes ------------------------------------------------------
+    users = [
+        {"nom": t["name"], "email": t["email"], "password_hash": "bench", "role": "enseignant",
+         "department_id": t["department"], "is_active": True}
+        for t in teachers
+    ]
+    for i in range(scale.students):
+        group = groups[i % len(groups)]
+        users.append({
+            "nom": f"Étudiant {i + 1:06d}", "email": f"etu{i + 1:06d}@bench.unitime.ma",
+            "password_hash": "bench", "role": "student", "group_id": group["id"],
+            "semester": group["semester"], "is_active": True,
+        })
+    _insert(db, User, users)
+    db.commit()
+
+    return {
+        "rooms": len(rooms), "teachers": len(teachers), "groups": len(groups),
+        "courses": len(courses), "users": len(users),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remplit la base DATABASE_URL avec un campus synthétique.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from app.database import Base, SessionLocal, engine
+    from app.models import models  # noqa: F401  (enregistre les tables dans Base.metadata)
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        counts = generate_campus(db, SCALES[args.scale], seed=args.seed)
+    finally:
+        db.close()
+    print(f"🌱 Campus « {args.scale} » généré : {counts} ({asdict(SCALES[args.scale])})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Chronométrage des chemins critiques, résultats en JSON.
+
+Chaque cas est mesuré deux fois :
+- « cold » : les caches de réponses sont invalidés avant chaque appel
+  (coût réel de la requête, base comprise) ;
+- « warm » : appels successifs sans écriture entre eux (chemin servi par
+  les caches versionnés).
+
+Les appels passent par l'application complète (TestClient : routage,
+dépendances, sérialisation) ; le nombre de requêtes SQL par appel est
+relevé pour repérer les régressions de type N+1.
+
+    python -m benchmarks.run --scale medium --repeat 30 --out bench.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+CASES = ["generate", "timetable", "teacher_timetable", "search_rooms", "pdf_group", "pdf_teacher", "pdf_bulk", "login"]
+# Cas lourds : nombre d'itérations plafonné par --heavy-repeat
+HEAVY_CASES = {"generate", "pdf_bulk"}
+POLL_INTERVAL = 0.05
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    k = (len(ordered) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(samples):
+    """Statistiques (ms) d'une liste de (durée en s, requêtes SQL)."""
+    if not samples:
+        return None
+    ms = [d * 1000 for d, _ in samples]
+    queries = [q for _, q in samples]
+    return {
+        "n": len(ms),
+        "min_ms": round(min(ms), 3),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "max_ms": round(max(ms), 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "stdev_ms": round(statistics.stdev(ms), 3) if len(ms) > 1 else 0.0,
+        "sql_queries_mean": round(statistics.fmean(queries), 2),
+        "sql_queries_max": max(queries),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class QueryCounter:
+    """Compte les requêtes SQL exécutées sur le moteur, tous threads confondus."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+class Bench:
+    def __init__(self, client, engine, rnd, dataset):
+        self.client = client
+        self.queries = QueryCounter(engine)
+        self.rnd = rnd
+        self.dataset = dataset
+
+    def measure(self, call):
+        before = self.queries.count
+        start = time.perf_counter()
+        response = call()
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.request.method} {response.request.url} -> {response.status_code} : {response.text[:200]}")
+        return (elapsed, self.queries.count - before), response
+
+    # --- Appels ----------------------------------------------------------
+    def generate(self):
+        """Génération complète : soumission du job + attente de sa fin."""
+        before = self.queries.count
+        start = time.perf_counter()
+        job = self.client.post("/timetable/generate", params={"keep_locked": False, "seed": 1}).json()
+        while True:
+            state = self.client.get(f"/jobs/{job['job_id']}").json()
+            if state["status"] not in ("queued", "running"):
+                break
+            time.sleep(POLL_INTERVAL)
+        elapsed = time.perf_counter() - start
+        if state["status"] != "succeeded":
+            raise RuntimeError(f"Génération en échec : {state.get('error')}")
+        self.extra = {"placed": state["placed"], "unplaced": state["unplaced"]}
+        return (elapsed, self.queries.count - before)
+
+    def call(self, case):
+        rnd, ds, c = self.rnd, self.dataset, self.client
+        if case == "generate":
+            return self.generate()
+        if case == "timetable":
+            return self.measure(lambda: c.get(f"/timetable/{rnd.choice(ds['groups'])}"))[0]
+        if case == "teacher_timetable":
+            return self.measure(lambda: c.get(f"/timetable/teacher/{rnd.choice(ds['teachers'])}"))[0]
+        if case == "search_rooms":
+            start, end = rnd.choice([("08:00", "10:00"), ("10:15", "12:15"), ("14:00", "16:00"), ("16:15", "18:15")])
+            params = {"day": rnd.choice(["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"]),
+                      "start_time": start, "end_time": end, "capacity": rnd.choice([0, 30, 100])}
+            return self.measure(lambda: c.get("/rooms/search/", params=params))[0]
+        if case == "pdf_group":
+            return self.measure(lambda: c.get(f"/export-pdf/{rnd.choice(ds['groups'])}"))[0]
+        if case == "pdf_teacher":
+            return self.measure(lambda: c.get(f"/export-pdf/teacher/{rnd.choice(ds['teachers'])}"))[0]
+        if case == "pdf_bulk":
+            params = {"department": rnd.choice(ds["departments"]), "format": "zip"}
+            return self.measure(lambda: c.get("/export-pdf-bulk/", params=params))[0]
+        if case == "login":
+            email = rnd.choice(ds["logins"])
+            return self.measure(lambda: c.post("/login/", json={"email": email, "password": "bench"}))[0]
+        raise ValueError(f"Cas inconnu : {case}")
+
+
+def load_dataset(db):
+    from app.models.models import Group, Teacher, User
+    return {
+        "groups": [g for (g,) in db.query(Group.name).order_by(Group.name)],
+        "teachers": [t for (t,) in db.query(Teacher.id).order_by(Teacher.id)],
+        "departments": sorted({d for (d,) in db.query(Teacher.department).distinct() if d}),
+        "logins": [e for (e,) in db.query(User.email).filter(User.password_hash == "bench").order_by(User.id).limit(5000)],
+    }
+
+
+def run(args):
+    # La configuration de la base est lue à l'import de app.database
+    os.environ["DATABASE_URL"] = args.database_url
+    for key, value in (("MAIL_USERNAME", "bench"), ("MAIL_PASSWORD", "bench"), ("MAIL_FROM", "bench@unitime.ma")):
+        os.environ.setdefault(key, value)
+
+    from fastapi.testclient import TestClient
+
+    from app.cache import bump
+    from app.database import Base, SessionLocal, engine
+    from app.main import app, conf
+    from app.migrations import run_migrations
+    from benchmarks.datagen import SCALES, generate_campus
+
+    conf.SUPPRESS_SEND = 1
+    if not args.keep_data:
+        # Les tables sont créées à l'import de app.main : on repart d'une base vide
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+
+    results = {}
+    with TestClient(app) as client:
+        db = SessionLocal()
+        try:
+            t0 = time.perf_counter()
+            counts = generate_campus(db, SCALES[args.scale], seed=args.seed) if not args.keep_data else {}
+            datagen_s = time.perf_counter() - t0
+            dataset = load_dataset(db)
+        finally:
+            db.close()
+
+        bench = Bench(client, engine, random.Random(args.seed), dataset)
+        cases = args.cases or CASES
+        # Tour à vide : démarre le pool de processus et fournit un emploi du temps aux autres cas
+        bench.generate()
+
+        for case in cases:
+            repeat = min(args.repeat, args.heavy_repeat) if case in HEAVY_CASES else args.repeat
+            bench.extra = None
+            cold, warm = [], []
+            for _ in range(repeat):
+                bump("time_slots", "users")  # invalide les réponses et rendus en cache
+                cold.append(bench.call(case))
+            if case != "generate":
+                for _ in range(repeat):
+                    warm.append(bench.call(case))
+            results[case] = {"cold": summarize(cold), "warm": summarize(warm)}
+            if bench.extra:
+                results[case]["extra"] = bench.extra
+            print(f"⏱️  {case:<18} cold p50 {results[case]['cold']['p50_ms']:>9.2f} ms"
+                  + (f" | warm p50 {results[case]['warm']['p50_ms']:>9.2f} ms" if warm else ""), file=sys.stderr)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "database": engine.url.get_backend_name(),
+            "scale": args.scale,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "heavy_repeat": args.heavy_repeat,
+        },
+        "dataset": {**counts, "datagen_s": round(datagen_s, 3)},
+        "results": results,
+    }
+
+
+def main():
+    from benchmarks.datagen import SCALES
+
+    parser = argparse.ArgumentParser(description="Benchmarks UniTime (sortie JSON).")
+    parser.add_argument("--database-url", default=None,
+                        help="Base à utiliser (défaut : fichier SQLite temporaire). ATTENTION : elle est vidée sauf --keep-data.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--cases", nargs="*", choices=CASES, help="Cas à mesurer (défaut : tous)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--heavy-repeat", type=int, default=3, help="Itérations max pour generate / pdf_bulk")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep-data", action="store_true", help="Ne pas vider ni regénérer la base")
+    parser.add_argument("--out", default=None, help="Fichier JSON de résultats (défaut : stdout)")
+    args = parser.parse_args()
+
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='unitime-bench-'), 'bench.db')}"
+
+    # stdout est réservé au rapport JSON : la progression et les messages de
+    # démarrage de l'application (connexion BDD, seeding) partent sur stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        result = run(args)
+    report = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(report)
+        print(f"📄 Résultats écrits dans {args.out}", file=sys.stderr)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
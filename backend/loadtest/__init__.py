@@ -0,0 +1,12 @@
+"""
+Tests de charge rejouant le trafic réel des tableaux de bord.
+
+    cd backend
+    uvicorn app.main:app --port 8000 &
+    python -m loadtest.run --users 200 --duration 60 --mix admin=1,teacher=10,student=89
+
+Chaque utilisateur virtuel enchaîne les appels que son tableau de bord
+(AdminDashboard / TeacherDashboard / StudentDashboard) fait au montage, puis
+attend un temps de réflexion avant de recharger. Le rapport donne, par
+endpoint, le débit, les latences p50/p95/p99 et le taux d'erreur.
+"""
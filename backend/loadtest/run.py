@@ -0,0 +1,238 @@
+"""
+Lanceur des tests de charge (httpx asynchrone).
+
+    python -m loadtest.run --base-url http://localhost:8000 --users 300 --duration 60 \
+        --mix admin=1,teacher=10,student=89 --ramp-up 10 --out load.json
+
+Chaque utilisateur virtuel tire un rôle selon le mix, joue le scénario de
+son tableau de bord, attend `--think-time` secondes puis recommence, jusqu'à
+la fin de la durée. Comme un navigateur, il renvoie l'ETag reçu pour chaque
+URL (If-None-Match) sauf avec --no-etag. Le flux SSE de son tableau de bord
+reste ouvert en fond (un par utilisateur, comme un onglet) sauf avec --no-sse ;
+sa latence est celle du premier octet reçu.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from datetime import datetime
+
+import httpx
+
+from .scenarios import SCENARIOS, Context, parse_mix
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    k = (len(ordered) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}   # label -> [latence en s]
+        self.errors = {}    # label -> {statut / exception: nombre}
+        self.not_modified = {}
+        self.scenarios = {}  # rôle -> [durée d'un chargement complet]
+        self.events = 0      # événements SSE reçus
+
+    def record(self, label, elapsed, status=None, error=None):
+        self.samples.setdefault(label, []).append(elapsed)
+        if error is not None or (status is not None and status >= 400):
+            bucket = self.errors.setdefault(label, {})
+            key = error or str(status)
+            bucket[key] = bucket.get(key, 0) + 1
+        elif status == 304:
+            self.not_modified[label] = self.not_modified.get(label, 0) + 1
+
+    def report(self, duration):
+        def stats(values):
+            ms = [v * 1000 for v in values]
+            return {
+                "p50_ms": round(percentile(ms, 50), 2),
+                "p95_ms": round(percentile(ms, 95), 2),
+                "p99_ms": round(percentile(ms, 99), 2),
+                "mean_ms": round(statistics.fmean(ms), 2),
+                "max_ms": round(max(ms), 2),
+            }
+
+        endpoints = {}
+        for label, values in sorted(self.samples.items()):
+            n_errors = sum(self.errors.get(label, {}).values())
+            endpoints[label] = {
+                "requests": len(values),
+                "throughput_rps": round(len(values) / duration, 2),
+                **stats(values),
+                "error_rate": round(n_errors / len(values), 4),
+                "errors": self.errors.get(label, {}),
+                "not_modified": self.not_modified.get(label, 0),
+            }
+
+        all_values = [v for values in self.samples.values() for v in values]
+        total_errors = sum(sum(e.values()) for e in self.errors.values())
+        return {
+            "total": {
+                "requests": len(all_values),
+                "throughput_rps": round(len(all_values) / duration, 2),
+                **(stats(all_values) if all_values else {}),
+                "error_rate": round(total_errors / len(all_values), 4) if all_values else 0.0,
+                "sse_events": self.events,
+            },
+            "dashboard_load": {role: {"loads": len(v), **stats(v)} for role, v in sorted(self.scenarios.items()) if v},
+            "endpoints": endpoints,
+        }
+
+
+async def discover(client, password):
+    """Groupes, enseignants et (si un mot de passe est fourni) comptes de connexion."""
+    ctx = Context(password=password)
+    groups = (await client.get("/groups/", params={"fields": "name"})).json()
+    teachers = (await client.get("/teachers/", params={"fields": "id", "limit": 1000})).json()
+    ctx.groups = [g["name"] for g in groups if g.get("name")]
+    ctx.teachers = [t["id"] for t in teachers]
+    if password:
+        for role in ("admin", "enseignant", "student"):
+            users = (await client.get("/admin/users/all", params={"role": role, "is_active": True, "limit": 1000, "fields": "email"})).json()
+            ctx.logins[role] = [u["email"] for u in users]
+    return ctx
+
+
+async def hold_stream(client, call, deadline, recorder):
+    """Flux SSE ouvert jusqu'à la fin du test (ou jusqu'au changement de tableau de bord)."""
+    start = time.perf_counter()
+
+    async def consume():
+        async with client.stream("GET", call.url, params=call.params, timeout=httpx.Timeout(None)) as response:
+            recorder.record(call.label, time.perf_counter() - start, status=response.status_code)
+            async for chunk in response.aiter_bytes():
+                recorder.events += chunk.count(b"\nevent: ")
+
+    try:
+        await asyncio.wait_for(consume(), timeout=max(0, deadline - time.monotonic()))
+    except asyncio.TimeoutError:
+        pass
+    except httpx.HTTPError as e:
+        recorder.record(call.label, time.perf_counter() - start, error=type(e).__name__)
+
+
+async def virtual_user(client, rnd, ctx, roles, weights, deadline, args, recorder):
+    etags = {}
+    stream_key, stream_task = None, None
+    try:
+        while time.monotonic() < deadline:
+            role = rnd.choices(roles, weights)[0]
+            load_start = time.perf_counter()
+            for call in SCENARIOS[role](rnd, ctx):
+                cache_key = (call.url, tuple(sorted((call.params or {}).items())))
+                if call.stream:
+                    # Un seul flux par utilisateur : le nouveau tableau de bord remplace l'ancien onglet
+                    if args.sse and cache_key != stream_key:
+                        if stream_task is not None:
+                            stream_task.cancel()
+                        stream_key = cache_key
+                        stream_task = asyncio.create_task(hold_stream(client, call, deadline, recorder))
+                    continue
+                headers = {}
+                if args.etag and cache_key in etags:
+                    headers["If-None-Match"] = etags[cache_key]
+                start = time.perf_counter()
+                try:
+                    response = await client.request(call.method, call.url, params=call.params, json=call.json, headers=headers)
+                    await response.aread()
+                    recorder.record(call.label, time.perf_counter() - start, status=response.status_code)
+                    if "etag" in response.headers:
+                        etags[cache_key] = response.headers["etag"]
+                except httpx.HTTPError as e:
+                    recorder.record(call.label, time.perf_counter() - start, error=type(e).__name__)
+            recorder.scenarios.setdefault(role, []).append(time.perf_counter() - load_start)
+            if args.think_time:
+                await asyncio.sleep(rnd.expovariate(1 / args.think_time))
+    finally:
+        if stream_task is not None:
+            stream_task.cancel()
+
+
+async def run(args):
+    mix = parse_mix(args.mix)
+    roles, weights = list(mix), list(mix.values())
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        ctx = await discover(client, args.password)
+        print(f"🔎 {len(ctx.groups)} groupes, {len(ctx.teachers)} enseignants découverts")
+
+        start = time.monotonic()
+        deadline = start + args.ramp_up + args.duration
+        tasks = []
+        for i in range(args.users):
+            rnd = random.Random(args.seed * 100003 + i)
+
+            async def delayed(i=i, rnd=rnd):
+                # Montée en charge linéaire sur --ramp-up secondes
+                await asyncio.sleep(args.ramp_up * i / max(1, args.users))
+                await virtual_user(client, rnd, ctx, roles, weights, deadline, args, recorder)
+
+            tasks.append(asyncio.create_task(delayed()))
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - start
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "base_url": args.base_url,
+            "users": args.users,
+            "duration_s": args.duration,
+            "ramp_up_s": args.ramp_up,
+            "think_time_s": args.think_time,
+            "mix": mix,
+            "etag": args.etag,
+            "sse": args.sse,
+            "elapsed_s": round(elapsed, 2),
+        },
+        **recorder.report(elapsed),
+    }
+
+
+def print_summary(result):
+    total = result["total"]
+    print(f"\n📊 {total['requests']} requêtes, {total['throughput_rps']} req/s, erreurs {total['error_rate']:.2%}")
+    print(f"{'endpoint':<38}{'req':>7}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err':>8}")
+    for label, e in result["endpoints"].items():
+        print(f"{label:<38}{e['requests']:>7}{e['throughput_rps']:>9}{e['p50_ms']:>9}{e['p95_ms']:>9}{e['p99_ms']:>9}{e['error_rate']:>8.2%}")
+    for role, d in result["dashboard_load"].items():
+        print(f"🖥️  tableau de bord {role:<8} {d['loads']:>5} chargements, p50 {d['p50_ms']} ms, p95 {d['p95_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tests de charge UniTime par rôle.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=50, help="Utilisateurs virtuels simultanés")
+    parser.add_argument("--duration", type=float, default=30, help="Durée du palier (s), après la montée en charge")
+    parser.add_argument("--ramp-up", type=float, default=5, help="Montée en charge (s)")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Pause moyenne entre deux chargements (s, 0 = aucune)")
+    parser.add_argument("--mix", default="admin=1,teacher=10,student=89", help="Poids des rôles")
+    parser.add_argument("--password", default=None, help="Mot de passe commun des comptes (active l'étape de connexion)")
+    parser.add_argument("--no-etag", dest="etag", action="store_false", help="Ne pas rejouer les ETag (cache navigateur désactivé)")
+    parser.add_argument("--no-sse", dest="sse", action="store_false", help="Ne pas ouvrir les flux SSE des tableaux de bord")
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=None, help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_summary(result)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"📄 Résultats écrits dans {args.out}")
+
+
+if __name__ == "__main__":
+    main()
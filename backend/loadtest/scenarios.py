@@ -0,0 +1,189 @@
+"""
+Scénarios par rôle : la liste ordonnée des appels de chaque tableau de bord.
+
+Un appel = (méthode, gabarit de route, URL concrète, paramètres, corps JSON).
+Le gabarit (/bootstrap/teacher/{teacher_id}) sert de clé d'agrégation dans le
+rapport. Les tableaux de bord attendent chaque `fetch` avant le suivant : les
+appels d'un scénario sont donc joués séquentiellement. Un appel `stream` est
+le flux SSE des notifications : il reste ouvert en fond pendant tout le test.
+
+Les scénarios `legacy_*` rejouent l'ancien chargement (une dizaine de listes
+par tableau de bord), pour comparer avec /bootstrap/*.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+DAYS = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"]
+SLOTS = [("08:00", "10:00"), ("10:15", "12:15"), ("14:00", "16:00"), ("16:15", "18:15")]
+
+
+@dataclass
+class Call:
+    method: str
+    route: str
+    url: str
+    params: Optional[Dict[str, Any]] = None
+    json: Optional[Dict[str, Any]] = None
+    stream: bool = False
+
+    @property
+    def label(self):
+        return f"{self.method} {self.route}"
+
+
+@dataclass
+class Context:
+    """Identifiants découverts au démarrage (groupes, enseignants, comptes)."""
+    groups: list = field(default_factory=list)
+    teachers: list = field(default_factory=list)
+    logins: Dict[str, list] = field(default_factory=dict)
+    password: Optional[str] = None
+
+
+def _get(route, url=None, params=None):
+    return Call("GET", route, url or route, params=params)
+
+
+def _login(rnd, ctx, role):
+    emails = ctx.logins.get(role)
+    if not ctx.password or not emails:
+        return []
+    return [Call("POST", "/login/", "/login/", json={"email": rnd.choice(emails), "password": ctx.password})]
+
+
+def _stream(params):
+    return Call("GET", "/notifications/stream", "/notifications/stream", params=params, stream=True)
+
+
+def _room_search(rnd):
+    start, end = rnd.choice(SLOTS)
+    params = {"day": rnd.choice(DAYS), "start_time": start, "end_time": end, "capacity": rnd.choice([0, 30, 60])}
+    return _get("/rooms/search/", params=params)
+
+
+TEACHER_SECTIONS = "seances,courses,reservations,rooms,groups,notifications"
+STUDENT_SECTIONS = "seances,courses,teachers,rooms,groups,reservations,unavailabilities,notifications"
+
+
+def admin_dashboard(rnd, ctx):
+    # AdminDashboard.fetchAllData : une seule requête
+    calls = _login(rnd, ctx, "admin") + [_get("/bootstrap/admin")]
+    if rnd.random() < 0.2:
+        calls.append(_room_search(rnd))
+    return calls
+
+
+def teacher_dashboard(rnd, ctx):
+    # TeacherDashboard : identification, bootstrap, puis flux SSE
+    calls = _login(rnd, ctx, "enseignant") + [_get("/teachers/")]
+    if ctx.teachers:
+        teacher = rnd.choice(ctx.teachers)
+        calls += [
+            _get("/bootstrap/teacher/{teacher_id}", f"/bootstrap/teacher/{teacher}", params={"include": TEACHER_SECTIONS}),
+            _stream({"role": "teacher", "teacher_id": teacher}),
+        ]
+    if rnd.random() < 0.3:
+        calls.append(_room_search(rnd))
+    return calls
+
+
+def student_dashboard(rnd, ctx):
+    # StudentDashboard : bootstrap du groupe, puis flux SSE
+    calls = _login(rnd, ctx, "student")
+    if ctx.groups:
+        group = rnd.choice(ctx.groups)
+        calls += [
+            _get("/bootstrap/student/{group_id}", f"/bootstrap/student/{group}", params={"include": STUDENT_SECTIONS}),
+            _stream({"role": "student", "group_id": group}),
+        ]
+        if rnd.random() < 0.05:
+            calls.append(_get("/export-pdf/{group_id}", f"/export-pdf/{group}"))
+    if rnd.random() < 0.1:
+        calls.append(_room_search(rnd))
+    return calls
+
+
+# --- Ancien chargement (avant /bootstrap/*), pour comparaison -------------
+def legacy_admin_dashboard(rnd, ctx):
+    calls = _login(rnd, ctx, "admin") + [
+        _get("/groups/"),
+        _get("/seances/"),
+        _get("/teachers/"),
+        _get("/rooms/"),
+        _get("/courses/"),
+        _get("/stats/"),
+        _get("/reservations/"),
+        _get("/timetable/conflicts"),
+        _get("/admin/users/pending"),
+        _get("/admin/users/all"),
+    ]
+    if ctx.groups:
+        group = rnd.choice(ctx.groups)
+        calls.append(_get("/timetable/{group_id}", f"/timetable/{group}"))
+    if rnd.random() < 0.2:
+        calls.append(_room_search(rnd))
+    return calls
+
+
+def legacy_teacher_dashboard(rnd, ctx):
+    calls = _login(rnd, ctx, "enseignant") + [
+        _get("/teachers/"),
+        _get("/seances/"),
+        _get("/courses/"),
+        _get("/reservations/"),
+        _get("/rooms/"),
+        _get("/teachers/"),
+        _get("/groups/"),
+        _get("/notifications/", params={"role": "teacher"}),
+    ]
+    if ctx.teachers:
+        teacher = rnd.choice(ctx.teachers)
+        calls.append(_get("/timetable/teacher/{teacher_id}", f"/timetable/teacher/{teacher}"))
+    if rnd.random() < 0.3:
+        calls.append(_room_search(rnd))
+    return calls
+
+
+def legacy_student_dashboard(rnd, ctx):
+    calls = _login(rnd, ctx, "student") + [
+        _get("/seances/"),
+        _get("/courses/"),
+        _get("/teachers/"),
+        _get("/rooms/"),
+        _get("/groups/"),
+        _get("/reservations/"),
+        _get("/unavailabilities/"),
+        _get("/notifications/"),
+    ]
+    if ctx.groups:
+        group = rnd.choice(ctx.groups)
+        calls.append(_get("/timetable/{group_id}", f"/timetable/{group}"))
+        if rnd.random() < 0.05:
+            calls.append(_get("/export-pdf/{group_id}", f"/export-pdf/{group}"))
+    return calls
+
+
+SCENARIOS = {
+    "admin": admin_dashboard,
+    "teacher": teacher_dashboard,
+    "student": student_dashboard,
+    "legacy_admin": legacy_admin_dashboard,
+    "legacy_teacher": legacy_teacher_dashboard,
+    "legacy_student": legacy_student_dashboard,
+}
+
+
+def parse_mix(text):
+    """'admin=1,teacher=10,student=89' -> {'admin': 1.0, ...}"""
+    mix = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        role, _, weight = part.partition("=")
+        role = role.strip()
+        if role not in SCENARIOS:
+            raise ValueError(f"Rôle inconnu : {role} (attendu : {', '.join(SCENARIOS)})")
+        mix[role] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Mix vide")
+    return mix
@@ -0,0 +1,70 @@
+"""
+Configuration commune des tests (python -m pytest, depuis backend/).
+
+L'application lit DATABASE_URL à l'import : on la fait pointer vers une base
+SQLite jetable avant d'importer app.main, et on coupe l'envoi réel d'emails.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='unitime-tests-'), 'tests.db')}"
+for key, value in (("MAIL_USERNAME", "tests"), ("MAIL_PASSWORD", "tests"), ("MAIL_FROM", "tests@unitime.ma")):
+    os.environ.setdefault(key, value)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app, conf
+
+    conf.SUPPRESS_SEND = 1
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def db(client):
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+DAYS = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"]
+SLOTS = [("08:00", "10:00"), ("10:15", "12:15"), ("14:00", "16:00"), ("16:15", "18:15")]
+
+
+@pytest.fixture(scope="session")
+def campus(client):
+    """Petit campus partagé : 4 enseignants, 6 salles, 8 modules et leurs séances pour le groupe AD."""
+    from app.cache import bump
+    from app.database import SessionLocal
+    from app.models.models import Course, Room, Teacher, TimeSlot
+
+    db = SessionLocal()
+    try:
+        teachers = [Teacher(name=f"Budget Prof {i}", email=f"budget{i}@unitime.ma", department="Informatique") for i in range(4)]
+        rooms = [Room(name=f"Budget Salle {i}", capacity=40, type="Standard", equipment="") for i in range(6)]
+        db.add_all(teachers + rooms)
+        db.flush()
+        courses = [Course(name=f"Budget Module {i}", code=f"BUD{i}", group_id="AD", teacher_id=teachers[i % 4].id) for i in range(8)]
+        db.add_all(courses)
+        db.flush()
+        # Assez de séances pour qu'un accès par ligne (N+1) dépasse le budget
+        db.add_all([
+            TimeSlot(course_id=course.id, teacher_id=course.teacher_id, room_id=rooms[i % 6].id, group_id="AD",
+                     day=DAYS[i % 5], start_time=SLOTS[i % 4][0], end_time=SLOTS[i % 4][1], type="Cours")
+            for i, course in enumerate(courses)
+        ])
+        db.commit()
+    finally:
+        db.close()
+    bump("teachers", "rooms", "courses", "time_slots")
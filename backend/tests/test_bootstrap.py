@@ -0,0 +1,27 @@
+"""
+Bootstrap des tableaux de bord : cache par section et ETag.
+"""
+from datetime import date, timedelta
+
+import app.conflicts
+import app.main
+
+
+def test_conflicts_section_expires_at_midnight(client, monkeypatch):
+    params = {"include": "conflicts"}
+    first = client.get("/bootstrap/admin", params=params)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert client.get("/bootstrap/admin", params=params, headers={"If-None-Match": etag}).status_code == 304
+
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=1)
+
+    monkeypatch.setattr(app.main, "date", Tomorrow)
+    monkeypatch.setattr(app.conflicts, "date", Tomorrow)
+    # Le lendemain, l'ancienne copie n'est plus validée et la section est recalculée
+    response = client.get("/bootstrap/admin", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
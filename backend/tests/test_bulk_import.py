@@ -0,0 +1,35 @@
+"""
+Import en masse des utilisateurs (/admin/users/import).
+"""
+from app.models.models import User
+
+
+def import_csv(client, body, mode="create"):
+    response = client.post(f"/admin/users/import?mode={mode}", content=body.encode(),
+                           headers={"content-type": "text/csv"})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_upsert_without_role_keeps_existing_role(client, db):
+    created = import_csv(client, "nom,email,role\nBoss,boss@x.ma,admin\n")
+    assert created["created"] == 1
+
+    # Pas de colonne role : le rôle existant est conservé
+    updated = import_csv(client, "nom,email,group_id\nBoss,boss@x.ma,AD\n", mode="upsert")
+    assert updated["updated"] == 1
+    # Cellule role vide : idem
+    updated = import_csv(client, "nom,email,role\nBoss,boss@x.ma,\n", mode="upsert")
+    assert updated["updated"] == 1
+
+    boss = db.query(User).filter(User.email == "boss@x.ma").one()
+    assert boss.role == "admin"
+    assert boss.group_id == "AD"
+
+
+def test_new_user_without_role_is_student(client, db):
+    result = import_csv(client, "nom,email\nNew,new-student@x.ma\n", mode="upsert")
+    assert result["created"] == 1
+    user = db.query(User).filter(User.email == "new-student@x.ma").one()
+    assert user.role == "student"
+    assert user.is_active is True
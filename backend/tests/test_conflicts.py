@@ -0,0 +1,97 @@
+"""
+Détection des conflits : balayage des intervalles, règles par jour et
+recalcul limité aux jours modifiés.
+"""
+from collections import namedtuple
+from datetime import date, timedelta
+
+from app.conflicts import _day_conflicts, sweep_overlaps
+from app.database import engine
+from app.models.models import Teacher
+from app.sql_diagnostics import assert_max_queries
+
+Row = namedtuple("Row", "id teacher_id room_id group_id day_of_week start_min end_min")
+
+
+def _types(conflicts):
+    return sorted((c["type"], c["resource_id"]) for c in conflicts)
+
+
+def test_sweep_overlaps_reports_each_overlapping_pair():
+    intervals = [(480, 600, "a"), (540, 660, "b"), (600, 720, "c"), (900, 960, "d"), (500, 520, "e")]
+    pairs = {frozenset(p) for p in sweep_overlaps(intervals)}
+    # Bornes jointives (a finit à 600, c commence à 600) : pas de chevauchement
+    assert pairs == {frozenset("ab"), frozenset("ae"), frozenset("bc")}
+
+
+def test_sweep_overlaps_without_overlap():
+    assert sweep_overlaps([(480, 600, 1), (600, 720, 2), (720, 840, 3)]) == []
+    assert sweep_overlaps([]) == []
+
+
+def test_teacher_room_and_group_overlaps():
+    rows = [
+        Row(1, 10, 100, "G1", 0, 480, 600),
+        Row(2, 10, 101, "G2", 0, 540, 660),  # même enseignant que 1
+        Row(3, 11, 100, "G3", 0, 500, 560),  # même salle que 1
+        Row(4, 12, 102, "G1", 0, 590, 700),  # même groupe que 1
+        Row(5, 13, 103, "G4", 0, 600, 720),  # jointive avec 1 : aucun conflit
+    ]
+    conflicts = _day_conflicts(rows, {}, {}, {})
+    assert _types(conflicts) == [("group", "G1"), ("room", 100), ("teacher", 10)]
+    by_type = {c["type"]: c for c in conflicts}
+    assert sorted(by_type["teacher"]["slots"]) == ["1", "2"]
+    assert sorted(by_type["room"]["slots"]) == ["1", "3"]
+    assert sorted(by_type["group"]["slots"]) == ["1", "4"]
+    assert all(c["day"] == "Lundi" for c in conflicts)
+
+
+def test_room_too_small_for_group():
+    rows = [Row(1, 10, 100, "G1", 2, 480, 600), Row(2, 11, 101, "G1", 2, 600, 720)]
+    conflicts = _day_conflicts(rows, {100: 20, 101: 40}, {"G1": 30}, {})
+    assert [(c["type"], c["resource_id"], c["slots"]) for c in conflicts] == [("capacity", 100, ["1"])]
+    # Capacité ou effectif inconnus : rien à signaler
+    assert _day_conflicts(rows, {}, {"G1": 30}, {}) == []
+    assert _day_conflicts(rows, {100: 20}, {}, {}) == []
+
+
+def test_session_during_teacher_unavailability():
+    rows = [Row(1, 10, 100, "G1", 1, 480, 600), Row(2, 10, 100, "G1", 1, 840, 960), Row(3, 11, 101, "G2", 1, 480, 600)]
+    conflicts = _day_conflicts(rows, {}, {}, {10: [(540, 720, 7)]})
+    assert [(c["type"], c["resource_id"], c["slots"], c["unavailability_id"]) for c in conflicts] == [
+        ("unavailability", 10, ["1"], 7)
+    ]
+
+
+def _next(weekday):
+    today = date.today()
+    return today + timedelta(days=(weekday - today.weekday()) % 7 or 7)
+
+
+def test_only_touched_days_are_recomputed(client, campus, db):
+    teacher = db.query(Teacher).filter(Teacher.name == "Budget Prof 0").one()
+    # Budget Prof 0 : séances du lundi et du vendredi 08:00-10:00
+    client.get("/timetable/conflicts")
+
+    monday = _next(0).isoformat()
+    assert client.post("/unavailabilities/", json={"teacher_id": teacher.id, "date": monday, "reason": "Test"}).status_code == 200
+
+    # Le lundi seul est relu : ses séances et ses indisponibilités
+    with assert_max_queries(engine, 2):
+        conflicts = client.get("/timetable/conflicts").json()
+    absences = [c for c in conflicts if c["type"] == "unavailability" and c["resource_id"] == teacher.id]
+    assert [c["day"] for c in absences] == ["Lundi"]
+
+    # Aucune écriture depuis : rien n'est relu
+    with assert_max_queries(engine, 0):
+        assert client.get("/timetable/conflicts").json() == conflicts
+
+
+def test_past_unavailability_is_ignored(client, campus, db):
+    teacher = db.query(Teacher).filter(Teacher.name == "Budget Prof 1").one()
+    # Budget Prof 1 : séance du mardi 10:15-12:15 ; absence un mardi passé
+    last_tuesday = (_next(1) - timedelta(days=14)).isoformat()
+    assert client.post("/unavailabilities/", json={"teacher_id": teacher.id, "date": last_tuesday, "reason": "Test"}).status_code == 200
+
+    conflicts = client.get("/timetable/conflicts").json()
+    assert not [c for c in conflicts if c["type"] == "unavailability" and c["resource_id"] == teacher.id]
@@ -0,0 +1,16 @@
+"""
+Métriques du pool et des sessions, moteur synchrone et moteur asynchrone.
+"""
+
+
+def test_async_sessions_are_reported(client):
+    client.get("/admin/db/metrics", params={"reset": True})
+    assert client.get("/admin/users/all", params={"limit": 2}).status_code == 200
+
+    data = client.get("/admin/db/metrics").json()
+    assert data["async"]["sessions"]["queries"]["count"] == 1
+    assert data["async"]["sessions"]["queries"]["total"] >= 1
+    assert data["async"]["config"]["pool_size"] >= 1
+
+    text = client.get("/metrics").text
+    assert "unitime_db_async_pool_checked_out" in text
@@ -0,0 +1,36 @@
+"""
+Export PDF groupé et cache borné en octets.
+"""
+import io
+import zipfile
+
+from app.cache import VersionedCache
+
+
+def test_bulk_export_zip_and_pdf(client, campus):
+    response = client.get("/export-pdf-bulk/", params={"kind": "groups"})
+    assert response.status_code == 200
+    names = zipfile.ZipFile(io.BytesIO(response.content)).namelist()
+    assert "groupes/AD.pdf" in names
+
+    # Même périmètre, même version : l'ETag suffit
+    again = client.get("/export-pdf-bulk/", params={"kind": "groups"}, headers={"If-None-Match": response.headers["etag"]})
+    assert again.status_code == 304
+
+    pdf = client.get("/export-pdf-bulk/", params={"kind": "teachers", "format": "pdf", "department": "Informatique"})
+    assert pdf.status_code == 200
+    assert pdf.content.startswith(b"%PDF")
+
+
+def test_versioned_cache_byte_limit():
+    cache = VersionedCache(max_entries=10, max_bytes=100)
+    cache.put("a", (1,), b"x" * 60)
+    cache.put("b", (1,), b"x" * 30)
+    cache.put("c", (1,), b"x" * 30)  # dépasse 100 octets : "a", le plus ancien, est évincé
+    assert cache._bytes == 60
+    assert [k for k in ("a", "b", "c") if cache._data.get(k)] == ["b", "c"]
+
+    cache.put("big", (1,), b"x" * 101)  # plus grand que la limite : jamais gardé
+    assert "big" not in cache._data
+    cache.put("b", (2,), b"x" * 10)  # remplacement : l'ancienne taille est retirée
+    assert cache._bytes == 40
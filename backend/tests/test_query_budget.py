@@ -0,0 +1,71 @@
+"""
+Budgets de requêtes SQL des endpoints chauds (garde-fou contre les N+1).
+"""
+from app.database import engine
+from app.models.models import Reservation, Room, Teacher
+from app.sql_diagnostics import assert_max_queries
+
+
+def test_timetable_query_budget(client, campus):
+    with assert_max_queries(engine, 2):
+        response = client.get("/timetable/AD")
+    assert response.status_code == 200
+    assert len(response.json()) >= 8
+
+    # Réponse en cache tant que les tables n'ont pas changé
+    with assert_max_queries(engine, 0):
+        assert client.get("/timetable/AD").status_code == 200
+
+
+def test_room_search_query_budget(client, campus):
+    params = {"day": "Lundi", "start_time": "08:00", "end_time": "10:00", "capacity": 30}
+    # Construction de l'index : salles, séances, réservations approuvées
+    with assert_max_queries(engine, 3):
+        response = client.get("/rooms/search/", params=params)
+    assert response.status_code == 200
+
+    # Index des disponibilités déjà construit : aucune requête
+    with assert_max_queries(engine, 0):
+        assert client.get("/rooms/search/", params={**params, "day": "Mardi"}).status_code == 200
+
+
+def test_room_index_follows_reservations_without_rebuild(client, campus, db):
+    room = db.query(Room).filter(Room.name == "Budget Salle 5").one()
+    teacher = db.query(Teacher).filter(Teacher.name == "Budget Prof 0").one()
+    # Jeudi 2024-01-04 : aucune séance du campus de test
+    params = {"day": "Jeudi", "start_time": "08:00", "end_time": "10:00"}
+    client.get("/rooms/search/", params=params)
+
+    response = client.post("/reservations/", json={
+        "teacher_id": teacher.id, "room_id": room.id, "reason": "Soutenance",
+        "date": "2024-01-04", "start_time": "08:30", "end_time": "09:30",
+    })
+    assert response.status_code == 200
+    # Une demande en attente n'invalide pas l'index
+    with assert_max_queries(engine, 0):
+        free = client.get("/rooms/search/", params=params).json()
+    assert room.id in [r["id"] for r in free]
+
+    reservation = db.query(Reservation).filter(Reservation.room_id == room.id, Reservation.status == "pending").one()
+    assert client.put(f"/reservations/{reservation.id}", json={"status": "approved"}).status_code == 200
+    # Validation appliquée en place : salle occupée, toujours sans requête
+    with assert_max_queries(engine, 0):
+        free = client.get("/rooms/search/", params=params).json()
+    assert room.id not in [r["id"] for r in free]
+
+
+def test_bootstrap_query_budget(client, campus, db):
+    teacher = db.query(Teacher).filter(Teacher.name == "Budget Prof 0").one()
+    # Une requête par section, toutes sur la session de la requête
+    with assert_max_queries(engine, 10):
+        response = client.get(f"/bootstrap/teacher/{teacher.id}")
+    assert response.status_code == 200
+    assert {s["teacher_id"] for s in response.json()["seances"]} == {teacher.id}
+
+    with assert_max_queries(engine, 0):
+        assert client.get(f"/bootstrap/teacher/{teacher.id}").status_code == 200
+
+    response = client.get("/bootstrap/student/AD", params={"include": "seances,courses"})
+    assert response.status_code == 200
+    assert len(response.json()["seances"]) >= 8
+    assert {c["code"] for c in response.json()["courses"]} >= {f"BUD{i}" for i in range(8)}
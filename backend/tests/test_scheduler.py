@@ -0,0 +1,85 @@
+"""
+Moteur de génération : aucune double réservation, note et choix du meilleur départ.
+"""
+from collections import Counter
+
+from app.scheduler import (CourseInfo, GroupInfo, RoomInfo, ScheduleInput, SchedulerEngine, ScheduleResult,
+                           ScoredSchedule, SessionRequest, best_of, run_start, score_schedule)
+
+
+def campus(n_groups=6, n_teachers=4, n_rooms=5):
+    rooms = [RoomInfo(i, ("Amphi", "Standard", "Labo Info")[i % 3], 30 + 10 * i) for i in range(1, n_rooms + 1)]
+    teacher_ids = list(range(1, n_teachers + 1))
+    groups = [
+        GroupInfo(f"G{g}", f"G{g}", 25 + g, tuple(
+            CourseInfo(100 * g + c, teacher_ids[(g + c) % n_teachers], hours_cours=2, hours_td=2, hours_tp=2)
+            for c in range(3)
+        ))
+        for g in range(n_groups)
+    ]
+    return ScheduleInput(groups=groups, rooms=rooms, teacher_ids=teacher_ids)
+
+
+def assert_no_double_booking(placements):
+    for attr in ("teacher_id", "room_id", "group_id"):
+        usage = Counter((getattr(p, attr), p.day, p.start_time) for p in placements)
+        assert max(usage.values()) == 1, f"{attr} réservé deux fois sur le même créneau"
+
+
+def test_generated_schedule_has_no_double_booking():
+    data = campus()
+    engine = SchedulerEngine(data)
+    result = engine.solve(seed=7)
+    assert result.placements
+    assert_no_double_booking(result.placements)
+
+
+def test_repair_keeps_schedule_free_of_double_booking():
+    # Campus saturé : des séances restent non placées, la recherche locale en déplace d'autres
+    data = campus(n_groups=8, n_teachers=2, n_rooms=2)
+    engine = SchedulerEngine(data)
+    result = engine.solve(seed=3)
+    assert result.unplaced
+    engine.repair(result, {g.name: g.student_count for g in data.groups})
+    assert_no_double_booking(result.placements)
+
+
+def test_best_of_prefers_lowest_score_then_lowest_seed():
+    result = ScheduleResult()
+    candidates = [ScoredSchedule(12.0, {}, result, 5), ScoredSchedule(3.5, {}, result, 9), ScoredSchedule(3.5, {}, result, 2)]
+    assert best_of(candidates).seed == 2
+
+
+def test_score_counts_each_penalty():
+    data = campus(n_groups=1)
+    engine = SchedulerEngine(data)
+    result = engine.solve(seed=1)
+    score, breakdown = score_schedule(engine, result, data.groups)
+    assert breakdown["unplaced"] == 0
+    assert set(breakdown) == {"unplaced", "capacity", "oversize", "gaps", "daily_load"}
+    assert score >= 0
+
+    unplaced = ScheduleResult(result.placements[1:], [SessionRequest(1, 1, "G0", "TD")])
+    assert score_schedule(engine, unplaced, data.groups)[1]["unplaced"] == 1
+
+
+def test_unplaced_sessions_outweigh_every_other_penalty():
+    # Tout est placé mais dans des salles bien trop petites : capacité, trous, charge...
+    data = campus(n_groups=4)
+    tiny = ScheduleInput(
+        groups=[GroupInfo(g.id, g.name, 500, g.courses) for g in data.groups],
+        rooms=[RoomInfo(r.id, r.type, 1) for r in data.rooms],
+        teacher_ids=data.teacher_ids,
+    )
+    crowded = run_start(SchedulerEngine(tiny), tiny.groups, seed=1)
+    assert crowded.breakdown["unplaced"] == 0 and crowded.breakdown["capacity"] > 0
+
+    # Emploi du temps idéal à une séance près
+    engine = SchedulerEngine(data)
+    result = engine.solve(seed=1)
+    missing = result.placements.pop()
+    result.unplaced.append(SessionRequest(missing.course_id, missing.teacher_id, missing.group_id, missing.type))
+    score, breakdown = score_schedule(engine, result, data.groups)
+    one_unplaced = ScoredSchedule(score, breakdown, result, 0)
+
+    assert best_of([one_unplaced, crowded]) is crowded
@@ -128,87 +128,56 @@ export function AdminDashboard() {
   const fetchAllData = async () => {
     setIsLoading(true);
     try {
-      // 1. Récupérer les Groupes en premier (pour le filtre)
-      try {
-        const resGroups = await fetch('http://localhost:8000/groups/');
-        if (resGroups.ok) {
-            const gData = await resGroups.json();
-            setListGroups(gData);
-            // Si on a des groupes et rien de sélectionné, on prend le premier
-            if (gData.length > 0 && !selectedGroupId) {
-                setSelectedGroupId(gData[0].name); 
-            }
-        }
-      } catch (e) { console.error("Erreur groupes", e); }
-
-      // 2. Récupérer les séances (Emploi du temps)
-      const responseSeances = await fetch('http://localhost:8000/seances/');
-      if (responseSeances.ok) {
-        const data = await responseSeances.json();
-        
-        // CONVERSION POUR L'AFFICHAGE
-        const normalizedData = data.map((s: any) => ({
-          ...s,
-          dayOfWeek: daysMap[s.day] !== undefined ? daysMap[s.day] : parseInt(s.day),
-          startTime: normalizeTime(s.start_time || s.heure_debut), 
-          endTime: s.end_time || s.heure_fin,
-          roomId: s.room_id || s.roomId,
-          teacherId: String(s.teacher_id || s.teacherId),
-          courseId: String(s.id_course || s.course_id || s.courseId || "C1"),
-          groupId: s.group_id || s.groupId
-        }));
-        setDbTimeSlots(normalizedData);
+      // Une seule requête : toutes les collections du tableau de bord
+      const response = await fetch('http://localhost:8000/bootstrap/admin');
+      if (!response.ok) throw new Error(`bootstrap ${response.status}`);
+      const data = await response.json();
+
+      // 1. Groupes (pour le filtre) : si rien n'est sélectionné, on prend le premier
+      setListGroups(data.groups);
+      if (data.groups.length > 0 && !selectedGroupId) {
+          setSelectedGroupId(data.groups[0].name);
       }
 
-      // 3. Récupérer les autres Listes (Salles, Profs, Cours)
-      try {
-        const resT = await fetch('http://localhost:8000/teachers/');
-        if (resT.ok) setListTeachers(await resT.json());
-      } catch (e) { console.log("Erreur chargement profs"); }
-
-      try {
-        const resR = await fetch('http://localhost:8000/rooms/'); 
-        if (resR.ok) setListRooms(await resR.json());
-      } catch (e) { console.log("Erreur chargement salles"); }
-
-      try {
-        const resC = await fetch('http://localhost:8000/courses/');
-        if (resC.ok) setListCourses(await resC.json());
-      } catch (e) { console.log("Erreur chargement cours"); }
+      // 2. Séances (Emploi du temps) : CONVERSION POUR L'AFFICHAGE
+      setDbTimeSlots(data.seances.map((s: any) => ({
+        ...s,
+        dayOfWeek: daysMap[s.day] !== undefined ? daysMap[s.day] : parseInt(s.day),
+        startTime: normalizeTime(s.start_time || s.heure_debut), 
+        endTime: s.end_time || s.heure_fin,
+        roomId: s.room_id || s.roomId,
+        teacherId: String(s.teacher_id || s.teacherId),
+        courseId: String(s.id_course || s.course_id || s.courseId || "C1"),
+        groupId: s.group_id || s.groupId
+      })));
+
+      // 3. Autres listes (Salles, Profs, Cours)
+      setListTeachers(data.teachers);
+      setListRooms(data.rooms);
+      setListCourses(data.courses);
 
       // 4. Stats et Réservations
-      const responseStats = await fetch('http://localhost:8000/stats/');
-      if (responseStats.ok) setStats(await responseStats.json());
-
-      const responseRes = await fetch('http://localhost:8000/reservations/');
-      if (responseRes.ok) {
-        const dataRes = await responseRes.json();
-        setRoomRequests(dataRes.map((r: any) => ({
-          id: r.id,
-          teacherName: r.teacher_name, 
-          teacherId: r.teacher_id.toString(),
-          roomId: r.room_id ? r.room_id.toString() : null,
-          roomName: r.room_name,
-          courseId: r.course_id,
-          groupId: r.group_id,
-          date: r.date,
-          startTime: r.start_time,
-          endTime: r.end_time,
-          reason: r.reason,
-          status: r.status,
-          capacity: r.capacity || 30
-        })));
-      }
-
-      const responseConflicts = await fetch('http://localhost:8000/timetable/conflicts');
-      if (responseConflicts.ok) setDbConflicts(await responseConflicts.json());
-
-      const responseUsers = await fetch('http://localhost:8000/admin/users/pending');
-      if (responseUsers.ok) setPendingUsers(await responseUsers.json());
-
-      // Récupérer TOUS les utilisateurs (actifs + inactifs) pour le CRUD
-      const responseAllUsers = await fetch('http://localhost:8000/admin/users/all');
-      if (responseAllUsers.ok) setAllUsers(await responseAllUsers.json());
+      setStats(data.stats);
+      setRoomRequests(data.reservations.map((r: any) => ({
+        id: r.id,
+        teacherName: r.teacher_name, 
+        teacherId: r.teacher_id.toString(),
+        roomId: r.room_id ? r.room_id.toString() : null,
+        roomName: r.room_name,
+        courseId: r.course_id,
+        groupId: r.group_id,
+        date: r.date,
+        startTime: r.start_time,
+        endTime: r.end_time,
+        reason: r.reason,
+        status: r.status,
+        capacity: r.capacity || 30
+      })));
+
+      setDbConflicts(data.conflicts);
+      setPendingUsers(data.pending_users);
+      // TOUS les utilisateurs (actifs + inactifs) pour le CRUD
+      setAllUsers(data.users);
 
     } catch (error) {
       console.error("Erreur de chargement:", error);
@@ -299,12 +268,25 @@ export function AdminDashboard() {
     const toastId = toast.loading("Génération intelligente en cours...");
     try {
       const response = await fetch('http://localhost:8000/timetable/generate', { method: 'POST' });
-      if (response.ok) {
-        const result = await response.json();
-        toast.dismiss(toastId);
-        toast.success(result.message);
-        setTimeout(() => fetchAllData(), 500); // Petit délai pour être sûr que la BDD a fini
-      } else { throw new Error("Erreur Backend"); }
+      if (!response.ok && response.status !== 409) throw new Error("Erreur Backend");
+      const submitted = await response.json();
+      // 409 : une génération tourne déjà, on suit celle-ci
+      const jobId = submitted.job_id || submitted.detail?.job_id;
+
+      // La génération tourne en tâche de fond : on suit sa progression
+      let job: any = null;
+      do {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const jobResponse = await fetch(`http://localhost:8000/jobs/${jobId}`);
+        if (!jobResponse.ok) throw new Error("Erreur Backend");
+        job = await jobResponse.json();
+        toast.loading(`${job.phase} (${Math.round(job.progress * 100)}%)`, { id: toastId });
+      } while (job.status === 'queued' || job.status === 'running');
+
+      toast.dismiss(toastId);
+      if (job.status !== 'succeeded') throw new Error(job.error || "Génération interrompue");
+      toast.success(job.result.message);
+      fetchAllData();
     } catch (error) {
       toast.dismiss(toastId);
       toast.error("Erreur lors de la génération");
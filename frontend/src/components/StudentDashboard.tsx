@@ -71,53 +71,32 @@ export function StudentDashboard({ groupId: propGroupId }: StudentDashboardProps
   useEffect(() => {
     const fetchAllData = async () => {
       setIsLoading(true);
-
-      // FONCTION DE SÉCURITÉ : Empêche le crash si une table est vide ou absente
-      const safeFetch = async (url: string) => {
-        try {
-          const res = await fetch(url);
-          if (!res.ok) return [];
-          return await res.json();
-        } catch (e) {
-          console.error("Erreur de connexion sur : " + url);
-          return [];
+      try {
+        // 1. Tout le tableau de bord en une seule requête (séances du groupe et de sa filière)
+        const res = await fetch(`http://localhost:8000/bootstrap/student/${encodeURIComponent(activeGroupId)}?include=seances,courses,teachers,rooms,groups,reservations,unavailabilities,notifications`);
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        const data = await res.json();
+        const groupsData = data.groups || [];
+
+        // 2. Groupe inconnu : on bascule sur le premier groupe (nouveau chargement)
+        const currentG = groupsData.find((g: any) => g.name === activeGroupId);
+        if (!currentG && groupsData.length > 0) {
+            setActiveGroupId(groupsData[0].name);
+            return;
         }
-      };
+        if (currentG) setRealGroupCount(currentG.student_count);
 
-      try {
-        // 1. Récupérer les données de manière isolée pour ne pas tout bloquer
-        const seancesData = await safeFetch('http://localhost:8000/seances/');
-        const coursesData = await safeFetch('http://localhost:8000/courses/');
-        const teachersData = await safeFetch('http://localhost:8000/teachers/');
-        const roomsData = await safeFetch('http://localhost:8000/rooms/');
-        const groupsData = await safeFetch('http://localhost:8000/groups/');
-        const reservationsData = await safeFetch('http://localhost:8000/reservations/');
-        const unavailData = await safeFetch('http://localhost:8000/unavailabilities/');
-        const globalNotifsData = await safeFetch('http://localhost:8000/notifications/'); // 🆕
-
-        // 2. Mise à jour des états
+        // 3. Mise à jour des états
         setDbGroups(groupsData);
-        setDbCourses(coursesData);
-        setDbTeachers(teachersData);
-        setDbRooms(roomsData);
-        setDbReservations(reservationsData);
-        setDbUnavailabilities(unavailData);
-        setDbGlobalNotifications(globalNotifsData); // 🆕
-
-        // 3. Traitement de la Filière (AD, MIP...)
-        if (groupsData.length > 0) {
-            const userGroupExists = groupsData.some((g: any) => g.name === initialGroupId);
-            if (!userGroupExists) {
-                setActiveGroupId(groupsData[0].name);
-                setRealGroupCount(groupsData[0].student_count);
-            } else {
-                const currentG = groupsData.find((g: any) => g.name === initialGroupId);
-                if (currentG) setRealGroupCount(currentG.student_count);
-            }
-        }
+        setDbCourses(data.courses || []);
+        setDbTeachers(data.teachers || []);
+        setDbRooms(data.rooms || []);
+        setDbReservations(data.reservations || []);
+        setDbUnavailabilities(data.unavailabilities || []);
+        setDbGlobalNotifications(data.notifications || []);
 
         // 4. Traitement de l'emploi du temps
-        const normalized = seancesData.map((s: any) => ({
+        const normalized = (data.seances || []).map((s: any) => ({
           ...s,
           id: s.id.toString(),
           dayOfWeek: ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"].indexOf(s.day),
@@ -139,7 +118,35 @@ export function StudentDashboard({ groupId: propGroupId }: StudentDashboardProps
       }
     };
     fetchAllData();
-  }, [initialGroupId]);
+  }, [activeGroupId]);
+
+  // Flux temps réel (SSE) : les nouveautés arrivent sans recharger /notifications/
+  useEffect(() => {
+    const source = new EventSource(`http://localhost:8000/notifications/stream?role=student&group_id=${encodeURIComponent(activeGroupId)}`);
+    const upsert = (list: any[], item: any) => [item, ...list.filter((x: any) => x.id !== item.id)];
+
+    source.addEventListener('notification', (e: MessageEvent) => {
+      const notif = JSON.parse(e.data);
+      setDbGlobalNotifications(prev => upsert(prev, notif));
+      toast.info(notif.title);
+    });
+    source.addEventListener('unavailability', (e: MessageEvent) => {
+      const un = JSON.parse(e.data);
+      setDbUnavailabilities(prev => upsert(prev, un));
+    });
+    source.addEventListener('reservation', (e: MessageEvent) => {
+      const res = JSON.parse(e.data);
+      setDbReservations(prev => upsert(prev, res));
+    });
+    // Événements manqués (redémarrage du serveur...) : on recharge la liste une fois
+    source.addEventListener('resync', async () => {
+      try {
+        const res = await fetch('http://localhost:8000/notifications/?role=student');
+        if (res.ok) setDbGlobalNotifications(await res.json());
+      } catch (e) { console.error("Erreur Notifs:", e); }
+    });
+    return () => source.close();
+  }, [activeGroupId]);
 
   // --- FILTRAGE (Logique Filière/Groupe) ---
   const groupTimeSlots = dbTimeSlots.filter((s: any) => {
@@ -168,12 +175,16 @@ export function StudentDashboard({ groupId: propGroupId }: StudentDashboardProps
     e.preventDefault();
     const daysMap = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"];
     const dayName = daysMap[parseInt(searchDay)];
-    const occupiedRoomIds = dbTimeSlots
-      .filter(s => s.day === dayName && s.startTime === searchStartTime)
-      .map(s => String(s.roomId));
-    const free = dbRooms.filter(r => !occupiedRoomIds.includes(String(r.id)));
-    setAvailableRooms(free);
-    if (free.length > 0) toast.success(`${free.length} salle(s) trouvée(s)`);
+    // Les séances chargées ne couvrent que la filière : l'occupation des salles vient du serveur
+    const params = new URLSearchParams({ day: dayName, start_time: searchStartTime, end_time: searchEndTime });
+    try {
+      const res = await fetch(`http://localhost:8000/rooms/search/?${params.toString()}`);
+      const free = res.ok ? await res.json() : [];
+      setAvailableRooms(free);
+      if (free.length > 0) toast.success(`${free.length} salle(s) trouvée(s)`);
+    } catch (error) {
+      console.error("Erreur Recherche:", error);
+    }
   };
 
   const days = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi'];
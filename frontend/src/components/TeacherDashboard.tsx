@@ -17,6 +17,7 @@ import {
   Room,
 } from '../data/mockData';
 import { toast } from 'sonner';
+import { fetchAllPages } from '../utils/api';
 
 // 👇 Import du CSS personnalisé
 import './Dashboard.css';
@@ -66,35 +67,24 @@ export function TeacherDashboard({ teacherId }: TeacherDashboardProps) {
   useEffect(() => {
     const fetchIdentityAndData = async () => {
         try {
-            const response = await fetch('http://localhost:8000/teachers/');
-            if (response.ok) {
-                const allTeachers = await response.json();
-                
-                // Comparaison e-mail (insensible à la casse)
-                const found = allTeachers.find((t: any) => 
-                    t.email.toLowerCase() === savedUser.email?.toLowerCase()
-                );
-
-                if (found) {
-                    console.log("Professeur identifié :", found);
-                    setCurrentTeacher(found);
-                    
-                    // Chargement des données avec le VRAI ID
-                    await Promise.all([
-                        fetchSchedule(found.id),
-                        fetchRealCourses(found.id),
-                        fetchMyRequests(found.id),
-                        fetchRooms(),  
-                        fetchTeachers(),  
-                        fetchGroups(),
-                        fetchGlobalNotifications() // [POINT 3] Charger les notifs admin
-                    ]);
-                } else {
-                    toast.error("Profil enseignant introuvable pour cet email.");
-                    // Mode dégradé (ID 1) si non trouvé
-                    fetchSchedule(1);
-                    fetchRealCourses(1);
-                }
+            const allTeachers = await fetchAllPages('http://localhost:8000/teachers/');
+
+            // Comparaison e-mail (insensible à la casse)
+            const found = allTeachers.find((t: any) => 
+                t.email.toLowerCase() === savedUser.email?.toLowerCase()
+            );
+
+            if (found) {
+                console.log("Professeur identifié :", found);
+                setCurrentTeacher(found);
+
+                // Chargement des données avec le VRAI ID (une seule requête)
+                setDbTeachers(allTeachers);
+                await fetchBootstrap(found.id);
+            } else {
+                toast.error("Profil enseignant introuvable pour cet email.");
+                // Mode dégradé (ID 1) si non trouvé
+                fetchBootstrap(1, 'seances,courses');
             }
         } catch (error) {
             console.error("Erreur connexion:", error);
@@ -111,105 +101,50 @@ export function TeacherDashboard({ teacherId }: TeacherDashboardProps) {
   }, [savedUser.email]);
 
 
-  // 2. CHARGER L'EMPLOI DU TEMPS 
-  const fetchSchedule = async (realId: number) => {
+  // 2. CHARGER LE TABLEAU DE BORD (séances, modules, demandes, salles, groupes, notifs)
+  const fetchBootstrap = async (realId: number, include = 'seances,courses,reservations,rooms,groups,notifications') => {
     try {
-      const response = await fetch('http://localhost:8000/seances/');
+      const response = await fetch(`http://localhost:8000/bootstrap/teacher/${realId}?include=${include}`);
       if (response.ok) {
         const data = await response.json();
-        
-        // ---Normalisation robuste ---
-        const normalizedData = data.map((s: any) => ({
-          ...s,
-          // Gestion des jours (string ou int)
-          dayOfWeek: daysMap[s.day] !== undefined ? daysMap[s.day] : (s.dayOfWeek || 0),
-          startTime: s.start_time || s.heure_debut,
-          endTime: s.end_time || s.heure_fin,
-          roomId: s.room_id || s.roomId,
-          // Gestion de tous les formats d'ID possibles (teacher_id, id_prof...)
-          teacherId: String(s.teacher_id || s.id_prof || s.teacherId),
-          courseId: s.id_course || s.course_id || s.courseId,
-          groupId: s.group_id || s.groupId
-        }));
-        
-        // Filtrage strict : Uniquement les cours de ce prof
-        const mySchedule = normalizedData.filter((s: any) => String(s.teacherId) === String(realId));
-        setDbTimeSlots(mySchedule);
+        if (data.seances) setDbTimeSlots(normalizeSchedule(data.seances));
+        if (data.courses) setDbCourses(data.courses);
+        if (data.reservations) setMyRequests([...data.reservations].sort((a: any, b: any) => b.id - a.id));
+        if (data.rooms) setDbRooms(data.rooms);
+        if (data.groups) setDbGroups(data.groups);
+        if (data.notifications) setGlobalNotifs(data.notifications); // [POINT 3] notifs admin
       }
     } catch (error) {
-      console.error("Erreur Schedule:", error);
+      console.error("Erreur Bootstrap:", error);
     }
   };
 
-  // 3. CHARGER LES COURS (Mes Modules)
-  const fetchRealCourses = async (realId: number) => {
-    try {
-        const response = await fetch('http://localhost:8000/courses/');
-        if (response.ok) {
-            const data = await response.json();
-            const myCourses = data.filter((c: any) => c.teacher_id === realId || c.id_prof === realId);
-            setDbCourses(myCourses);
-        }
-    } catch (error) {
-        console.error("Erreur Courses:", error);
-    }
-  };
+  // 3. NORMALISATION DE L'EMPLOI DU TEMPS (séances déjà filtrées sur ce prof)
+  const normalizeSchedule = (data: any[]) => data.map((s: any) => ({
+    ...s,
+    // Gestion des jours (string ou int)
+    dayOfWeek: daysMap[s.day] !== undefined ? daysMap[s.day] : (s.dayOfWeek || 0),
+    startTime: s.start_time || s.heure_debut,
+    endTime: s.end_time || s.heure_fin,
+    roomId: s.room_id || s.roomId,
+    // Gestion de tous les formats d'ID possibles (teacher_id, id_prof...)
+    teacherId: String(s.teacher_id || s.id_prof || s.teacherId),
+    courseId: s.id_course || s.course_id || s.courseId,
+    groupId: s.group_id || s.groupId
+  }));
 
   // 4. CHARGER LES DEMANDES
   const fetchMyRequests = async (realId: number) => {
     try {
-        const response = await fetch('http://localhost:8000/reservations/');
-        if (response.ok) {
-            const data = await response.json();
-            const myData = data.filter((r: any) => r.teacher_id === realId);
-            myData.sort((a: any, b: any) => b.id - a.id);
-            setMyRequests(myData);
-        }
+        const myData = await fetchAllPages(`http://localhost:8000/reservations/?teacher_id=${realId}`);
+        myData.sort((a: any, b: any) => b.id - a.id);
+        setMyRequests(myData);
     } catch (error) {
         console.error("Erreur Requests:", error);
     }
   };
 
-  // 5. CHARGER LES SALLES
-  const fetchRooms = async () => {
-    try {
-        const response = await fetch('http://localhost:8000/rooms/');
-        if (response.ok) {
-            const data = await response.json();
-            setDbRooms(data);
-        }
-    } catch (error) {
-        console.error("Erreur Rooms:", error);
-    }
-  };
-
-  // 6. CHARGER LES PROFESSEURS
-  const fetchTeachers = async () => {
-    try {
-        const response = await fetch('http://localhost:8000/teachers/');
-        if (response.ok) {
-            const data = await response.json();
-            setDbTeachers(data);
-        }
-    } catch (error) {
-        console.error("Erreur Teachers:", error);
-    }
-  };
-
-  // 7. CHARGER LES GROUPES
-  const fetchGroups = async () => {
-    try {
-        const response = await fetch('http://localhost:8000/groups/');
-        if (response.ok) {
-            const data = await response.json();
-            setDbGroups(data);
-        }
-    } catch (error) {
-        console.error("Erreur Groups:", error);
-    }
-  };
-
-  // 8. CHARGER NOTIFS GLOBALES (Admin) [POINT 3]
+  // 5. RECHARGER LES NOTIFS GLOBALES (Admin) [POINT 3]
   const fetchGlobalNotifications = async () => {
       try {
           const res = await fetch('http://localhost:8000/notifications/?role=teacher');
@@ -217,6 +152,25 @@ export function TeacherDashboard({ teacherId }: TeacherDashboardProps) {
       } catch (e) { console.error("Erreur Notifs:", e); }
   };
 
+  // 6. FLUX TEMPS RÉEL (SSE) : notifs admin et décisions sur mes demandes
+  useEffect(() => {
+    if (!currentTeacher) return;
+    const source = new EventSource(`http://localhost:8000/notifications/stream?role=teacher&teacher_id=${currentTeacher.id}`);
+
+    source.addEventListener('notification', (e: MessageEvent) => {
+      const notif = JSON.parse(e.data);
+      setGlobalNotifs(prev => [notif, ...prev.filter((n: any) => n.id !== notif.id)]);
+      toast.info(notif.title);
+    });
+    source.addEventListener('reservation', (e: MessageEvent) => {
+      const res = JSON.parse(e.data);
+      setMyRequests(prev => prev.map((r: any) => r.id === res.id ? { ...r, ...res } : r));
+    });
+    // Événements manqués : on recharge la liste une fois
+    source.addEventListener('resync', () => fetchGlobalNotifications());
+    return () => source.close();
+  }, [currentTeacher?.id]);
+
   const displayName = currentTeacher?.name || savedUser.nom || "Enseignant";
   const displayDept = currentTeacher?.department || "Département";
 
@@ -2,6 +2,7 @@ import React, { useState, useEffect, useRef } from 'react';
 import { useLocation } from 'react-router-dom';
 import { Mic, X, StopCircle } from 'lucide-react';
 import { askOllama } from './OllamaService';
+import { fetchAllPages } from '../../utils/api';
 import './NeonAssistant.css';
 
 export function NeonAssistant() {
@@ -116,7 +117,7 @@ export function NeonAssistant() {
             console.error("Erreur parsing user", e);
         }
 
-        let contextData = { 
+        let contextData: any = { 
             currentPage: location.pathname,
             user: validUser, // Utilise l'utilisateur validé ou null
             stats: {}, 
@@ -126,14 +127,13 @@ export function NeonAssistant() {
         };
 
         try {
-            const [sRes, tRes, ttRes] = await Promise.all([
+            const [sRes, teachers, timetable] = await Promise.all([
                 fetch("http://localhost:8000/stats/"),
-                fetch("http://localhost:8000/teachers/"),
-                fetch("http://localhost:8000/seances/")
+                fetchAllPages("http://localhost:8000/teachers/").catch(() => []),
+                fetchAllPages("http://localhost:8000/seances/").catch(() => [])
             ]);
             if (sRes.ok) contextData.stats = await sRes.json();
-            const teachers = tRes.ok ? await tRes.json() : [];
-            if (ttRes.ok) contextData.timetable = await ttRes.json();
+            contextData.timetable = timetable;
 
             // Si l'utilisateur est valide, on enrichit ses infos
             if (contextData.user && contextData.user.email) {
@@ -0,0 +1,17 @@
+// Les endpoints de liste sont paginés : la page suivante est indiquée par l'en-tête X-Next-Cursor
+export const NEXT_CURSOR_HEADER = 'X-Next-Cursor';
+
+// Récupère toutes les pages d'une liste en suivant le curseur ; lève une erreur si une page échoue
+export async function fetchAllPages<T = any>(url: string, init?: RequestInit): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const pageUrl = new URL(url);
+    if (cursor) pageUrl.searchParams.set('cursor', cursor);
+    const response = await fetch(pageUrl.toString(), init);
+    if (!response.ok) throw new Error(`HTTP ${response.status} sur ${pageUrl.pathname}`);
+    items.push(...(await response.json()));
+    cursor = response.headers.get(NEXT_CURSOR_HEADER);
+  } while (cursor);
+  return items;
+}